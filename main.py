@@ -1,6 +1,17 @@
 import argparse
-
-from src.utils.document_loader import load_document_text
+import json
+import sys
+
+from agno.workflow import StepInput
+from pydantic import ValidationError
+
+from src.config import INGESTION_WORKER_CONCURRENCY, PLAN_BATCH_WORKERS
+from src.schemas.patient import PatientData
+from src.steps.extract_meals import get_cached_document_extraction
+from src.steps.save_to_db import save_meals_to_db
+from src.tools.plan_batch import generate_plans
+from src.utils.hashing import file_sha256
+from src.workers.ingestion import run_workers
 from src.workflows.diet_planner import diet_planner
 from src.workflows.extraction import meal_extraction_workflow
 
@@ -10,16 +21,32 @@ def run_extraction(file_path: str) -> None:
     print(f"\nIniciando extraccion de comidas desde: {file_path}\n")
     print("=" * 50)
 
-    document_text = load_document_text(file_path)
-
     meal_extraction_workflow.print_response(
-        input=document_text,
-        additional_data={"file_path": file_path},
+        input=f"Extraer comidas de {file_path}",
+        additional_data={"file_path": file_path, "document_path": file_path},
         markdown=True,
         stream=True,
     )
 
 
+def resave_from_cache(file_path: str) -> None:
+    """Guardar las comidas de una extraccion previa sin volver a llamar al modelo."""
+    print(f"\nGuardando comidas desde la extraccion en cache de: {file_path}\n")
+    print("=" * 50)
+
+    cached = get_cached_document_extraction(file_sha256(file_path))
+    if cached is None:
+        print("No hay una extraccion guardada para este documento con el prompt actual.")
+        return
+
+    output = save_meals_to_db(
+        StepInput(previous_step_content=cached, additional_data={"file_path": file_path})
+    )
+    print(output.content)
+    if not output.success:
+        sys.exit(1)
+
+
 def run_diet_planner() -> None:
     """Ejecutar el planificador de dietas interactivo."""
     print("\nPlanificador de Dietas - Modo Interactivo")
@@ -41,6 +68,43 @@ def run_diet_planner() -> None:
         print()
 
 
+def run_ingestion_workers(concurrency: int) -> None:
+    """Procesar trabajos de ingestion encolados por la API."""
+    print(f"\nTrabajador de ingestion ({concurrency} a la vez) - Ctrl+C para detener")
+    print("=" * 50)
+    run_workers(concurrency)
+
+
+def _read_patients(file_path: str) -> list[PatientData]:
+    """Pacientes de un archivo JSON (una lista) o NDJSON (uno por linea)."""
+    with open(file_path, encoding="utf-8") as handle:
+        text = handle.read()
+    if text.lstrip().startswith("["):
+        return [PatientData.model_validate(item) for item in json.loads(text)]
+    return [
+        PatientData.model_validate_json(line) for line in text.splitlines() if line.strip()
+    ]
+
+
+def run_plan_batch(file_path: str, output_path: str | None, workers: int) -> None:
+    """Generar planes semanales para muchos pacientes sin usar el modelo."""
+    try:
+        patients = _read_patients(file_path)
+    except (ValueError, ValidationError) as exc:
+        print(f"No se pudo leer {file_path}: {exc}", file=sys.stderr)
+        return
+
+    output = open(output_path, "w", encoding="utf-8") if output_path else sys.stdout
+    try:
+        for line in generate_plans(patients, workers):
+            output.write(line + "\n")
+    finally:
+        if output_path:
+            output.close()
+    if output_path:
+        print(f"{len(patients)} planes escritos en {output_path}")
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(
         description="Sistema de Extraccion de Comidas y Planificacion de Dietas"
@@ -51,15 +115,50 @@ def main() -> None:
         "extraer", help="Extraer comidas de un documento"
     )
     extract_parser.add_argument("archivo", help="Ruta al archivo docx")
+    extract_parser.add_argument(
+        "--desde-cache",
+        action="store_true",
+        help="Solo guardar en la base la extraccion previa del documento, sin llamar al modelo",
+    )
 
     subparsers.add_parser("planificar", help="Planificador de dietas interactivo")
 
+    worker_parser = subparsers.add_parser(
+        "trabajador", help="Procesar la cola de ingestion de documentos"
+    )
+    worker_parser.add_argument(
+        "--concurrencia",
+        type=int,
+        default=INGESTION_WORKER_CONCURRENCY,
+        help="Numero de documentos procesados a la vez",
+    )
+
+    batch_parser = subparsers.add_parser(
+        "planes-lote", help="Generar planes semanales para muchos pacientes (NDJSON)"
+    )
+    batch_parser.add_argument(
+        "archivo", help="Pacientes en JSON (lista) o NDJSON, con los campos de PatientData"
+    )
+    batch_parser.add_argument("--salida", help="Archivo NDJSON de salida (por defecto stdout)")
+    batch_parser.add_argument(
+        "--procesos",
+        type=int,
+        default=PLAN_BATCH_WORKERS,
+        help="Procesos en paralelo; 0 usa uno por CPU",
+    )
+
     args = parser.parse_args()
 
-    if args.command == "extraer":
+    if args.command == "extraer" and args.desde_cache:
+        resave_from_cache(args.archivo)
+    elif args.command == "extraer":
         run_extraction(args.archivo)
     elif args.command == "planificar":
         run_diet_planner()
+    elif args.command == "trabajador":
+        run_ingestion_workers(args.concurrencia)
+    elif args.command == "planes-lote":
+        run_plan_batch(args.archivo, args.salida, args.procesos)
     else:
         parser.print_help()
 
@@ -5,7 +5,7 @@ from agno.db.postgres import PostgresDb
 from agno.models.openai import OpenAIChat
 
 from src.config import SUPABASE_DB_URL
-from src.tools.patient_tools import registrar_paciente
+from src.tools.patient_tools import cargar_paciente, registrar_paciente
 from src.tools.plan_tools import generar_plan_semanal, reemplazar_comida
 from src.tools.search_tools import (
     buscar_comidas,
@@ -46,6 +46,7 @@ def get_diet_planner() -> Agent:
             store_tool_messages=True,
             tools=[
                 registrar_paciente,
+                cargar_paciente,
                 buscar_comidas,
                 obtener_detalle_comida,
                 listar_ingredientes_disponibles,
@@ -61,11 +62,14 @@ Eres un asistente experto en nutricion que ayuda a nutricionistas a crear planes
 ### 1. REGISTRAR PACIENTE
 Cuando recibas datos de un nuevo paciente:
 - Usa registrar_paciente para calcular automaticamente TMB, TDEE y macros
+- Si piden guardar al paciente, llama a registrar_paciente con guardar=True e indica su numero de paciente
+- Si dan el numero de un paciente ya guardado, usa cargar_paciente en lugar de pedir de nuevo sus datos
 - Presenta un resumen claro de los requerimientos
 - Pregunta si quiere generar un plan inicial
 
 ### 2. GENERAR PLAN
 Para crear un plan:
+- Para el plan semanal completo usa generar_plan_semanal con las calorias y los macros (proteina, carbohidratos, grasa) que devolvio registrar_paciente o cargar_paciente
 - Usa buscar_comidas con los filtros apropiados segun el paciente
 - Respeta SIEMPRE: restricciones, alergias, preferencias
 - Busca variedad (no repetir la misma comida mas de 2 veces por semana)
@@ -78,9 +82,9 @@ Para crear un plan:
 
 ### 3. MODIFICAR PLAN
 Cuando pidan cambios:
-- Busca alternativas que cumplan los mismos criterios
-- Ofrece 2-3 opciones para que elijan
-- Recalcula los totales del dia al hacer cambios
+- Usa reemplazar_comida con el dia y el tipo de comida; trabaja sobre el ultimo plan generado, no hace falta enviarlo
+- Presenta la comida nueva con los totales del dia que devuelve la herramienta
+- Ofrece las alternativas devueltas; si eligen otra, llama de nuevo a reemplazar_comida con su meal_id
 
 ## REGLAS IMPORTANTES
 
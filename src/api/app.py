@@ -1,11 +1,50 @@
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from src.api.routers.chat import router as chat_router
 from src.api.routers.ingest import router as ingest_router
 from src.api.routers.meals import router as meals_router
+from src.api.routers.patients import router as patients_router
+from src.api.routers.plans import router as plans_router
+from src.config import INGESTION_EMBEDDED_WORKERS
+from src.db.ingredient_cache import warm_ingredient_cache
+from src.db.meal_catalog import warm_meal_catalog
+from src.db.query_cache import meal_cache
+from src.tools.plan_batch import shutdown_plan_pool
+from src.utils.embedding_cache import get_embedding_cache
+from src.workers.ingestion import start_workers
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        warm_ingredient_cache()
+    except Exception as exc:
+        # The cache fills itself lazily, so a failed warm-up is not fatal.
+        logger.warning("Could not warm ingredient cache: %s", exc)
+    try:
+        warm_meal_catalog()
+    except Exception as exc:
+        # The first plan or search loads it instead.
+        logger.warning("Could not load meal catalog: %s", exc)
 
-app = FastAPI(title="Majo Diet Agent API")
+    # Deployments that run `python main.py trabajador` separately set
+    # INGESTION_EMBEDDED_WORKERS=0 so the API process never runs extractions.
+    stop_event = None
+    if INGESTION_EMBEDDED_WORKERS > 0:
+        _, stop_event = start_workers(INGESTION_EMBEDDED_WORKERS)
+    yield
+    if stop_event is not None:
+        stop_event.set()
+    shutdown_plan_pool()
+
+
+app = FastAPI(title="Majo Diet Agent API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -21,8 +60,19 @@ app.add_middleware(
 app.include_router(chat_router, prefix="/chat", tags=["chat"])
 app.include_router(ingest_router, prefix="/ingest", tags=["ingest"])
 app.include_router(meals_router, prefix="/meals", tags=["meals"])
+app.include_router(patients_router, prefix="/patients", tags=["patients"])
+app.include_router(plans_router, prefix="/plans", tags=["plans"])
 
 
 @app.get("/health")
 def health() -> dict:
     return {"status": "ok"}
+
+
+@app.get("/metrics/cache")
+def cache_metrics() -> dict:
+    embedding_cache = get_embedding_cache()
+    return {
+        "meals": meal_cache.stats(),
+        "embeddings": embedding_cache.stats() if embedding_cache else None,
+    }
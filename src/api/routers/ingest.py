@@ -1,50 +1,82 @@
+import asyncio
+import hashlib
+import json
 import tempfile
 from pathlib import Path
+from typing import AsyncIterator
 
-from fastapi import APIRouter, BackgroundTasks, File, HTTPException, UploadFile
+from fastapi import APIRouter, File, HTTPException, Response, UploadFile
+from fastapi.responses import StreamingResponse
 
 from src.api.schemas import IngestResponse, JobStatusResponse
-from src.db.jobs import create_job, get_job, update_job
-from src.utils.document_loader import load_document_text
-from src.workflows.extraction import meal_extraction_workflow
+from src.config import INGESTION_UPLOAD_DIR
+from src.db.async_jobs import create_job, find_job_by_hash, get_job
+from src.workers.events import job_events
+from src.workers.progress import is_tracked
 
 router = APIRouter()
 
+UPLOAD_READ_SIZE = 1024 * 1024
 
-def _run_ingestion(job_id: str, file_path: str) -> None:
-    update_job(job_id, "processing")
-    temp_path = Path(file_path)
-    try:
-        document_text = load_document_text(file_path)
-        run_output = meal_extraction_workflow.run(
-            input=document_text,
-            additional_data={"file_path": file_path},
-        )
-        update_job(job_id, "completed", summary=str(run_output.content))
-    except Exception as exc:
-        update_job(job_id, "failed", error=str(exc))
-    finally:
-        if temp_path.exists():
-            temp_path.unlink()
+FINAL_STATUSES = {"completed", "failed"}
+# How often the event stream reads the job row when the job runs in another
+# process, and how long it stays silent before sending a keep-alive comment.
+EVENTS_POLL_SECONDS = 2.0
+EVENTS_KEEPALIVE_SECONDS = 15.0
+
+
+def _save_upload(file: UploadFile) -> tuple[Path, str]:
+    """
+    Copy the upload into INGESTION_UPLOAD_DIR and hash it in the same pass.
+    Workers read the file from there, so the directory must be shared with
+    them when they run on another machine.
+    """
+    digest = hashlib.sha256()
+    upload_dir = Path(INGESTION_UPLOAD_DIR)
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf", dir=upload_dir) as tmp:
+        while chunk := file.file.read(UPLOAD_READ_SIZE):
+            digest.update(chunk)
+            tmp.write(chunk)
+    return Path(tmp.name), digest.hexdigest()
 
 
 @router.post("", response_model=IngestResponse, status_code=202)
-def ingest_pdf(background_tasks: BackgroundTasks, file: UploadFile = File(...)) -> IngestResponse:
+async def ingest_pdf(
+    response: Response,
+    file: UploadFile = File(...),
+    force: bool = False,
+) -> IngestResponse:
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files are supported")
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-        tmp_path = Path(tmp.name)
-        tmp.write(file.file.read())
+    tmp_path, content_hash = await asyncio.to_thread(_save_upload, file)
 
-    job_id = create_job(source_file=tmp_path.name)
-    background_tasks.add_task(_run_ingestion, job_id, str(tmp_path))
+    try:
+        if not force:
+            previous = await find_job_by_hash(content_hash)
+            if previous:
+                tmp_path.unlink()
+                response.status_code = 200
+                return IngestResponse(
+                    job_id=previous["id"], status=previous["status"], duplicate=True
+                )
+
+        job_id = await create_job(
+            source_file=tmp_path.name,
+            content_hash=content_hash,
+            file_path=str(tmp_path.resolve()),
+        )
+    except Exception:
+        # No job points at the upload, so nothing would ever remove it.
+        tmp_path.unlink(missing_ok=True)
+        raise
     return IngestResponse(job_id=job_id, status="queued")
 
 
 @router.get("/{job_id}", response_model=JobStatusResponse)
-def get_job_status(job_id: str) -> JobStatusResponse:
-    job = get_job(job_id)
+async def get_job_status(job_id: str) -> JobStatusResponse:
+    job = await get_job(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     return JobStatusResponse(
@@ -52,4 +84,65 @@ def get_job_status(job_id: str) -> JobStatusResponse:
         status=job["status"],
         summary=job.get("summary"),
         error=job.get("error"),
+        progress=job.get("progress"),
+        timings=job.get("timings"),
     )
+
+
+@router.get("/{job_id}/events")
+async def job_events_endpoint(job_id: str) -> StreamingResponse:
+    subscriber = job_events.subscribe(job_id)
+    job = await get_job(job_id)
+    if not job:
+        job_events.unsubscribe(job_id, subscriber)
+        raise HTTPException(status_code=404, detail="Job not found")
+    return StreamingResponse(
+        _event_stream(job, subscriber), media_type="text/event-stream"
+    )
+
+
+def _job_event(job: dict) -> dict:
+    return {
+        "status": job["status"],
+        "progress": job.get("progress"),
+        "timings": job.get("timings"),
+        "summary": job.get("summary"),
+        "error": job.get("error"),
+    }
+
+
+async def _event_stream(job: dict, subscriber: asyncio.Queue) -> AsyncIterator[str]:
+    """
+    Emit job events as they happen when the job runs in this process and
+    fall back to polling ingestion_jobs when another process runs it. Every
+    wait is awaited on the event loop, so an open stream holds no thread.
+    """
+    job_id = job["id"]
+    event = _job_event(job)
+    try:
+        yield f"data: {json.dumps({'type': 'progress', **event})}\n\n"
+        last_sent = event
+        idle = 0.0
+        while event["status"] not in FINAL_STATUSES:
+            try:
+                event = await asyncio.wait_for(subscriber.get(), EVENTS_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                idle += EVENTS_POLL_SECONDS
+                if is_tracked(job_id):
+                    if idle >= EVENTS_KEEPALIVE_SECONDS:
+                        idle = 0.0
+                        yield ": keep-alive\n\n"
+                    continue
+                latest = await get_job(job_id)
+                if not latest:
+                    break
+                event = _job_event(latest)
+
+            if event != last_sent:
+                idle = 0.0
+                last_sent = event
+                yield f"data: {json.dumps({'type': 'progress', **event})}\n\n"
+    finally:
+        job_events.unsubscribe(job_id, subscriber)
+
+    yield "data: {\"type\":\"done\"}\n\n"
@@ -1,17 +1,46 @@
-from fastapi import APIRouter, BackgroundTasks, HTTPException
+import hashlib
+import json
+import logging
+from typing import AsyncIterator
+
+from fastapi import APIRouter, BackgroundTasks, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 
 from src.api.schemas import (
+    BulkImportError,
+    BulkImportResponse,
     MealCreate,
+    MealImport,
     MealResponse,
     MealUpdate,
     MealsListResponse,
     MealsSearchRequest,
 )
-from src.db.queries import create_meal, delete_meal, get_meal_by_id, search_meals, update_meal
+from src.config import MEALS_EXPORT_PAGE_SIZE, MEALS_IMPORT_BATCH_SIZE
+from src.db.async_queries import (
+    create_meal,
+    create_meals,
+    delete_meal,
+    export_meals_page,
+    get_existing_meal_names,
+    get_meal_by_id,
+    get_meal_version,
+    search_meals,
+    search_meals_semantic,
+    update_meal,
+)
+from src.db.queries import MEAL_COLUMNS
+from src.db.queries import update_meal as update_meal_sync
 from src.tools.meal_estimator import estimate_meal_fields
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
+# Errors listed in a bulk import report; the counters keep counting after that.
+MAX_REPORTED_ERRORS = 100
+
 
 def _meal_to_response(meal: dict) -> MealResponse:
     ingredients = [
@@ -36,17 +65,54 @@ def _meal_to_response(meal: dict) -> MealResponse:
     )
 
 
+def _etag(*parts: object) -> str:
+    """
+    Strong ETag over the ids and updated_at versions a representation is
+    built from; updated_at changes whenever a meal or its ingredients do.
+    """
+    digest = hashlib.sha256(json.dumps(parts, default=str).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # If-None-Match compares weakly, so W/"x" matches "x".
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag == "*" or tag.removeprefix("W/") == etag for tag in tags)
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def _list_response(
+    meals: list[dict],
+    response: Response,
+    if_none_match: str | None = None,
+    paginated: bool = True,
+) -> MealsListResponse | Response:
+    next_cursor = meals[-1]["id"] if meals and paginated else None
+    etag = _etag([(meal["id"], meal.get("updated_at")) for meal in meals], next_cursor)
+    if _etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    response.headers["ETag"] = etag
+    return MealsListResponse(
+        items=[_meal_to_response(meal) for meal in meals], next_cursor=next_cursor
+    )
+
+
 @router.post("", response_model=MealResponse)
-def create_meal_endpoint(
-    payload: MealCreate, background_tasks: BackgroundTasks
+async def create_meal_endpoint(
+    payload: MealCreate, background_tasks: BackgroundTasks, response: Response
 ) -> MealResponse:
     meal_data = payload.model_dump(exclude={"ingredients"})
     ingredient_entries = [
         {"name": item.name, "quantity": item.quantity, "unit": item.unit}
         for item in payload.ingredients
     ]
-    meal_id = create_meal(meal_data, ingredient_entries)
-    meal = get_meal_by_id(meal_id)
+    meal_id = await create_meal(meal_data, ingredient_entries)
+    meal = await get_meal_by_id(meal_id)
     if not meal:
         raise HTTPException(status_code=500, detail="Meal creation failed")
 
@@ -65,29 +131,24 @@ def create_meal_endpoint(
             missing_fields,
         )
 
-    return _meal_to_response(meal)
-
-
-@router.get("/{meal_id}", response_model=MealResponse)
-def get_meal_endpoint(meal_id: int) -> MealResponse:
-    meal = get_meal_by_id(meal_id)
-    if not meal:
-        raise HTTPException(status_code=404, detail="Meal not found")
+    response.headers["ETag"] = _etag(meal_id, meal.get("updated_at"))
     return _meal_to_response(meal)
 
 
 @router.get("", response_model=MealsListResponse)
-def list_meals_endpoint(
-    must_include: list[str] | None = None,
-    exclude: list[str] | None = None,
+async def list_meals_endpoint(
+    response: Response,
+    must_include: list[str] | None = Query(None),
+    exclude: list[str] | None = Query(None),
     max_calories: int | None = None,
     min_protein: float | None = None,
     meal_type: str | None = None,
     limit: int = 10,
     cursor: int | None = None,
     q: str | None = None,
-) -> MealsListResponse:
-    meals = search_meals(
+    if_none_match: str | None = Header(None),
+) -> MealsListResponse | Response:
+    meals = await search_meals(
         must_include=must_include,
         exclude=exclude,
         max_calories=max_calories,
@@ -97,23 +158,36 @@ def list_meals_endpoint(
         cursor=cursor,
         name_query=q,
     )
-    items = [_meal_to_response(meal) for meal in meals]
-    next_cursor = items[-1].id if items else None
-    return MealsListResponse(items=items, next_cursor=next_cursor)
+    return _list_response(meals, response, if_none_match)
 
 
 @router.get("/search", response_model=MealsListResponse)
-def search_meals_endpoint(
-    must_include: list[str] | None = None,
-    exclude: list[str] | None = None,
+async def search_meals_endpoint(
+    response: Response,
+    must_include: list[str] | None = Query(None),
+    exclude: list[str] | None = Query(None),
     max_calories: int | None = None,
     min_protein: float | None = None,
     meal_type: str | None = None,
     limit: int = 10,
     cursor: int | None = None,
     q: str | None = None,
-) -> MealsListResponse:
-    meals = search_meals(
+    semantic: bool = False,
+    if_none_match: str | None = Header(None),
+) -> MealsListResponse | Response:
+    if semantic and q:
+        meals = await search_meals_semantic(
+            q,
+            must_include=must_include,
+            exclude=exclude,
+            max_calories=max_calories,
+            min_protein=min_protein,
+            meal_type=meal_type,
+            limit=limit,
+        )
+        return _list_response(meals, response, if_none_match, paginated=False)
+
+    meals = await search_meals(
         must_include=must_include,
         exclude=exclude,
         max_calories=max_calories,
@@ -123,14 +197,26 @@ def search_meals_endpoint(
         cursor=cursor,
         name_query=q,
     )
-    items = [_meal_to_response(meal) for meal in meals]
-    next_cursor = items[-1].id if items else None
-    return MealsListResponse(items=items, next_cursor=next_cursor)
+    return _list_response(meals, response, if_none_match)
 
 
 @router.post("/search", response_model=MealsListResponse)
-def search_meals_post(payload: MealsSearchRequest) -> MealsListResponse:
-    meals = search_meals(
+async def search_meals_post(
+    payload: MealsSearchRequest, response: Response
+) -> MealsListResponse | Response:
+    if payload.semantic and payload.q:
+        meals = await search_meals_semantic(
+            payload.q,
+            must_include=payload.must_include,
+            exclude=payload.exclude,
+            max_calories=payload.max_calories,
+            min_protein=payload.min_protein,
+            meal_type=payload.meal_type,
+            limit=payload.limit,
+        )
+        return _list_response(meals, response, paginated=False)
+
+    meals = await search_meals(
         must_include=payload.must_include,
         exclude=payload.exclude,
         max_calories=payload.max_calories,
@@ -140,9 +226,159 @@ def search_meals_post(payload: MealsSearchRequest) -> MealsListResponse:
         cursor=payload.cursor,
         name_query=payload.q,
     )
-    items = [_meal_to_response(meal) for meal in meals]
-    next_cursor = items[-1].id if items else None
-    return MealsListResponse(items=items, next_cursor=next_cursor)
+    return _list_response(meals, response)
+
+
+async def _ndjson_lines(request: Request) -> AsyncIterator[bytes]:
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+def _report_error(report: BulkImportResponse, line: int, error: str) -> None:
+    if len(report.errors) < MAX_REPORTED_ERRORS:
+        report.errors.append(BulkImportError(line=line, error=error))
+
+
+async def _import_batch(
+    batch: list[tuple[int, MealImport]],
+    report: BulkImportResponse,
+    skip_existing: bool,
+) -> None:
+    if skip_existing:
+        existing = await get_existing_meal_names(meal.name for _, meal in batch)
+        kept = []
+        for line, meal in batch:
+            if meal.name in existing:
+                report.skipped += 1
+            else:
+                # Also skips a name repeated further down the same batch.
+                existing.add(meal.name)
+                kept.append((line, meal))
+        batch = kept
+    if not batch:
+        return
+
+    meals = [
+        (
+            meal.model_dump(exclude={"ingredients"}),
+            [item.model_dump() for item in meal.ingredients],
+        )
+        for _, meal in batch
+    ]
+    try:
+        await create_meals(meals)
+    except Exception as exc:
+        logger.warning("Bulk import batch at line %s failed: %s", batch[0][0], exc)
+        report.failed += len(batch)
+        _report_error(
+            report, batch[0][0], f"Batch of {len(batch)} meals not stored: {exc}"
+        )
+        return
+    report.imported += len(batch)
+
+
+@router.post("/bulk", response_model=BulkImportResponse)
+async def import_meals_endpoint(
+    request: Request, skip_existing: bool = True
+) -> BulkImportResponse:
+    """
+    Import an NDJSON body (one MealImport per line) while it is still being
+    uploaded, storing MEALS_IMPORT_BATCH_SIZE meals per insert. Invalid lines
+    and failed batches are reported and skipped. Missing macros are not
+    estimated here, unlike POST /meals.
+    """
+    report = BulkImportResponse()
+    batch: list[tuple[int, MealImport]] = []
+    line_number = 0
+    async for line in _ndjson_lines(request):
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            meal = MealImport.model_validate_json(line)
+        except ValidationError as exc:
+            report.failed += 1
+            _report_error(
+                report,
+                line_number,
+                "; ".join(
+                    f"{'.'.join(str(part) for part in error['loc']) or 'line'}: {error['msg']}"
+                    for error in exc.errors()
+                ),
+            )
+            continue
+        batch.append((line_number, meal))
+        if len(batch) >= MEALS_IMPORT_BATCH_SIZE:
+            await _import_batch(batch, report, skip_existing)
+            batch = []
+    if batch:
+        await _import_batch(batch, report, skip_existing)
+    return report
+
+
+def _meal_to_export(meal: dict) -> dict:
+    row = {column: meal.get(column) for column in MEAL_COLUMNS}
+    row["ingredients"] = [
+        {
+            "name": mi["ingredients"]["canonical_name"],
+            "quantity": mi.get("quantity"),
+            "unit": mi.get("unit"),
+        }
+        for mi in meal.get("meal_ingredients", [])
+        if mi.get("ingredients")
+    ]
+    if "embedding" in meal:
+        embedding = meal["embedding"]
+        # pgvector columns arrive as their text form, "[0.1,0.2,...]".
+        row["embedding"] = json.loads(embedding) if isinstance(embedding, str) else embedding
+    return row
+
+
+async def _export_lines(include_embeddings: bool) -> AsyncIterator[str]:
+    after_id = None
+    while True:
+        page = await export_meals_page(after_id, MEALS_EXPORT_PAGE_SIZE, include_embeddings)
+        for meal in page:
+            yield json.dumps(_meal_to_export(meal), ensure_ascii=False) + "\n"
+        if len(page) < MEALS_EXPORT_PAGE_SIZE:
+            break
+        after_id = page[-1]["id"]
+
+
+@router.get("/export")
+async def export_meals_endpoint(include_embeddings: bool = False) -> StreamingResponse:
+    """Stream the whole catalog as NDJSON, one page of meals in memory at a time."""
+    return StreamingResponse(
+        _export_lines(include_embeddings), media_type="application/x-ndjson"
+    )
+
+
+@router.get("/{meal_id}", response_model=MealResponse)
+async def get_meal_endpoint(
+    meal_id: int,
+    response: Response,
+    if_none_match: str | None = Header(None),
+) -> MealResponse | Response:
+    if if_none_match:
+        # Revalidation only needs updated_at, not the ingredient join.
+        version = await get_meal_version(meal_id)
+        if version is None:
+            raise HTTPException(status_code=404, detail="Meal not found")
+        etag = _etag(meal_id, version)
+        if _etag_matches(if_none_match, etag):
+            return _not_modified(etag)
+
+    meal = await get_meal_by_id(meal_id)
+    if not meal:
+        raise HTTPException(status_code=404, detail="Meal not found")
+    response.headers["ETag"] = _etag(meal_id, meal.get("updated_at"))
+    return _meal_to_response(meal)
 
 
 def _estimate_and_update_meal(
@@ -172,34 +408,32 @@ def _estimate_and_update_meal(
         update_data["prep_time_mins"] = estimate.prep_time_mins
 
     if update_data:
-        update_meal(meal_id, update_data, ingredient_names=None)
+        update_meal_sync(meal_id, update_data)
 
 
 @router.put("/{meal_id}", response_model=MealResponse)
-def update_meal_endpoint(meal_id: int, payload: MealUpdate) -> MealResponse:
-    existing = get_meal_by_id(meal_id)
-    if not existing:
-        raise HTTPException(status_code=404, detail="Meal not found")
-
+async def update_meal_endpoint(
+    meal_id: int, payload: MealUpdate, response: Response
+) -> MealResponse:
     meal_data = payload.model_dump(exclude_unset=True, exclude={"ingredients"})
-    ingredient_names = None
+    ingredient_entries = None
     if payload.ingredients is not None:
-        ingredient_names = [
+        ingredient_entries = [
             {"name": item.name, "quantity": item.quantity, "unit": item.unit}
             for item in payload.ingredients
         ]
 
-    update_meal(meal_id, meal_data, ingredient_names)
-    updated = get_meal_by_id(meal_id)
+    updated = await update_meal(meal_id, meal_data, ingredient_entries)
     if not updated:
-        raise HTTPException(status_code=500, detail="Meal update failed")
+        raise HTTPException(status_code=404, detail="Meal not found")
+    response.headers["ETag"] = _etag(meal_id, updated.get("updated_at"))
     return _meal_to_response(updated)
 
 
 @router.delete("/{meal_id}")
-def delete_meal_endpoint(meal_id: int) -> dict:
-    existing = get_meal_by_id(meal_id)
+async def delete_meal_endpoint(meal_id: int) -> dict:
+    existing = await get_meal_by_id(meal_id)
     if not existing:
         raise HTTPException(status_code=404, detail="Meal not found")
-    delete_meal(meal_id)
+    await delete_meal(meal_id)
     return {"status": "deleted", "meal_id": meal_id}
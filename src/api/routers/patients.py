@@ -0,0 +1,66 @@
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import ValidationError
+
+from src.api.schemas import PatientResponse, PatientsListResponse, PatientUpdate
+from src.db.patients import (
+    MAX_LIST_LIMIT,
+    create_patient,
+    delete_patient,
+    get_patient,
+    list_patients,
+    update_patient,
+)
+from src.schemas.patient import PatientData
+
+router = APIRouter()
+
+
+def _patient_to_response(row: dict) -> PatientResponse:
+    return PatientResponse(
+        **{key: value for key, value in row.items() if key != "requerimientos_key"}
+    )
+
+
+@router.post("", response_model=PatientResponse)
+def create_patient_endpoint(payload: PatientData) -> PatientResponse:
+    return _patient_to_response(create_patient(payload))
+
+
+@router.get("", response_model=PatientsListResponse)
+def list_patients_endpoint(
+    limit: int = Query(20, ge=1, le=MAX_LIST_LIMIT),
+    cursor: int | None = None,
+) -> PatientsListResponse:
+    """Patients ordered by id; pass next_cursor back as cursor for the next page."""
+    rows = list_patients(limit=limit, cursor=cursor)
+    next_cursor = rows[-1]["id"] if len(rows) == limit else None
+    return PatientsListResponse(
+        items=[_patient_to_response(row) for row in rows], next_cursor=next_cursor
+    )
+
+
+@router.get("/{patient_id}", response_model=PatientResponse)
+def get_patient_endpoint(patient_id: int) -> PatientResponse:
+    row = get_patient(patient_id)
+    if not row:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    return _patient_to_response(row)
+
+
+@router.put("/{patient_id}", response_model=PatientResponse)
+def update_patient_endpoint(patient_id: int, payload: PatientUpdate) -> PatientResponse:
+    """Partial update; requirements are recomputed only if an input to them changed."""
+    try:
+        row = update_patient(patient_id, payload.model_dump(exclude_unset=True))
+    except ValidationError as exc:
+        raise HTTPException(status_code=422, detail=exc.errors(include_url=False)) from exc
+    if not row:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    return _patient_to_response(row)
+
+
+@router.delete("/{patient_id}")
+def delete_patient_endpoint(patient_id: int) -> dict:
+    if not delete_patient(patient_id):
+        raise HTTPException(status_code=404, detail="Patient not found")
+    return {"status": "deleted", "patient_id": patient_id}
@@ -0,0 +1,23 @@
+from typing import Iterator
+
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+
+from src.schemas.patient import PatientData
+from src.tools.plan_batch import generate_plans
+
+router = APIRouter()
+
+
+def _batch_lines(patients: list[PatientData]) -> Iterator[str]:
+    for line in generate_plans(patients):
+        yield line + "\n"
+
+
+@router.post("/batch")
+def generate_plans_batch(patients: list[PatientData]) -> StreamingResponse:
+    """
+    Weekly plans for a list of patients, streamed as NDJSON in input order.
+    Runs on a process pool and does not call the chat model.
+    """
+    return StreamingResponse(_batch_lines(patients), media_type="application/x-ndjson")
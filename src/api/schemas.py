@@ -2,6 +2,8 @@ from typing import Optional
 
 from pydantic import BaseModel, Field
 
+from src.schemas.patient import ActivityLevel, NutritionalRequirements, Objective, PatientData, Sex
+
 
 class IngredientInput(BaseModel):
     name: str = Field(..., description="Nombre canonico del ingrediente")
@@ -24,6 +26,25 @@ class MealCreate(BaseModel):
     ingredients: list[IngredientInput] = Field(default_factory=list)
 
 
+class MealImport(MealCreate):
+    """One NDJSON line of POST /meals/bulk; GET /meals/export writes the same shape."""
+
+    source_document: Optional[str] = None
+    embedding: Optional[list[float]] = None
+
+
+class BulkImportError(BaseModel):
+    line: int
+    error: str
+
+
+class BulkImportResponse(BaseModel):
+    imported: int = 0
+    skipped: int = 0
+    failed: int = 0
+    errors: list[BulkImportError] = Field(default_factory=list)
+
+
 class MealUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
@@ -69,11 +90,38 @@ class MealsSearchRequest(BaseModel):
     limit: int = 10
     cursor: Optional[int] = None
     q: Optional[str] = None
+    semantic: bool = Field(
+        False, description="Ordenar por similitud semantica con q en lugar de filtrar por nombre"
+    )
 
 
 class IngestResponse(BaseModel):
     job_id: str
     status: str
+    duplicate: bool = Field(
+        False, description="El documento ya se habia ingerido; job_id es el trabajo original"
+    )
+
+
+class IngestionProgress(BaseModel):
+    stage: Optional[str] = Field(None, description="load, extract, embed o persist")
+    pages_loaded: int = 0
+    chunks_total: int = 0
+    chunks_extracted: int = 0
+    meals_extracted: int = 0
+    meals_embedded: int = 0
+    meals_saved: int = 0
+    meals_skipped: int = 0
+    meals_failed: int = 0
+
+
+class StageTimings(BaseModel):
+    """Duracion de cada etapa en segundos. load y extract se solapan."""
+
+    load: Optional[float] = None
+    extract: Optional[float] = None
+    embed: Optional[float] = None
+    persist: Optional[float] = None
 
 
 class JobStatusResponse(BaseModel):
@@ -81,3 +129,31 @@ class JobStatusResponse(BaseModel):
     status: str
     summary: Optional[str] = None
     error: Optional[str] = None
+    progress: Optional[IngestionProgress] = None
+    timings: Optional[StageTimings] = None
+
+
+class PatientUpdate(BaseModel):
+    nombre: Optional[str] = None
+    edad: Optional[int] = None
+    sexo: Optional[Sex] = None
+    peso_kg: Optional[float] = None
+    altura_cm: Optional[float] = None
+    objetivo: Optional[Objective] = None
+    nivel_actividad: Optional[ActivityLevel] = None
+    condiciones: Optional[list[str]] = None
+    alergias: Optional[list[str]] = None
+    restricciones: Optional[list[str]] = None
+    preferencias: Optional[list[str]] = None
+
+
+class PatientResponse(PatientData):
+    id: int
+    requerimientos: NutritionalRequirements
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+
+
+class PatientsListResponse(BaseModel):
+    items: list[PatientResponse]
+    next_cursor: Optional[int] = None
@@ -0,0 +1,124 @@
+"""
+Compare the PostgREST and direct Postgres meal backends on the same database.
+
+    python -m src.benchmarks.db_backends --iteraciones 50
+
+Needs SUPABASE_URL/SUPABASE_PRIVATE_KEY and SUPABASE_DB_URL. save_meal
+inserts throwaway meals named "benchmark-..." and deletes them afterwards.
+Both sides bypass the meal cache.
+"""
+import argparse
+import inspect
+import statistics
+import time
+from typing import Callable
+from uuid import uuid4
+
+from src.db import postgres_backend, queries
+from src.schemas.meal import ExtractedMeal, IngredientItem, MealType
+
+EMBEDDING_DIMENSIONS = 1536
+
+BACKENDS = {
+    "postgrest": {
+        "search_meals": inspect.unwrap(queries.search_meals),
+        "get_meal_by_id": inspect.unwrap(queries.get_meal_by_id),
+        "save_meals": inspect.unwrap(queries.save_meals),
+        "delete_meal": inspect.unwrap(queries.delete_meal),
+    },
+    "postgres": {
+        "search_meals": postgres_backend.search_meals,
+        "get_meal_by_id": postgres_backend.get_meal_by_id,
+        "save_meals": postgres_backend.save_meals,
+        "delete_meal": postgres_backend.delete_meal,
+    },
+}
+
+
+def _benchmark_meal() -> ExtractedMeal:
+    return ExtractedMeal(
+        name=f"benchmark-{uuid4().hex[:12]}",
+        description="Comida temporal del benchmark de backends",
+        meal_type=MealType.LUNCH,
+        calories=500,
+        protein_g=30,
+        carbs_g=50,
+        fat_g=15,
+        ingredients=[
+            IngredientItem(name="pollo", quantity=150, unit="g"),
+            IngredientItem(name="arroz", quantity=100, unit="g"),
+            IngredientItem(name="brocoli", quantity=80, unit="g"),
+        ],
+    )
+
+
+def _time_calls(func: Callable[[], object], iterations: int) -> list[float]:
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def _summary(timings: list[float]) -> str:
+    ordered = sorted(timings)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return (
+        f"media {statistics.mean(ordered):7.1f} ms  "
+        f"p50 {statistics.median(ordered):7.1f} ms  p95 {p95:7.1f} ms"
+    )
+
+
+def run_benchmark(iterations: int, warmup: int) -> dict[str, dict[str, list[float]]]:
+    embedding = [1.0 / EMBEDDING_DIMENSIONS] * EMBEDDING_DIMENSIONS
+    results: dict[str, dict[str, list[float]]] = {}
+
+    for backend, ops in BACKENDS.items():
+        sample = ops["search_meals"](limit=1)
+        meal_id = sample[0]["id"] if sample else None
+        created: list[int] = []
+
+        def save_one() -> None:
+            created.extend(ops["save_meals"]([(_benchmark_meal(), embedding)], "benchmark"))
+
+        cases = {
+            "search_meals": lambda: ops["search_meals"](limit=20),
+            "search_meals (filtros)": lambda: ops["search_meals"](
+                must_include=["pollo"], max_calories=700, limit=20
+            ),
+            "save_meal": save_one,
+        }
+        if meal_id is not None:
+            cases["get_meal_by_id"] = lambda: ops["get_meal_by_id"](meal_id)
+
+        try:
+            results[backend] = {}
+            for name, func in cases.items():
+                _time_calls(func, warmup)
+                results[backend][name] = _time_calls(func, iterations)
+        finally:
+            for created_id in created:
+                ops["delete_meal"](created_id)
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Comparar los backends PostgREST y Postgres directo"
+    )
+    parser.add_argument("--iteraciones", type=int, default=50)
+    parser.add_argument("--calentamiento", type=int, default=5)
+    args = parser.parse_args()
+
+    results = run_benchmark(args.iteraciones, args.calentamiento)
+    for backend, cases in results.items():
+        print(f"\n{backend}")
+        print("=" * 50)
+        for name, timings in cases.items():
+            print(f"  {name:<24} {_summary(timings)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Time calcular_requerimientos_lote against the scalar calculations on
+synthetic patients, and check that both give exactly the same results.
+
+    python -m src.benchmarks.requirements --pacientes 1000000 --muestra 50000
+
+The scalar side runs on the first --muestra patients only; every one of
+them is compared field by field with the batch result. Weights and heights
+have one decimal, which makes .x5 rounding ties common.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.schemas.patient import PatientData, Sex
+from src.tools.calculations import calcular_imc, calcular_requerimientos
+from src.tools.calculations_batch import (
+    ACTIVITY_LEVELS,
+    OBJECTIVES,
+    PatientColumns,
+    calcular_requerimientos_lote,
+)
+
+CONDITIONS = (
+    "hipotiroidismo",
+    "diabetes",
+    "resistencia a la insulina",
+    "hipertension",
+    "enfermedad renal",
+)
+
+
+def synthetic_patients(count: int, seed: int = 0) -> tuple[PatientColumns, list[list[str]]]:
+    rng = np.random.default_rng(seed)
+    flags = rng.random((count, len(CONDITIONS))) < 0.1
+    columns = PatientColumns(
+        edad=rng.integers(16, 90, count),
+        masculino=rng.random(count) < 0.5,
+        peso_kg=np.round(rng.uniform(35, 180, count), 1),
+        altura_cm=np.round(rng.uniform(140, 205, count), 1),
+        objetivo=rng.integers(0, len(OBJECTIVES), count).astype(np.int8),
+        nivel_actividad=rng.integers(0, len(ACTIVITY_LEVELS), count).astype(np.int8),
+        hipotiroidismo=flags[:, 0],
+        diabetes=flags[:, 1] | flags[:, 2],
+        hipertension=flags[:, 3],
+        enfermedad_renal=flags[:, 4],
+    )
+    conditions = [[name for name, flag in zip(CONDITIONS, row) if flag] for row in flags]
+    return columns, conditions
+
+
+def _patient(columns: PatientColumns, conditions: list[list[str]], index: int) -> PatientData:
+    return PatientData(
+        nombre=f"sintetico-{index}",
+        edad=int(columns.edad[index]),
+        sexo=Sex.MALE if columns.masculino[index] else Sex.FEMALE,
+        peso_kg=float(columns.peso_kg[index]),
+        altura_cm=float(columns.altura_cm[index]),
+        objetivo=OBJECTIVES[columns.objetivo[index]],
+        nivel_actividad=ACTIVITY_LEVELS[columns.nivel_actividad[index]],
+        condiciones=conditions[index],
+    )
+
+
+def run_benchmark(count: int, sample: int) -> None:
+    columns, conditions = synthetic_patients(count)
+
+    start = time.perf_counter()
+    batch = calcular_requerimientos_lote(columns)
+    batch_seconds = time.perf_counter() - start
+
+    sample = min(sample, count)
+    patients = [_patient(columns, conditions, index) for index in range(sample)]
+    start = time.perf_counter()
+    scalar = [
+        (calcular_requerimientos(patient), calcular_imc(patient.peso_kg, patient.altura_cm))
+        for patient in patients
+    ]
+    scalar_seconds = time.perf_counter() - start
+
+    mismatches = 0
+    for index, (requerimientos, imc) in enumerate(scalar):
+        if batch.requerimientos(index) != requerimientos or batch.imc_resultado(index) != imc:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"  diferencia en el paciente {index}: {patients[index]}")
+
+    for label, patients_run, seconds in (
+        ("lote", count, batch_seconds),
+        ("escalar", sample, scalar_seconds),
+    ):
+        print(
+            f"{label:<8} {patients_run:>9} pacientes  {seconds * 1000:9.1f} ms  "
+            f"{patients_run / seconds:12,.0f} pacientes/s"
+        )
+    print(f"comparados {sample}: {mismatches} diferencias")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Comparar el calculo de requerimientos por lote con el escalar"
+    )
+    parser.add_argument("--pacientes", type=int, default=1_000_000)
+    parser.add_argument("--muestra", type=int, default=50_000)
+    args = parser.parse_args()
+    run_benchmark(args.pacientes, args.muestra)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,3 +10,63 @@ EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_PRIVATE_KEY = os.getenv("SUPABASE_PRIVATE_KEY")
 SUPABASE_DB_URL = os.getenv("SUPABASE_DB_URL")
+
+INGREDIENT_CACHE_SIZE = int(os.getenv("INGREDIENT_CACHE_SIZE", "5000"))
+
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "4"))
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "tmp/embedding_cache.db")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "50000"))
+
+EXTRACTION_CHUNK_CHARS = int(os.getenv("EXTRACTION_CHUNK_CHARS", "30000"))
+EXTRACTION_CHUNK_OVERLAP = int(os.getenv("EXTRACTION_CHUNK_OVERLAP", "1500"))
+EXTRACTION_CONCURRENCY = int(os.getenv("EXTRACTION_CONCURRENCY", "4"))
+
+PDF_LOADER_WORKERS = int(os.getenv("PDF_LOADER_WORKERS", "0"))
+
+INGESTION_UPLOAD_DIR = os.getenv("INGESTION_UPLOAD_DIR", "tmp/uploads")
+INGESTION_WORKER_CONCURRENCY = int(os.getenv("INGESTION_WORKER_CONCURRENCY", "2"))
+INGESTION_EMBEDDED_WORKERS = int(os.getenv("INGESTION_EMBEDDED_WORKERS", "1"))
+INGESTION_VISIBILITY_TIMEOUT = int(os.getenv("INGESTION_VISIBILITY_TIMEOUT", "900"))
+INGESTION_MAX_ATTEMPTS = int(os.getenv("INGESTION_MAX_ATTEMPTS", "3"))
+INGESTION_POLL_INTERVAL = float(os.getenv("INGESTION_POLL_INTERVAL", "2"))
+
+# "postgrest" (Supabase HTTP API) or "postgres" (direct connection pool on
+# SUPABASE_DB_URL) for the meal reads and writes that support both.
+MEALS_BACKEND = os.getenv("MEALS_BACKEND", "postgrest")
+POSTGRES_POOL_SIZE = int(os.getenv("POSTGRES_POOL_SIZE", "5"))
+POSTGRES_POOL_MAX_OVERFLOW = int(os.getenv("POSTGRES_POOL_MAX_OVERFLOW", "5"))
+# Executions of a statement before psycopg prepares it server-side. Empty
+# (the default) disables prepared statements, which Supabase's transaction
+# pooler rejects; set it (e.g. 0) only on a direct or session connection.
+POSTGRES_PREPARE_THRESHOLD = os.getenv("POSTGRES_PREPARE_THRESHOLD", "")
+
+MEALS_IMPORT_BATCH_SIZE = int(os.getenv("MEALS_IMPORT_BATCH_SIZE", "500"))
+MEALS_EXPORT_PAGE_SIZE = int(os.getenv("MEALS_EXPORT_PAGE_SIZE", "500"))
+
+# Read-through cache for meal detail and search results. 0 disables it.
+MEAL_CACHE_TTL_SECONDS = float(os.getenv("MEAL_CACHE_TTL_SECONDS", "300"))
+MEAL_CACHE_MAX_ENTRIES = int(os.getenv("MEAL_CACHE_MAX_ENTRIES", "2000"))
+
+# In-memory meal catalog used by the plan generator and buscar_comidas. It
+# checks the database for changed meals at most this often.
+MEAL_CATALOG_REFRESH_SECONDS = float(os.getenv("MEAL_CATALOG_REFRESH_SECONDS", "60"))
+
+# Weekly plan optimizer: perturbation rounds after the first descent, and a
+# CPU-time cap that cuts them short on a slow machine.
+PLAN_OPTIMIZER_ROUNDS = int(os.getenv("PLAN_OPTIMIZER_ROUNDS", "40"))
+PLAN_OPTIMIZER_TIME_BUDGET_SECONDS = float(os.getenv("PLAN_OPTIMIZER_TIME_BUDGET_SECONDS", "0.5"))
+
+# Chat sessions whose current weekly plan is kept in memory for editing.
+PLAN_STORE_MAX_SESSIONS = int(os.getenv("PLAN_STORE_MAX_SESSIONS", "1000"))
+
+# Size of the process pool shared by every POST /plans/batch (and by
+# `main.py planes-lote`); concurrent batches queue for these workers. 0 uses
+# one per CPU.
+PLAN_BATCH_WORKERS = int(os.getenv("PLAN_BATCH_WORKERS", "0"))
+
+# Patient profiles: "supabase" (patients table) or "sqlite" (local file at
+# PATIENTS_SQLITE_PATH, for development without a database).
+PATIENTS_BACKEND = os.getenv("PATIENTS_BACKEND", "supabase")
+PATIENTS_SQLITE_PATH = os.getenv("PATIENTS_SQLITE_PATH", "tmp/patients.db")
@@ -0,0 +1,38 @@
+"""Async counterparts of the job lookups in src.db.jobs used by the ingest routes."""
+from typing import Optional
+
+from src.db.jobs import DUPLICATE_JOB_FILTER, _new_job_row, _pick_job_for_hash
+from src.db.supabase_client import get_async_supabase_client
+
+
+async def create_job(
+    source_file: str,
+    content_hash: Optional[str] = None,
+    file_path: Optional[str] = None,
+) -> str:
+    supabase = await get_async_supabase_client()
+    row = _new_job_row(source_file, content_hash, file_path)
+    await supabase.table("ingestion_jobs").insert(row).execute()
+    return row["id"]
+
+
+async def get_job(job_id: str) -> Optional[dict]:
+    supabase = await get_async_supabase_client()
+    result = await (
+        supabase.table("ingestion_jobs").select("*").eq("id", job_id).limit(1).execute()
+    )
+    return result.data[0] if result.data else None
+
+
+async def find_job_by_hash(content_hash: str) -> Optional[dict]:
+    supabase = await get_async_supabase_client()
+    result = await (
+        supabase.table("ingestion_jobs")
+        .select("*")
+        .eq("content_hash", content_hash)
+        .or_(DUPLICATE_JOB_FILTER)
+        .order("enqueued_at", desc=True)
+        .limit(20)
+        .execute()
+    )
+    return _pick_job_for_hash(result.data or [])
@@ -0,0 +1,257 @@
+"""
+Async counterparts of the meal queries in src.db.queries, used by the API
+routes so a request waiting on Supabase does not hold a worker thread.
+Row shapes, filters and ingredient handling are shared with the sync module.
+"""
+import asyncio
+from functools import wraps
+from typing import Iterable
+
+from src.config import MEALS_BACKEND
+from src.db.ingredient_cache import ingredient_cache
+from src.db.query_cache import meal_cache
+from src.db.queries import (
+    MEAL_SELECT,
+    _apply_search_filters,
+    _bulk_meal_row,
+    _cached_ingredient_ids,
+    _ingredient_ids_by_name,
+    _ingredient_names,
+    _meal_ingredient_rows_for_meals,
+    _search_cache_arguments,
+    _select_ingredients,
+    _semantic_search_params,
+    _update_meal_params,
+    _upsert_ingredients,
+)
+from src.db.supabase_client import get_async_supabase_client
+from src.utils.embeddings import embed_text
+
+
+def _pluggable(func):
+    """
+    With MEALS_BACKEND=postgres, run the src.db.postgres_backend function of
+    the same name on the threadpool; psycopg's pool there is synchronous.
+    """
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        if MEALS_BACKEND == "postgres":
+            from src.db import postgres_backend
+
+            backend_func = getattr(postgres_backend, func.__name__)
+            return await asyncio.to_thread(backend_func, *args, **kwargs)
+        return await func(*args, **kwargs)
+
+    return wrapper
+
+
+async def _resolve_ingredient_ids(names: Iterable[str]) -> dict[str, int]:
+    normalized_names = _ingredient_names(names)
+    if not normalized_names:
+        return {}
+
+    if not ingredient_cache.warmed:
+        await ingredient_cache.warm_async()
+    ingredient_ids, missing = _cached_ingredient_ids(normalized_names)
+    if not missing:
+        return ingredient_ids
+
+    supabase = await get_async_supabase_client()
+    created = await _upsert_ingredients(supabase, missing).execute()
+    resolved = _ingredient_ids_by_name(created.data)
+    still_missing = [name for name in missing if name not in resolved]
+    if still_missing:
+        result = await _select_ingredients(supabase, still_missing).execute()
+        resolved.update(_ingredient_ids_by_name(result.data))
+
+    ingredient_cache.put_many(resolved)
+    ingredient_ids.update(resolved)
+    return ingredient_ids
+
+
+async def _insert_meal_ingredients(rows: list[dict], ingredient_ids: dict[str, int]) -> None:
+    if not rows:
+        return
+    supabase = await get_async_supabase_client()
+    try:
+        await supabase.table("meal_ingredients").insert(rows).execute()
+    except Exception:
+        ingredient_cache.invalidate(ingredient_ids)
+        raise
+
+
+@_pluggable
+async def get_existing_meal_names(names: Iterable[str]) -> set[str]:
+    unique_names = list(dict.fromkeys(names))
+    if not unique_names:
+        return set()
+    supabase = await get_async_supabase_client()
+    result = await supabase.table("meals").select("name").in_("name", unique_names).execute()
+    return {row["name"] for row in result.data or []}
+
+
+@meal_cache.read_through_async()
+@_pluggable
+async def get_meal_by_id(meal_id: int) -> dict | None:
+    supabase = await get_async_supabase_client()
+    result = await (
+        supabase.table("meals")
+        .select(MEAL_SELECT)
+        .eq("id", meal_id)
+        .limit(1)
+        .execute()
+    )
+    return result.data[0] if result.data else None
+
+
+@meal_cache.read_through_async()
+@_pluggable
+async def get_meal_version(meal_id: int) -> str | None:
+    supabase = await get_async_supabase_client()
+    result = await (
+        supabase.table("meals").select("updated_at").eq("id", meal_id).limit(1).execute()
+    )
+    return result.data[0]["updated_at"] if result.data else None
+
+
+@meal_cache.invalidates_async
+async def create_meal(meal_data: dict, ingredient_entries: list[dict]) -> int:
+    meal_ids = await _insert_meals(
+        [_bulk_meal_row(meal_data, ingredient_entries)], [ingredient_entries]
+    )
+    return meal_ids[0]
+
+
+async def _insert_meals(meal_rows: list[dict], entries_per_meal: list[list[dict]]) -> list[int]:
+    supabase = await get_async_supabase_client()
+    ingredient_ids = await _resolve_ingredient_ids(
+        entry["name"] for entries in entries_per_meal for entry in entries
+    )
+
+    meal_insert = await supabase.table("meals").insert(meal_rows).execute()
+    meal_ids = [row["id"] for row in meal_insert.data]
+
+    rows = _meal_ingredient_rows_for_meals(meal_ids, entries_per_meal, ingredient_ids)
+    try:
+        await _insert_meal_ingredients(rows, ingredient_ids)
+    except Exception:
+        await supabase.table("meals").delete().in_("id", meal_ids).execute()
+        raise
+
+    return meal_ids
+
+
+@meal_cache.invalidates_async
+@_pluggable
+async def create_meals(meals: list[tuple[dict, list[dict]]]) -> list[int]:
+    if not meals:
+        return []
+    return await _insert_meals(
+        [_bulk_meal_row(meal_data, entries) for meal_data, entries in meals],
+        [entries for _, entries in meals],
+    )
+
+
+@_pluggable
+async def export_meals_page(
+    after_id: int | None,
+    limit: int,
+    include_embeddings: bool = False,
+) -> list[dict]:
+    supabase = await get_async_supabase_client()
+    select = MEAL_SELECT + (", embedding" if include_embeddings else "")
+    query = supabase.table("meals").select(select)
+    if after_id is not None:
+        query = query.gt("id", after_id)
+    result = await query.order("id", desc=False).limit(limit).execute()
+    return result.data or []
+
+
+@meal_cache.invalidates_async
+@_pluggable
+async def update_meal(
+    meal_id: int,
+    meal_data: dict,
+    ingredient_entries: list[dict] | None = None,
+) -> dict | None:
+    supabase = await get_async_supabase_client()
+    params = _update_meal_params(meal_id, meal_data, ingredient_entries)
+    result = await supabase.rpc("update_meal_with_ingredients", params).execute()
+    return result.data or None
+
+
+@meal_cache.invalidates_async
+@_pluggable
+async def delete_meal(meal_id: int) -> None:
+    supabase = await get_async_supabase_client()
+    await supabase.table("meals").delete().eq("id", meal_id).execute()
+
+
+@meal_cache.read_through_async(_search_cache_arguments)
+@_pluggable
+async def search_meals(
+    must_include: list[str] | None = None,
+    exclude: list[str] | None = None,
+    max_calories: int | None = None,
+    min_protein: float | None = None,
+    meal_type: str | None = None,
+    limit: int = 10,
+    cursor: int | None = None,
+    name_query: str | None = None,
+) -> list[dict]:
+    supabase = await get_async_supabase_client()
+    query = _apply_search_filters(
+        supabase.table("meals").select(MEAL_SELECT),
+        must_include=must_include,
+        exclude=exclude,
+        max_calories=max_calories,
+        min_protein=min_protein,
+        meal_type=meal_type,
+        limit=limit,
+        cursor=cursor,
+        name_query=name_query,
+    )
+    result = await query.execute()
+    return result.data or []
+
+
+async def search_meals_semantic(
+    query_text: str,
+    must_include: list[str] | None = None,
+    exclude: list[str] | None = None,
+    max_calories: int | None = None,
+    min_protein: float | None = None,
+    meal_type: str | None = None,
+    limit: int = 10,
+    tags: list[str] | None = None,
+) -> list[dict]:
+    # The embedding client and its on-disk cache are synchronous.
+    query_embedding = await asyncio.to_thread(embed_text, query_text)
+    # Imported here for the same reason as in src.db.queries.search_meals_semantic.
+    from src.db.vector_index import get_vector_index
+
+    index = get_vector_index()
+    if index is not None:
+        return index.search(
+            query_embedding,
+            limit=limit,
+            meal_type=meal_type,
+            max_calories=max_calories,
+            min_protein=min_protein,
+            must_include=must_include,
+            exclude=exclude,
+            tags=tags,
+        )
+    supabase = await get_async_supabase_client()
+    params = _semantic_search_params(
+        query_embedding,
+        must_include=must_include,
+        exclude=exclude,
+        max_calories=max_calories,
+        min_protein=min_protein,
+        meal_type=meal_type,
+        limit=limit,
+        tags=tags,
+    )
+    result = await supabase.rpc("match_meals", params).select(MEAL_SELECT).execute()
+    return result.data or []
@@ -0,0 +1,32 @@
+from typing import Optional
+
+from src.db.supabase_client import get_supabase_client
+from src.schemas.meal import ExtractedMealsResponse
+
+
+def document_cache_key(content_hash: str, prompt_version: str) -> str:
+    return f"document:{prompt_version}:{content_hash}"
+
+
+def chunk_cache_key(chunk_hash: str, prompt_version: str) -> str:
+    return f"chunk:{prompt_version}:{chunk_hash}"
+
+
+def get_cached_extraction(key: str) -> Optional[ExtractedMealsResponse]:
+    supabase = get_supabase_client()
+    result = supabase.table("extraction_cache").select("result").eq("key", key).limit(1).execute()
+    if not result.data:
+        return None
+    return ExtractedMealsResponse(**result.data[0]["result"])
+
+
+def save_extraction(key: str, prompt_version: str, response: ExtractedMealsResponse) -> None:
+    supabase = get_supabase_client()
+    supabase.table("extraction_cache").upsert(
+        {
+            "key": key,
+            "prompt_version": prompt_version,
+            "result": response.model_dump(mode="json"),
+        },
+        on_conflict="key",
+    ).execute()
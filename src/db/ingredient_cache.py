@@ -0,0 +1,97 @@
+import threading
+from collections import OrderedDict
+from typing import Iterable
+
+from src.config import INGREDIENT_CACHE_SIZE
+from src.db.supabase_client import get_async_supabase_client, get_supabase_client
+
+WARM_PAGE_SIZE = 1000
+
+
+class IngredientCache:
+    """LRU map of canonical_name -> ingredient id, shared by the whole process."""
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.warmed = False
+        self._ids: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def get_many(self, names: Iterable[str]) -> dict[str, int]:
+        found = {}
+        with self._lock:
+            for name in names:
+                ingredient_id = self._ids.get(name)
+                if ingredient_id is not None:
+                    self._ids.move_to_end(name)
+                    found[name] = ingredient_id
+        return found
+
+    def put_many(self, ids: dict[str, int]) -> None:
+        with self._lock:
+            for name, ingredient_id in ids.items():
+                self._ids[name] = ingredient_id
+                self._ids.move_to_end(name)
+            while len(self._ids) > self.max_size:
+                self._ids.popitem(last=False)
+
+    def invalidate(self, names: Iterable[str] | None = None) -> None:
+        with self._lock:
+            if names is None:
+                self._ids.clear()
+                self.warmed = False
+                return
+            for name in names:
+                self._ids.pop(name, None)
+
+    def mark_warmed(self) -> None:
+        """Record that the cache holds the ingredient table, up to max_size rows."""
+        self.warmed = True
+
+    def _warm_page(self, supabase, loaded: int):
+        end = min(loaded + WARM_PAGE_SIZE, self.max_size) - 1
+        return (
+            supabase.table("ingredients")
+            .select("id, canonical_name")
+            .order("id")
+            .range(loaded, end)
+        )
+
+    def _add_warm_page(self, rows: list[dict]) -> int:
+        self.put_many({row["canonical_name"]: row["id"] for row in rows})
+        return len(rows)
+
+    def warm(self) -> int:
+        # PostgREST caps every response at its max-rows setting (1000 by
+        # default), so read pages until max_size rows or an empty page.
+        supabase = get_supabase_client()
+        loaded = 0
+        while loaded < self.max_size:
+            rows = self._warm_page(supabase, loaded).execute().data or []
+            if not rows:
+                break
+            loaded += self._add_warm_page(rows)
+        self.mark_warmed()
+        return len(self)
+
+    async def warm_async(self) -> int:
+        """warm() over the async client, for code running on the event loop."""
+        supabase = await get_async_supabase_client()
+        loaded = 0
+        while loaded < self.max_size:
+            rows = (await self._warm_page(supabase, loaded).execute()).data or []
+            if not rows:
+                break
+            loaded += self._add_warm_page(rows)
+        self.mark_warmed()
+        return len(self)
+
+
+ingredient_cache = IngredientCache(INGREDIENT_CACHE_SIZE)
+
+
+def warm_ingredient_cache() -> int:
+    return ingredient_cache.warm()
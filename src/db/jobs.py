@@ -1,25 +1,70 @@
 from typing import Optional
 from uuid import uuid4
 
+from src.config import INGESTION_MAX_ATTEMPTS, INGESTION_VISIBILITY_TIMEOUT
 from src.db.supabase_client import get_supabase_client
 
 
-def create_job(source_file: str) -> str:
+def _new_job_row(
+    source_file: str,
+    content_hash: Optional[str],
+    file_path: Optional[str],
+) -> dict:
+    return {
+        "id": str(uuid4()),
+        "status": "queued",
+        "source_file": source_file,
+        "content_hash": content_hash,
+        "file_path": file_path,
+    }
+
+
+# A completed job only counts as a duplicate when its meals were saved.
+DUPLICATE_JOB_FILTER = "saved.is.true,status.in.(processing,queued)"
+
+
+def _pick_job_for_hash(jobs: list[dict]) -> Optional[dict]:
+    """Latest usable job for a document: saved first, then in progress."""
+    saved = [job for job in jobs if job["status"] == "completed" and job.get("saved")]
+    pending = [job for job in jobs if job["status"] in ("processing", "queued")]
+    return (saved or pending or [None])[0]
+
+
+def create_job(
+    source_file: str,
+    content_hash: Optional[str] = None,
+    file_path: Optional[str] = None,
+) -> str:
     supabase = get_supabase_client()
-    job_id = str(uuid4())
-    supabase.table("ingestion_jobs").insert(
-        {"id": job_id, "status": "queued", "source_file": source_file}
-    ).execute()
-    return job_id
+    row = _new_job_row(source_file, content_hash, file_path)
+    supabase.table("ingestion_jobs").insert(row).execute()
+    return row["id"]
 
 
-def update_job(job_id: str, status: str, summary: Optional[str] = None, error: Optional[str] = None) -> None:
+def update_job(
+    job_id: str,
+    status: str,
+    summary: Optional[str] = None,
+    error: Optional[str] = None,
+    progress: Optional[dict] = None,
+    timings: Optional[dict] = None,
+    saved: Optional[bool] = None,
+) -> None:
     supabase = get_supabase_client()
     payload = {"status": status}
+    if status != "processing":
+        payload["locked_by"] = None
+        payload["locked_until"] = None
     if summary is not None:
         payload["summary"] = summary
     if error is not None:
         payload["error"] = error
+    if progress is not None:
+        payload["progress"] = progress
+    if timings is not None:
+        payload["timings"] = timings
+    if saved is not None:
+        payload["saved"] = saved
     supabase.table("ingestion_jobs").update(payload).eq("id", job_id).execute()
 
 
@@ -27,3 +72,43 @@ def get_job(job_id: str) -> Optional[dict]:
     supabase = get_supabase_client()
     result = supabase.table("ingestion_jobs").select("*").eq("id", job_id).limit(1).execute()
     return result.data[0] if result.data else None
+
+
+def find_job_by_hash(content_hash: str) -> Optional[dict]:
+    supabase = get_supabase_client()
+    result = (
+        supabase.table("ingestion_jobs")
+        .select("*")
+        .eq("content_hash", content_hash)
+        .or_(DUPLICATE_JOB_FILTER)
+        .order("enqueued_at", desc=True)
+        .limit(20)
+        .execute()
+    )
+    return _pick_job_for_hash(result.data or [])
+
+
+def claim_job(worker_id: str) -> Optional[dict]:
+    supabase = get_supabase_client()
+    result = supabase.rpc(
+        "claim_ingestion_job",
+        {
+            "p_worker_id": worker_id,
+            "p_visibility_timeout_seconds": INGESTION_VISIBILITY_TIMEOUT,
+            "p_max_attempts": INGESTION_MAX_ATTEMPTS,
+        },
+    ).execute()
+    return result.data[0] if result.data else None
+
+
+def extend_job_lease(job_id: str, worker_id: str) -> bool:
+    supabase = get_supabase_client()
+    result = supabase.rpc(
+        "extend_ingestion_job_lease",
+        {
+            "p_job_id": job_id,
+            "p_worker_id": worker_id,
+            "p_visibility_timeout_seconds": INGESTION_VISIBILITY_TIMEOUT,
+        },
+    ).execute()
+    return bool(result.data)
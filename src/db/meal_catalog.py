@@ -0,0 +1,306 @@
+"""
+Snapshot of the whole meal catalog held in NumPy arrays, so the plan
+generator and buscar_comidas filter meals in memory instead of sending one
+search per slot to the database.
+
+Numeric columns are float arrays with NaN for missing values (a NaN never
+passes a comparison, like NULL in SQL). Ingredients and tags are bitsets:
+one uint64 word per 64 distinct names, so "contains all of", "contains none
+of" and "has any of" are a few vectorized ANDs over every meal at once.
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable
+
+import numpy as np
+
+from src.config import MEAL_CATALOG_REFRESH_SECONDS
+from src.db.queries import (
+    _normalize_ingredient_name,
+    export_meals_page,
+    get_meal_versions_page,
+    get_meals_by_ids,
+)
+from src.db.query_cache import meal_cache
+
+logger = logging.getLogger(__name__)
+
+# PostgREST caps responses at 1000 rows by default.
+PAGE_SIZE = 1000
+
+
+def _vocabulary(values: Iterable[str]) -> dict[str, int]:
+    return {value: bit for bit, value in enumerate(sorted(set(values)))}
+
+
+def _bitsets(members: list[list[str]], vocabulary: dict[str, int]) -> np.ndarray:
+    words = max(1, (len(vocabulary) + 63) // 64)
+    bits = np.zeros((len(members), words), dtype=np.uint64)
+    rows = [row for row, names in enumerate(members) for _ in names]
+    if rows:
+        positions = np.array(
+            [vocabulary[name] for names in members for name in names], dtype=np.uint64
+        )
+        np.bitwise_or.at(
+            bits,
+            (np.array(rows), (positions // 64).astype(np.intp)),
+            np.left_shift(np.uint64(1), positions % 64),
+        )
+    return bits
+
+
+def _float_column(rows: list[dict], key: str) -> np.ndarray:
+    return np.array(
+        [np.nan if row.get(key) is None else row[key] for row in rows], dtype=np.float64
+    )
+
+
+def _meal_ingredient_names(row: dict) -> list[str]:
+    return list(
+        dict.fromkeys(
+            _normalize_ingredient_name(mi["ingredients"]["canonical_name"])
+            for mi in row.get("meal_ingredients") or []
+            if mi.get("ingredients")
+        )
+    )
+
+
+def _meal_tags(row: dict) -> list[str]:
+    return list(dict.fromkeys(tag.lower() for tag in row.get("tags") or []))
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """One immutable load of the catalog. rows[i] is the meal behind index i."""
+
+    rows: list[dict]
+    ids: np.ndarray
+    calories: np.ndarray
+    protein_g: np.ndarray
+    carbs_g: np.ndarray
+    fat_g: np.ndarray
+    meal_types: np.ndarray
+    meal_type_codes: dict[str, int]
+    ingredient_bits: np.ndarray
+    ingredient_positions: dict[str, int]
+    tag_bits: np.ndarray
+    tag_positions: dict[str, int]
+
+    @classmethod
+    def build(cls, rows: list[dict]) -> "CatalogSnapshot":
+        ingredients = [_meal_ingredient_names(row) for row in rows]
+        tags = [_meal_tags(row) for row in rows]
+        ingredient_positions = _vocabulary(name for names in ingredients for name in names)
+        tag_positions = _vocabulary(tag for row_tags in tags for tag in row_tags)
+        meal_type_codes = _vocabulary(row["meal_type"] for row in rows if row.get("meal_type"))
+        return cls(
+            rows=rows,
+            ids=np.array([row["id"] for row in rows], dtype=np.int64),
+            calories=_float_column(rows, "calories"),
+            protein_g=_float_column(rows, "protein_g"),
+            carbs_g=_float_column(rows, "carbs_g"),
+            fat_g=_float_column(rows, "fat_g"),
+            meal_types=np.array(
+                [meal_type_codes.get(row.get("meal_type"), -1) for row in rows],
+                dtype=np.int16,
+            ),
+            meal_type_codes=meal_type_codes,
+            ingredient_bits=_bitsets(ingredients, ingredient_positions),
+            ingredient_positions=ingredient_positions,
+            tag_bits=_bitsets(tags, tag_positions),
+            tag_positions=tag_positions,
+        )
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @staticmethod
+    def _pattern(
+        names: Iterable[str], positions: dict[str, int], bits: np.ndarray
+    ) -> tuple[np.ndarray, bool]:
+        """Bit pattern for names, and whether every name is known to the snapshot."""
+        pattern = np.zeros(bits.shape[1], dtype=np.uint64)
+        all_known = True
+        for name in names:
+            position = positions.get(name)
+            if position is None:
+                all_known = False
+                continue
+            pattern[position // 64] |= np.uint64(1) << np.uint64(position % 64)
+        return pattern, all_known
+
+    def mask(
+        self,
+        meal_type: str | None = None,
+        max_calories: float | None = None,
+        min_calories: float | None = None,
+        min_protein: float | None = None,
+        max_carbs: float | None = None,
+        must_include: list[str] | None = None,
+        exclude: list[str] | None = None,
+        tags: list[str] | None = None,
+    ) -> np.ndarray:
+        """Boolean mask over rows; the filters mean the same as in search_meals."""
+        mask = np.ones(len(self.rows), dtype=bool)
+        if meal_type:
+            code = self.meal_type_codes.get(meal_type)
+            if code is None:
+                return np.zeros_like(mask)
+            mask &= self.meal_types == code
+        if max_calories is not None:
+            mask &= self.calories <= max_calories
+        if min_calories is not None:
+            mask &= self.calories >= min_calories
+        if min_protein is not None:
+            mask &= self.protein_g >= min_protein
+        if max_carbs is not None:
+            mask &= self.carbs_g <= max_carbs
+        if must_include:
+            names = (_normalize_ingredient_name(name) for name in must_include)
+            wanted, all_known = self._pattern(
+                names, self.ingredient_positions, self.ingredient_bits
+            )
+            if not all_known:
+                return np.zeros_like(mask)
+            mask &= ((self.ingredient_bits & wanted) == wanted).all(axis=1)
+        if exclude:
+            names = (_normalize_ingredient_name(name) for name in exclude)
+            unwanted, _ = self._pattern(names, self.ingredient_positions, self.ingredient_bits)
+            mask &= ~(self.ingredient_bits & unwanted).any(axis=1)
+        if tags:
+            wanted, _ = self._pattern(
+                (tag.lower() for tag in tags), self.tag_positions, self.tag_bits
+            )
+            mask &= (self.tag_bits & wanted).any(axis=1)
+        return mask
+
+    def search(self, limit: int = 10, **filters) -> list[dict]:
+        """Matching meals ordered by id, like search_meals."""
+        indexes = np.flatnonzero(self.mask(**filters))[:limit]
+        return [self.rows[index] for index in indexes]
+
+
+class MealCatalog:
+    """
+    Keeps a CatalogSnapshot current. Reads go to memory; at most every
+    refresh_seconds (or right after a write made by this process) the catalog
+    asks the database which meals changed and reloads only those.
+
+    Rows handed out are shared with the snapshot: callers must not modify them.
+    """
+
+    def __init__(self, refresh_seconds: float, page_size: int = PAGE_SIZE) -> None:
+        self.refresh_seconds = refresh_seconds
+        self.page_size = page_size
+        self._snapshot: CatalogSnapshot | None = None
+        self._rows: dict[int, dict] = {}
+        self._versions: dict[int, str | None] = {}
+        self._checked_at = 0.0
+        self._generation = -1
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._snapshot) if self._snapshot is not None else 0
+
+    def _stale(self) -> bool:
+        return (
+            self._snapshot is None
+            or self._generation != meal_cache.generation
+            or time.monotonic() - self._checked_at >= self.refresh_seconds
+        )
+
+    def snapshot(self) -> CatalogSnapshot:
+        if self._stale():
+            with self._lock:
+                if self._stale():
+                    try:
+                        self._refresh()
+                    except Exception as exc:
+                        if self._snapshot is None:
+                            raise
+                        # Keep answering from the last snapshot and try again later.
+                        logger.warning("Could not refresh meal catalog: %s", exc)
+                        self._checked_at = time.monotonic()
+                        self._generation = meal_cache.generation
+        return self._snapshot
+
+    def search(self, limit: int = 10, **filters) -> list[dict]:
+        return self.snapshot().search(limit=limit, **filters)
+
+    def refresh(self) -> int:
+        with self._lock:
+            return self._refresh()
+
+    def _pages(self, fetch_page) -> Iterable[dict]:
+        # PostgREST's max-rows may cut a page below page_size, so a short page
+        # does not mean the end; only an empty one does.
+        after_id = None
+        while True:
+            page = fetch_page(after_id, self.page_size)
+            if not page:
+                return
+            yield from page
+            after_id = page[-1]["id"]
+
+    def _load(self, meal_ids: list[int]) -> list[dict]:
+        """Rows for meal_ids, asking again for ids a capped response left out."""
+        loaded = []
+        for start in range(0, len(meal_ids), self.page_size):
+            pending = meal_ids[start:start + self.page_size]
+            while pending:
+                rows = get_meals_by_ids(pending)
+                if not rows:
+                    break
+                loaded.extend(rows)
+                returned = {row["id"] for row in rows}
+                pending = [meal_id for meal_id in pending if meal_id not in returned]
+        return loaded
+
+    def _refresh(self) -> int:
+        """Bring the snapshot up to date; returns how many meals were (re)loaded."""
+        # Read before loading so a write that lands meanwhile triggers another refresh.
+        generation = meal_cache.generation
+
+        if self._snapshot is None:
+            loaded = list(self._pages(export_meals_page))
+            self._rows = {row["id"]: row for row in loaded}
+            self._versions = {row["id"]: row.get("updated_at") for row in loaded}
+        else:
+            versions = {
+                row["id"]: row.get("updated_at")
+                for row in self._pages(get_meal_versions_page)
+            }
+            changed = [
+                meal_id
+                for meal_id, version in versions.items()
+                if meal_id not in self._rows or self._versions.get(meal_id) != version
+            ]
+            loaded = self._load(changed)
+            # A changed meal deleted before it could be read is simply gone.
+            missing = set(changed) - {row["id"] for row in loaded}
+            removed = (self._rows.keys() - versions.keys()) | (missing & self._rows.keys())
+            for meal_id in removed:
+                del self._rows[meal_id]
+            for meal_id in missing:
+                versions.pop(meal_id, None)
+            self._rows.update((row["id"], row) for row in loaded)
+            self._versions = versions
+            if not loaded and not removed:
+                self._checked_at = time.monotonic()
+                self._generation = generation
+                return 0
+
+        self._snapshot = CatalogSnapshot.build([self._rows[key] for key in sorted(self._rows)])
+        self._checked_at = time.monotonic()
+        self._generation = generation
+        return len(loaded)
+
+
+meal_catalog = MealCatalog(MEAL_CATALOG_REFRESH_SECONDS)
+
+
+def warm_meal_catalog() -> int:
+    meal_catalog.refresh()
+    return len(meal_catalog)
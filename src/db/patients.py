@@ -0,0 +1,268 @@
+"""
+Patient profiles, stored in the Supabase `patients` table or, for local
+work without a database, in a SQLite file (PATIENTS_BACKEND).
+
+Each row keeps the output of calcular_requerimientos next to the data it
+was computed from. requerimientos_key fingerprints exactly the fields the
+formula reads, so an update that only touches the name, allergies or
+preferences reuses the stored requirements and one that changes the
+weight, activity level, objective (or age, height, sex, conditions)
+recomputes them.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+from src.config import PATIENTS_BACKEND, PATIENTS_SQLITE_PATH
+from src.db.supabase_client import get_supabase_client
+from src.schemas.patient import NutritionalRequirements, PatientData
+from src.tools.calculations import calcular_requerimientos
+
+# Bump when calcular_requerimientos changes; stored requirements computed
+# under another version are recomputed the next time the patient is read.
+REQUIREMENTS_VERSION = 1
+
+PATIENT_FIELDS = tuple(PatientData.model_fields)
+LIST_FIELDS = ("condiciones", "alergias", "restricciones", "preferencias")
+
+
+class PatientStore(ABC):
+    """
+    Row storage for patient profiles. Rows are plain dicts with the
+    PatientData fields (enums as their values), id, requerimientos (a dict),
+    requerimientos_key, created_at and updated_at.
+    """
+
+    @abstractmethod
+    def insert(self, row: dict) -> dict: ...
+
+    @abstractmethod
+    def get(self, patient_id: int) -> Optional[dict]: ...
+
+    @abstractmethod
+    def list(self, limit: int, cursor: Optional[int] = None) -> list[dict]: ...
+
+    @abstractmethod
+    def update(self, patient_id: int, changes: dict) -> Optional[dict]: ...
+
+    @abstractmethod
+    def delete(self, patient_id: int) -> bool: ...
+
+
+class SupabasePatientStore(PatientStore):
+    def insert(self, row: dict) -> dict:
+        supabase = get_supabase_client()
+        result = supabase.table("patients").insert(row).execute()
+        return result.data[0]
+
+    def get(self, patient_id: int) -> Optional[dict]:
+        supabase = get_supabase_client()
+        result = (
+            supabase.table("patients").select("*").eq("id", patient_id).limit(1).execute()
+        )
+        return result.data[0] if result.data else None
+
+    def list(self, limit: int, cursor: Optional[int] = None) -> list[dict]:
+        supabase = get_supabase_client()
+        query = supabase.table("patients").select("*")
+        if cursor is not None:
+            query = query.gt("id", cursor)
+        return query.order("id").limit(limit).execute().data or []
+
+    def update(self, patient_id: int, changes: dict) -> Optional[dict]:
+        supabase = get_supabase_client()
+        result = supabase.table("patients").update(changes).eq("id", patient_id).execute()
+        return result.data[0] if result.data else None
+
+    def delete(self, patient_id: int) -> bool:
+        supabase = get_supabase_client()
+        result = supabase.table("patients").delete().eq("id", patient_id).execute()
+        return bool(result.data)
+
+
+class SqlitePatientStore(PatientStore):
+    """Same table on a local SQLite file; lists and requerimientos are JSON text."""
+
+    def __init__(self, path: str) -> None:
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS patients ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, nombre TEXT NOT NULL, "
+            "edad INTEGER NOT NULL, sexo TEXT NOT NULL, peso_kg REAL NOT NULL, "
+            "altura_cm REAL NOT NULL, objetivo TEXT NOT NULL, "
+            "nivel_actividad TEXT NOT NULL, condiciones TEXT NOT NULL, "
+            "alergias TEXT NOT NULL, restricciones TEXT NOT NULL, "
+            "preferencias TEXT NOT NULL, requerimientos TEXT NOT NULL, "
+            "requerimientos_key TEXT NOT NULL, created_at TEXT NOT NULL, "
+            "updated_at TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _encode(row: dict) -> dict:
+        encoded = dict(row)
+        for column in (*LIST_FIELDS, "requerimientos"):
+            if column in encoded:
+                encoded[column] = json.dumps(encoded[column], ensure_ascii=False)
+        return encoded
+
+    @staticmethod
+    def _decode(row: sqlite3.Row) -> dict:
+        decoded = dict(row)
+        for column in (*LIST_FIELDS, "requerimientos"):
+            decoded[column] = json.loads(decoded[column])
+        return decoded
+
+    def _select(self, patient_id: int) -> Optional[dict]:
+        row = self._conn.execute(
+            "SELECT * FROM patients WHERE id = ?", (patient_id,)
+        ).fetchone()
+        return self._decode(row) if row is not None else None
+
+    def insert(self, row: dict) -> dict:
+        now = datetime.now(timezone.utc).isoformat()
+        encoded = self._encode({**row, "created_at": now, "updated_at": now})
+        columns = ", ".join(encoded)
+        placeholders = ", ".join("?" * len(encoded))
+        with self._lock:
+            cursor = self._conn.execute(
+                f"INSERT INTO patients ({columns}) VALUES ({placeholders})",
+                list(encoded.values()),
+            )
+            self._conn.commit()
+            return self._select(cursor.lastrowid)
+
+    def get(self, patient_id: int) -> Optional[dict]:
+        with self._lock:
+            return self._select(patient_id)
+
+    def list(self, limit: int, cursor: Optional[int] = None) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM patients WHERE id > ? ORDER BY id LIMIT ?",
+                (cursor if cursor is not None else 0, limit),
+            ).fetchall()
+        return [self._decode(row) for row in rows]
+
+    def update(self, patient_id: int, changes: dict) -> Optional[dict]:
+        encoded = self._encode(
+            {**changes, "updated_at": datetime.now(timezone.utc).isoformat()}
+        )
+        assignments = ", ".join(f"{column} = ?" for column in encoded)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE patients SET {assignments} WHERE id = ?",
+                [*encoded.values(), patient_id],
+            )
+            self._conn.commit()
+            return self._select(patient_id)
+
+    def delete(self, patient_id: int) -> bool:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM patients WHERE id = ?", (patient_id,))
+            self._conn.commit()
+            return cursor.rowcount > 0
+
+
+# Largest page list_patients returns, so a listing never reads the whole table.
+MAX_LIST_LIMIT = 100
+
+_store: PatientStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_patient_store() -> PatientStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            if PATIENTS_BACKEND == "sqlite":
+                _store = SqlitePatientStore(PATIENTS_SQLITE_PATH)
+            else:
+                _store = SupabasePatientStore()
+    return _store
+
+
+def requirements_key(patient: PatientData) -> str:
+    """Fingerprint of every input calcular_requerimientos reads."""
+    inputs = [
+        REQUIREMENTS_VERSION,
+        patient.edad,
+        patient.sexo.value,
+        patient.peso_kg,
+        patient.altura_cm,
+        patient.objetivo.value,
+        patient.nivel_actividad.value,
+        sorted({c.lower() for c in patient.condiciones}),
+    ]
+    return hashlib.sha256(json.dumps(inputs).encode("utf-8")).hexdigest()
+
+
+def _requirements_columns(patient: PatientData) -> dict:
+    return {
+        "requerimientos": calcular_requerimientos(patient).model_dump(),
+        "requerimientos_key": requirements_key(patient),
+    }
+
+
+def patient_from_row(row: dict) -> PatientData:
+    return PatientData(**{field: row[field] for field in PATIENT_FIELDS})
+
+
+def requirements_from_row(row: dict) -> NutritionalRequirements:
+    return NutritionalRequirements(**row["requerimientos"])
+
+
+def create_patient(patient: PatientData) -> dict:
+    row = patient.model_dump(mode="json")
+    return get_patient_store().insert({**row, **_requirements_columns(patient)})
+
+
+def get_patient(patient_id: int) -> Optional[dict]:
+    store = get_patient_store()
+    row = store.get(patient_id)
+    if row is None:
+        return None
+    patient = patient_from_row(row)
+    if row["requerimientos_key"] != requirements_key(patient):
+        row = store.update(patient_id, _requirements_columns(patient)) or row
+    return row
+
+
+def list_patients(limit: int = 20, cursor: Optional[int] = None) -> list[dict]:
+    """One keyset page ordered by id; limit is capped at MAX_LIST_LIMIT."""
+    return get_patient_store().list(max(1, min(limit, MAX_LIST_LIMIT)), cursor)
+
+
+def update_patient(patient_id: int, changes: dict) -> Optional[dict]:
+    """
+    Apply a partial update (PatientData field names). Raises
+    pydantic.ValidationError when the merged patient is invalid.
+    """
+    store = get_patient_store()
+    row = store.get(patient_id)
+    if row is None:
+        return None
+    patient = PatientData(**{**patient_from_row(row).model_dump(), **changes})
+    payload = {
+        field: value
+        for field, value in patient.model_dump(mode="json").items()
+        if field in changes
+    }
+    if requirements_key(patient) != row["requerimientos_key"]:
+        payload.update(_requirements_columns(patient))
+    if not payload:
+        return row
+    return store.update(patient_id, payload)
+
+
+def delete_patient(patient_id: int) -> bool:
+    return get_patient_store().delete(patient_id)
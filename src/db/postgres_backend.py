@@ -0,0 +1,376 @@
+"""
+Meal queries as hand-written SQL over a pooled psycopg connection to
+SUPABASE_DB_URL, selected with MEALS_BACKEND=postgres. Rows come back in the
+same nested shape PostgREST returns for MEAL_SELECT, so callers do not care
+which backend answered.
+"""
+import re
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterable, Iterator
+
+import psycopg
+from psycopg import sql
+from psycopg.rows import dict_row
+from psycopg.types.json import Jsonb
+from sqlalchemy.pool import QueuePool
+
+from src.config import (
+    POSTGRES_POOL_MAX_OVERFLOW,
+    POSTGRES_POOL_SIZE,
+    POSTGRES_PREPARE_THRESHOLD,
+    SUPABASE_DB_URL,
+)
+from src.db.ingredient_cache import ingredient_cache
+from src.db.queries import (
+    MEAL_COLUMNS,
+    _bulk_meal_row,
+    _ingredient_entries,
+    _ingredient_names,
+    _meal_ingredient_rows_for_meals,
+    _meal_row,
+    _update_meal_params,
+)
+from src.schemas.meal import ExtractedMeal
+
+# json_build_object keeps numbers as JSON numbers, exactly as PostgREST
+# serialises them, instead of handing back Decimals.
+def _meal_json(columns: tuple[str, ...]) -> str:
+    return (
+        "json_build_object("
+        + ", ".join(f"'{column}', m.{column}" for column in columns)
+        + """, 'meal_ingredients', coalesce((
+        select json_agg(json_build_object(
+            'quantity', mi.quantity,
+            'unit', mi.unit,
+            'ingredients', json_build_object('canonical_name', i.canonical_name)
+        ))
+        from meal_ingredients mi
+        join ingredients i on i.id = mi.ingredient_id
+        where mi.meal_id = m.id
+    ), '[]'::json))"""
+    )
+
+
+_MEAL_JSON = _meal_json(MEAL_COLUMNS)
+
+# A single statement text per query, with optional filters switched off by
+# NULL parameters, so each one is prepared once per connection.
+GET_MEAL_SQL = f"select {_MEAL_JSON} as meal from meals m where m.id = %(id)s"
+
+SEARCH_MEALS_SQL = f"""
+select {_MEAL_JSON} as meal
+from meals m
+where (%(cursor)s::bigint is null or m.id > %(cursor)s)
+  and (%(name_pattern)s::text is null or m.name ilike %(name_pattern)s)
+  and (%(meal_type)s::text is null or m.meal_type = %(meal_type)s)
+  and (%(max_calories)s::int is null or m.calories <= %(max_calories)s)
+  and (%(min_protein)s::float8 is null or m.protein_g >= %(min_protein)s)
+  and (%(must_include)s::text[] is null or m.ingredient_names @> %(must_include)s)
+  and (%(exclude)s::text[] is null or not m.ingredient_names && %(exclude)s)
+order by m.id
+limit %(limit)s
+"""
+
+# to_json gives the same timestamp text PostgREST and GET_MEAL_SQL return.
+MEAL_VERSION_SQL = "select to_json(updated_at) as version from meals where id = %(id)s"
+
+UPDATE_MEAL_SQL = """
+select update_meal_with_ingredients(%(p_meal_id)s, %(p_meal)s, %(p_ingredients)s) as meal
+"""
+
+EXPORT_SQL = f"""
+select {_MEAL_JSON} as meal
+from meals m
+where (%(after_id)s::bigint is null or m.id > %(after_id)s)
+order by m.id
+limit %(limit)s
+"""
+
+# pgvector has no JSON cast, so the embedding is serialised as its text
+# form ("[0.1,...]"), the same string PostgREST returns.
+EXPORT_WITH_EMBEDDINGS_SQL = EXPORT_SQL.replace(
+    _MEAL_JSON, _meal_json(MEAL_COLUMNS + ("embedding",))
+)
+
+MEAL_VERSIONS_SQL = """
+select id, to_json(updated_at) as updated_at
+from meals
+where (%(after_id)s::bigint is null or id > %(after_id)s)
+order by id
+limit %(limit)s
+"""
+
+MEALS_BY_IDS_SQL = f"select {_MEAL_JSON} as meal from meals m where m.id = any(%(ids)s)"
+
+EXISTING_NAMES_SQL = "select name from meals where name = any(%(names)s)"
+
+DELETE_MEAL_SQL = "delete from meals where id = %(id)s"
+
+UPSERT_INGREDIENTS_SQL = """
+insert into ingredients (canonical_name)
+select unnest(%(names)s::text[])
+on conflict (canonical_name) do nothing
+returning id, canonical_name
+"""
+
+WARM_INGREDIENTS_SQL = "select id, canonical_name from ingredients limit %(limit)s"
+
+SELECT_INGREDIENTS_SQL = """
+select id, canonical_name from ingredients where canonical_name = any(%(names)s)
+"""
+
+@lru_cache(maxsize=8)
+def _insert_meal_sql(columns: tuple[str, ...]) -> sql.Composed:
+    """INSERT for one meal row with these columns; cached so the text is stable."""
+    return sql.SQL("insert into meals ({columns}) values ({values}) returning id").format(
+        columns=sql.SQL(", ").join(sql.Identifier(column) for column in columns),
+        values=sql.SQL(", ").join(
+            sql.SQL("{}::vector").format(sql.Placeholder(column))
+            if column == "embedding"
+            else sql.Placeholder(column)
+            for column in columns
+        ),
+    )
+
+
+INSERT_MEAL_INGREDIENT_SQL = """
+insert into meal_ingredients (meal_id, ingredient_id, quantity, unit)
+values (%(meal_id)s, %(ingredient_id)s, %(quantity)s, %(unit)s)
+"""
+
+# Supabase closes idle connections; recycle them before that happens.
+POOL_RECYCLE_SECONDS = 1800
+
+_pool: QueuePool | None = None
+_pool_lock = threading.Lock()
+
+
+def _conninfo(url: str) -> str:
+    # SQLAlchemy-style URLs (postgresql+psycopg://) are not valid libpq URLs.
+    return re.sub(r"^postgres(ql)?\+\w+://", "postgresql://", url)
+
+
+def _connect() -> psycopg.Connection:
+    return psycopg.connect(
+        _conninfo(SUPABASE_DB_URL),
+        row_factory=dict_row,
+        prepare_threshold=int(POSTGRES_PREPARE_THRESHOLD) if POSTGRES_PREPARE_THRESHOLD else None,
+    )
+
+
+def get_pool() -> QueuePool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                if not SUPABASE_DB_URL:
+                    raise ValueError("SUPABASE_DB_URL is missing for MEALS_BACKEND=postgres")
+                _pool = QueuePool(
+                    _connect,
+                    pool_size=POSTGRES_POOL_SIZE,
+                    max_overflow=POSTGRES_POOL_MAX_OVERFLOW,
+                    recycle=POOL_RECYCLE_SECONDS,
+                )
+    return _pool
+
+
+@contextmanager
+def _transaction() -> Iterator[psycopg.Connection]:
+    pooled = get_pool().connect()
+    connection = pooled.driver_connection
+    try:
+        yield connection
+        connection.commit()
+    except Exception:
+        if connection.broken:
+            pooled.invalidate()
+        else:
+            connection.rollback()
+        raise
+    finally:
+        pooled.close()
+
+
+def get_meal_by_id(meal_id: int) -> dict | None:
+    with _transaction() as connection:
+        row = connection.execute(GET_MEAL_SQL, {"id": meal_id}).fetchone()
+    return row["meal"] if row else None
+
+
+def get_meal_version(meal_id: int) -> str | None:
+    with _transaction() as connection:
+        row = connection.execute(MEAL_VERSION_SQL, {"id": meal_id}).fetchone()
+    return row["version"] if row else None
+
+
+def search_meals(
+    must_include: list[str] | None = None,
+    exclude: list[str] | None = None,
+    max_calories: int | None = None,
+    min_protein: float | None = None,
+    meal_type: str | None = None,
+    limit: int = 10,
+    cursor: int | None = None,
+    name_query: str | None = None,
+) -> list[dict]:
+    params = {
+        "cursor": cursor,
+        "name_pattern": f"%{name_query}%" if name_query else None,
+        "meal_type": meal_type or None,
+        "max_calories": max_calories,
+        "min_protein": min_protein,
+        "must_include": _ingredient_names(must_include) if must_include else None,
+        "exclude": _ingredient_names(exclude) if exclude else None,
+        "limit": limit,
+    }
+    with _transaction() as connection:
+        rows = connection.execute(SEARCH_MEALS_SQL, params).fetchall()
+    return [row["meal"] for row in rows]
+
+
+def get_existing_meal_names(names: Iterable[str]) -> set[str]:
+    unique_names = list(dict.fromkeys(names))
+    if not unique_names:
+        return set()
+    with _transaction() as connection:
+        rows = connection.execute(EXISTING_NAMES_SQL, {"names": unique_names}).fetchall()
+    return {row["name"] for row in rows}
+
+
+def update_meal(
+    meal_id: int,
+    meal_data: dict,
+    ingredient_entries: list[dict] | None = None,
+) -> dict | None:
+    params = _update_meal_params(meal_id, meal_data, ingredient_entries)
+    params["p_meal"] = Jsonb(params["p_meal"])
+    if params["p_ingredients"] is not None:
+        params["p_ingredients"] = Jsonb(params["p_ingredients"])
+    with _transaction() as connection:
+        row = connection.execute(UPDATE_MEAL_SQL, params).fetchone()
+    return row["meal"]
+
+
+def delete_meal(meal_id: int) -> None:
+    with _transaction() as connection:
+        connection.execute(DELETE_MEAL_SQL, {"id": meal_id})
+
+
+def _resolve_ingredient_ids(
+    connection: psycopg.Connection, names: Iterable[str]
+) -> dict[str, int]:
+    normalized_names = _ingredient_names(names)
+    if not normalized_names:
+        return {}
+
+    if not ingredient_cache.warmed:
+        rows = connection.execute(WARM_INGREDIENTS_SQL, {"limit": ingredient_cache.max_size})
+        ingredient_cache.put_many({row["canonical_name"]: row["id"] for row in rows})
+        ingredient_cache.mark_warmed()
+    ingredient_ids = ingredient_cache.get_many(normalized_names)
+    missing = [name for name in normalized_names if name not in ingredient_ids]
+    if not missing:
+        return ingredient_ids
+
+    rows = connection.execute(UPSERT_INGREDIENTS_SQL, {"names": missing}).fetchall()
+    resolved = {row["canonical_name"]: row["id"] for row in rows}
+    still_missing = [name for name in missing if name not in resolved]
+    if still_missing:
+        rows = connection.execute(SELECT_INGREDIENTS_SQL, {"names": still_missing}).fetchall()
+        resolved.update({row["canonical_name"]: row["id"] for row in rows})
+
+    # Only cached once the transaction commits; see save_meals.
+    ingredient_ids.update(resolved)
+    return ingredient_ids
+
+
+def _vector_literal(embedding: list[float]) -> str:
+    return "[" + ",".join(repr(float(value)) for value in embedding) + "]"
+
+
+def _insert_meals(meal_rows: list[dict], entries_per_meal: list[list[dict]]) -> list[int]:
+    """
+    Same contract as queries._insert_meals, in one transaction: either every
+    meal is stored with its ingredients or nothing is.
+    """
+    meal_rows = [
+        {**row, "embedding": _vector_literal(row["embedding"])}
+        if row.get("embedding") is not None
+        else row
+        for row in meal_rows
+    ]
+    insert_meal_sql = _insert_meal_sql(tuple(meal_rows[0]))
+
+    ingredient_ids: dict[str, int] = {}
+    try:
+        with _transaction() as connection:
+            ingredient_ids = _resolve_ingredient_ids(
+                connection, (entry["name"] for entries in entries_per_meal for entry in entries)
+            )
+            with connection.cursor() as cursor:
+                cursor.executemany(insert_meal_sql, meal_rows, returning=True)
+                meal_ids = []
+                while True:
+                    meal_ids.append(cursor.fetchone()["id"])
+                    if not cursor.nextset():
+                        break
+
+                rows = _meal_ingredient_rows_for_meals(meal_ids, entries_per_meal, ingredient_ids)
+                if rows:
+                    cursor.executemany(INSERT_MEAL_INGREDIENT_SQL, rows)
+    except Exception:
+        # A cached id may point to an ingredient that no longer exists.
+        ingredient_cache.invalidate(ingredient_ids)
+        raise
+
+    ingredient_cache.put_many(ingredient_ids)
+    return meal_ids
+
+
+def save_meals(
+    meals: list[tuple[ExtractedMeal, list[float]]],
+    source_document: str,
+) -> list[int]:
+    if not meals:
+        return []
+    return _insert_meals(
+        [_meal_row(meal, embedding, source_document) for meal, embedding in meals],
+        [_ingredient_entries(meal) for meal, _ in meals],
+    )
+
+
+def create_meals(meals: list[tuple[dict, list[dict]]]) -> list[int]:
+    if not meals:
+        return []
+    return _insert_meals(
+        [_bulk_meal_row(meal_data, entries) for meal_data, entries in meals],
+        [entries for _, entries in meals],
+    )
+
+
+def export_meals_page(
+    after_id: int | None,
+    limit: int,
+    include_embeddings: bool = False,
+) -> list[dict]:
+    query = EXPORT_WITH_EMBEDDINGS_SQL if include_embeddings else EXPORT_SQL
+    with _transaction() as connection:
+        rows = connection.execute(query, {"after_id": after_id, "limit": limit}).fetchall()
+    return [row["meal"] for row in rows]
+
+
+def get_meal_versions_page(after_id: int | None, limit: int) -> list[dict]:
+    with _transaction() as connection:
+        return connection.execute(
+            MEAL_VERSIONS_SQL, {"after_id": after_id, "limit": limit}
+        ).fetchall()
+
+
+def get_meals_by_ids(meal_ids: list[int]) -> list[dict]:
+    if not meal_ids:
+        return []
+    with _transaction() as connection:
+        rows = connection.execute(MEALS_BY_IDS_SQL, {"ids": list(meal_ids)}).fetchall()
+    return [row["meal"] for row in rows]
@@ -1,9 +1,42 @@
+from functools import wraps
 from typing import Iterable
 import re
 import unicodedata
 
+from src.config import MEALS_BACKEND
+from src.db.ingredient_cache import ingredient_cache
+from src.db.query_cache import meal_cache
 from src.db.supabase_client import get_supabase_client
 from src.schemas.meal import ExtractedMeal
+from src.utils.embeddings import embed_text
+
+# Everything the API and the agent tools read from a meal. The embedding is
+# left out on purpose: it is by far the largest column and nobody reads it.
+MEAL_COLUMNS = (
+    "id", "name", "description", "meal_type", "calories", "protein_g", "carbs_g",
+    "fat_g", "fiber_g", "prep_time_mins", "servings", "tags", "source_document",
+    "updated_at",
+)
+MEAL_SELECT = (
+    ", ".join(MEAL_COLUMNS)
+    + ", meal_ingredients(quantity, unit, ingredients(canonical_name))"
+)
+
+
+def _pluggable(func):
+    """
+    Send the call to src.db.postgres_backend when MEALS_BACKEND is "postgres".
+    The PostgREST implementation stays reachable through inspect.unwrap().
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if MEALS_BACKEND == "postgres":
+            from src.db import postgres_backend
+
+            return getattr(postgres_backend, func.__name__)(*args, **kwargs)
+        return func(*args, **kwargs)
+
+    return wrapper
 
 
 def check_meal_exists(name: str) -> bool:
@@ -12,25 +45,123 @@ def check_meal_exists(name: str) -> bool:
     return bool(result.data)
 
 
-def _get_or_create_ingredient(canonical_name: str) -> int:
+@_pluggable
+def get_existing_meal_names(names: Iterable[str]) -> set[str]:
+    unique_names = list(dict.fromkeys(names))
+    if not unique_names:
+        return set()
     supabase = get_supabase_client()
-    normalized_name = _normalize_ingredient_name(canonical_name)
-    existing = (
-        supabase.table("ingredients")
-        .select("id")
-        .eq("canonical_name", normalized_name)
-        .limit(1)
-        .execute()
-    )
-    if existing.data:
-        return existing.data[0]["id"]
+    result = supabase.table("meals").select("name").in_("name", unique_names).execute()
+    return {row["name"] for row in result.data or []}
 
-    created = (
-        supabase.table("ingredients")
-        .insert({"canonical_name": normalized_name})
-        .execute()
+
+def _cached_ingredient_ids(normalized_names: list[str]) -> tuple[dict[str, int], list[str]]:
+    """Ids the cache already knows, and the names still to resolve in the database."""
+    ingredient_ids = ingredient_cache.get_many(normalized_names)
+    return ingredient_ids, [name for name in normalized_names if name not in ingredient_ids]
+
+
+def _upsert_ingredients(supabase, names: list[str]):
+    # ON CONFLICT DO NOTHING keeps concurrent workers creating the same
+    # ingredient from failing on the unique constraint; rows created by
+    # someone else are not returned, so they are looked up afterwards.
+    return supabase.table("ingredients").upsert(
+        [{"canonical_name": name} for name in names],
+        on_conflict="canonical_name",
+        ignore_duplicates=True,
     )
-    return created.data[0]["id"]
+
+
+def _select_ingredients(supabase, names: list[str]):
+    return supabase.table("ingredients").select("id, canonical_name").in_("canonical_name", names)
+
+
+def _ingredient_ids_by_name(rows: list[dict] | None) -> dict[str, int]:
+    return {row["canonical_name"]: row["id"] for row in rows or []}
+
+
+def _resolve_ingredient_ids(names: Iterable[str]) -> dict[str, int]:
+    normalized_names = _ingredient_names(names)
+    if not normalized_names:
+        return {}
+
+    if not ingredient_cache.warmed:
+        ingredient_cache.warm()
+    ingredient_ids, missing = _cached_ingredient_ids(normalized_names)
+    if not missing:
+        return ingredient_ids
+
+    supabase = get_supabase_client()
+    resolved = _ingredient_ids_by_name(_upsert_ingredients(supabase, missing).execute().data)
+    still_missing = [name for name in missing if name not in resolved]
+    if still_missing:
+        result = _select_ingredients(supabase, still_missing).execute()
+        resolved.update(_ingredient_ids_by_name(result.data))
+
+    ingredient_cache.put_many(resolved)
+    ingredient_ids.update(resolved)
+    return ingredient_ids
+
+
+def _ingredient_names(names: Iterable[str]) -> list[str]:
+    return list(dict.fromkeys(_normalize_ingredient_name(name) for name in names))
+
+
+def _text_array_literal(values: Iterable[str]) -> str:
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"') for value in values)
+    return "{" + ",".join(f'"{value}"' for value in escaped) + "}"
+
+
+def _search_cache_arguments(arguments: dict) -> dict:
+    """Equivalent searches share a cache entry: ingredient order and name case do not matter."""
+    name_query = (arguments.get("name_query") or "").strip().lower()
+    return {
+        **arguments,
+        "must_include": sorted(_ingredient_names(arguments["must_include"] or [])),
+        "exclude": sorted(_ingredient_names(arguments["exclude"] or [])),
+        "name_query": name_query or None,
+        "meal_type": arguments.get("meal_type") or None,
+    }
+
+
+def _meal_ingredient_rows(
+    meal_id: int,
+    ingredient_entries: list[dict],
+    ingredient_ids: dict[str, int],
+) -> list[dict]:
+    return [
+        {
+            "meal_id": meal_id,
+            "ingredient_id": ingredient_ids[_normalize_ingredient_name(ingredient["name"])],
+            "quantity": ingredient.get("quantity"),
+            "unit": ingredient.get("unit"),
+        }
+        for ingredient in ingredient_entries
+    ]
+
+
+def _meal_ingredient_rows_for_meals(
+    meal_ids: list[int],
+    entries_per_meal: list[list[dict]],
+    ingredient_ids: dict[str, int],
+) -> list[dict]:
+    rows = []
+    for meal_id, entries in zip(meal_ids, entries_per_meal):
+        rows.extend(_meal_ingredient_rows(meal_id, entries, ingredient_ids))
+    return rows
+
+
+def _insert_meal_ingredients(rows: list[dict], ingredient_ids: dict[str, int]) -> None:
+    if not rows:
+        return
+    supabase = get_supabase_client()
+    try:
+        supabase.table("meal_ingredients").insert(rows).execute()
+    except Exception:
+        # A cached id may point to an ingredient that no longer exists; drop
+        # the names involved so the next attempt resolves them again.
+        ingredient_cache.invalidate(ingredient_ids)
+        raise
 
 
 INGREDIENT_ALIASES = {
@@ -59,51 +190,81 @@ def _normalize_ingredient_name(value: str) -> str:
     return INGREDIENT_ALIASES.get(normalized, normalized)
 
 
-def save_meal(meal: ExtractedMeal, embedding: list[float], source_document: str) -> int:
+def _ingredient_entries(meal: ExtractedMeal) -> list[dict]:
+    return [
+        {"name": item.name, "quantity": item.quantity, "unit": item.unit}
+        for item in meal.ingredients
+    ]
+
+
+def _meal_row(meal: ExtractedMeal, embedding: list[float], source_document: str) -> dict:
+    return {
+        "name": meal.name,
+        "description": meal.description,
+        "meal_type": meal.meal_type.value,
+        "calories": meal.calories,
+        "protein_g": meal.protein_g,
+        "carbs_g": meal.carbs_g,
+        "fat_g": meal.fat_g,
+        "fiber_g": meal.fiber_g,
+        "prep_time_mins": meal.prep_time_mins,
+        "tags": meal.tags,
+        "source_document": source_document,
+        "embedding": embedding,
+        "ingredient_names": _ingredient_names(item.name for item in meal.ingredients),
+    }
+
+
+def _insert_meals(meal_rows: list[dict], entries_per_meal: list[list[dict]]) -> list[int]:
+    """
+    Persist several meals with a fixed number of round trips: one upsert plus
+    one lookup for all ingredient names, one insert for the meals and one for
+    every meal_ingredients row. Returns meal ids in the same order as the rows.
+    """
     supabase = get_supabase_client()
-    meal_insert = (
-        supabase.table("meals")
-        .insert(
-            {
-                "name": meal.name,
-                "description": meal.description,
-                "meal_type": meal.meal_type.value,
-                "calories": meal.calories,
-                "protein_g": meal.protein_g,
-                "carbs_g": meal.carbs_g,
-                "fat_g": meal.fat_g,
-                "fiber_g": meal.fiber_g,
-                "prep_time_mins": meal.prep_time_mins,
-                "tags": meal.tags,
-                "source_document": source_document,
-                "embedding": embedding,
-            }
-        )
-        .execute()
+    ingredient_ids = _resolve_ingredient_ids(
+        entry["name"] for entries in entries_per_meal for entry in entries
     )
-    meal_id = meal_insert.data[0]["id"]
 
-    for ingredient in meal.ingredients:
-        ingredient_id = _get_or_create_ingredient(ingredient.name)
-        quantity = ingredient.quantity
-        unit = ingredient.unit
-        supabase.table("meal_ingredients").insert(
-            {
-                "meal_id": meal_id,
-                "ingredient_id": ingredient_id,
-                "quantity": quantity,
-                "unit": unit,
-            }
-        ).execute()
+    meal_insert = supabase.table("meals").insert(meal_rows).execute()
+    meal_ids = [row["id"] for row in meal_insert.data]
+
+    rows = _meal_ingredient_rows_for_meals(meal_ids, entries_per_meal, ingredient_ids)
+    try:
+        _insert_meal_ingredients(rows, ingredient_ids)
+    except Exception:
+        # Do not leave meals without ingredients behind.
+        supabase.table("meals").delete().in_("id", meal_ids).execute()
+        raise
+
+    return meal_ids
+
+
+@meal_cache.invalidates
+@_pluggable
+def save_meals(
+    meals: list[tuple[ExtractedMeal, list[float]]],
+    source_document: str,
+) -> list[int]:
+    if not meals:
+        return []
+    return _insert_meals(
+        [_meal_row(meal, embedding, source_document) for meal, embedding in meals],
+        [_ingredient_entries(meal) for meal, _ in meals],
+    )
 
-    return meal_id
+
+def save_meal(meal: ExtractedMeal, embedding: list[float], source_document: str) -> int:
+    return save_meals([(meal, embedding)], source_document)[0]
 
 
+@meal_cache.read_through()
+@_pluggable
 def get_meal_by_id(meal_id: int) -> dict | None:
     supabase = get_supabase_client()
     result = (
         supabase.table("meals")
-        .select("*, meal_ingredients(quantity, unit, ingredients(canonical_name))")
+        .select(MEAL_SELECT)
         .eq("id", meal_id)
         .limit(1)
         .execute()
@@ -111,85 +272,126 @@ def get_meal_by_id(meal_id: int) -> dict | None:
     return result.data[0] if result.data else None
 
 
+@meal_cache.read_through()
+@_pluggable
+def get_meal_version(meal_id: int) -> str | None:
+    """updated_at of a meal, read without the ingredient join; used for ETags."""
+    supabase = get_supabase_client()
+    result = supabase.table("meals").select("updated_at").eq("id", meal_id).limit(1).execute()
+    return result.data[0]["updated_at"] if result.data else None
+
+
+@meal_cache.invalidates
 def create_meal(meal_data: dict, ingredient_entries: list[dict]) -> int:
+    return _insert_meals(
+        [_bulk_meal_row(meal_data, ingredient_entries)], [ingredient_entries]
+    )[0]
+
+
+def _bulk_meal_row(meal_data: dict, ingredient_entries: list[dict]) -> dict:
+    return {
+        **meal_data,
+        "ingredient_names": _ingredient_names(entry["name"] for entry in ingredient_entries),
+    }
+
+
+@meal_cache.invalidates
+@_pluggable
+def create_meals(meals: list[tuple[dict, list[dict]]]) -> list[int]:
+    """
+    create_meal for many (meal_data, ingredient_entries) pairs at once, with
+    the round trips of save_meals. Every meal_data must have the same keys.
+    """
+    if not meals:
+        return []
+    return _insert_meals(
+        [_bulk_meal_row(meal_data, entries) for meal_data, entries in meals],
+        [entries for _, entries in meals],
+    )
+
+
+@_pluggable
+def export_meals_page(
+    after_id: int | None,
+    limit: int,
+    include_embeddings: bool = False,
+) -> list[dict]:
+    """One keyset page of the catalog, ordered by id."""
+    supabase = get_supabase_client()
+    select = MEAL_SELECT + (", embedding" if include_embeddings else "")
+    query = supabase.table("meals").select(select)
+    if after_id is not None:
+        query = query.gt("id", after_id)
+    result = query.order("id", desc=False).limit(limit).execute()
+    return result.data or []
+
+
+@_pluggable
+def get_meal_versions_page(after_id: int | None, limit: int) -> list[dict]:
+    """id and updated_at of one keyset page of meals; lets the catalog find what changed."""
     supabase = get_supabase_client()
-    result = supabase.table("meals").insert(meal_data).execute()
-    meal_id = result.data[0]["id"]
-
-    for ingredient in ingredient_entries:
-        ingredient_id = _get_or_create_ingredient(ingredient["name"])
-        quantity = ingredient.get("quantity")
-        unit = ingredient.get("unit")
-        supabase.table("meal_ingredients").insert(
+    query = supabase.table("meals").select("id, updated_at")
+    if after_id is not None:
+        query = query.gt("id", after_id)
+    result = query.order("id", desc=False).limit(limit).execute()
+    return result.data or []
+
+
+@_pluggable
+def get_meals_by_ids(meal_ids: list[int]) -> list[dict]:
+    if not meal_ids:
+        return []
+    supabase = get_supabase_client()
+    result = supabase.table("meals").select(MEAL_SELECT).in_("id", meal_ids).execute()
+    return result.data or []
+
+
+def _update_meal_params(
+    meal_id: int,
+    meal_data: dict,
+    ingredient_entries: list[dict] | None,
+) -> dict:
+    ingredients = None
+    if ingredient_entries is not None:
+        ingredients = [
             {
-                "meal_id": meal_id,
-                "ingredient_id": ingredient_id,
-                "quantity": quantity,
-                "unit": unit,
+                "name": _normalize_ingredient_name(entry["name"]),
+                "quantity": entry.get("quantity"),
+                "unit": entry.get("unit"),
             }
-        ).execute()
-
-    return meal_id
+            for entry in ingredient_entries
+        ]
+        names = [entry["name"] for entry in ingredient_entries]
+        meal_data = {**meal_data, "ingredient_names": _ingredient_names(names)}
+    return {"p_meal_id": meal_id, "p_meal": meal_data, "p_ingredients": ingredients}
 
 
+@meal_cache.invalidates
+@_pluggable
 def update_meal(
     meal_id: int,
     meal_data: dict,
     ingredient_entries: list[dict] | None = None,
-) -> None:
+) -> dict | None:
+    """
+    Apply the update and the ingredient diff in one RPC call (one
+    transaction) and return the updated meal, or None if it does not exist.
+    """
     supabase = get_supabase_client()
-    if meal_data:
-        supabase.table("meals").update(meal_data).eq("id", meal_id).execute()
-
-    if ingredient_entries is not None:
-        supabase.table("meal_ingredients").delete().eq("meal_id", meal_id).execute()
-        for ingredient in ingredient_entries:
-            ingredient_id = _get_or_create_ingredient(ingredient["name"])
-            quantity = ingredient.get("quantity")
-            unit = ingredient.get("unit")
-            supabase.table("meal_ingredients").insert(
-                {
-                    "meal_id": meal_id,
-                    "ingredient_id": ingredient_id,
-                    "quantity": quantity,
-                    "unit": unit,
-                }
-            ).execute()
+    params = _update_meal_params(meal_id, meal_data, ingredient_entries)
+    result = supabase.rpc("update_meal_with_ingredients", params).execute()
+    return result.data or None
 
 
+@meal_cache.invalidates
+@_pluggable
 def delete_meal(meal_id: int) -> None:
     supabase = get_supabase_client()
     supabase.table("meals").delete().eq("id", meal_id).execute()
 
 
-def _filter_by_ingredients(
-    meals: Iterable[dict],
-    must_include: list[str] | None,
-    exclude: list[str] | None,
-) -> list[dict]:
-    if not must_include and not exclude:
-        return list(meals)
-
-    must_include_set = {_normalize_ingredient_name(i) for i in must_include or []}
-    exclude_set = {_normalize_ingredient_name(i) for i in exclude or []}
-
-    filtered = []
-    for meal in meals:
-        ingredients = [
-            _normalize_ingredient_name(mi["ingredients"]["canonical_name"])
-            for mi in meal.get("meal_ingredients", [])
-            if mi.get("ingredients")
-        ]
-        ingredient_set = set(ingredients)
-        if must_include_set and not must_include_set.issubset(ingredient_set):
-            continue
-        if exclude_set and exclude_set.intersection(ingredient_set):
-            continue
-        filtered.append(meal)
-    return filtered
-
-
-def search_meals(
+def _apply_search_filters(
+    query,
     must_include: list[str] | None = None,
     exclude: list[str] | None = None,
     max_calories: int | None = None,
@@ -198,12 +400,8 @@ def search_meals(
     limit: int = 10,
     cursor: int | None = None,
     name_query: str | None = None,
-) -> list[dict]:
-    supabase = get_supabase_client()
-    query = supabase.table("meals").select(
-        "*, meal_ingredients(quantity, unit, ingredients(canonical_name))"
-    )
-
+):
+    """Shared by the sync and async clients: both builders take the same filters."""
     if cursor is not None:
         query = query.gt("id", cursor)
     if name_query:
@@ -214,7 +412,101 @@ def search_meals(
         query = query.lte("calories", max_calories)
     if min_protein is not None:
         query = query.gte("protein_g", min_protein)
+    if must_include:
+        names = _text_array_literal(_ingredient_names(must_include))
+        query = query.contains("ingredient_names", names)
+    if exclude:
+        names = _text_array_literal(_ingredient_names(exclude))
+        query = query.not_.overlaps("ingredient_names", names)
+    return query.order("id", desc=False).limit(limit)
+
+
+def _semantic_search_params(
+    query_embedding: list[float],
+    must_include: list[str] | None = None,
+    exclude: list[str] | None = None,
+    max_calories: int | None = None,
+    min_protein: float | None = None,
+    meal_type: str | None = None,
+    limit: int = 10,
+    tags: list[str] | None = None,
+) -> dict:
+    return {
+        "query_embedding": query_embedding,
+        "match_count": limit,
+        "filter_meal_type": meal_type,
+        "max_calories": max_calories,
+        "min_protein": min_protein,
+        "must_include": _ingredient_names(must_include) if must_include else None,
+        "exclude": _ingredient_names(exclude) if exclude else None,
+        "filter_tags": [tag.lower() for tag in tags] if tags else None,
+    }
+
+
+@meal_cache.read_through(_search_cache_arguments)
+@_pluggable
+def search_meals(
+    must_include: list[str] | None = None,
+    exclude: list[str] | None = None,
+    max_calories: int | None = None,
+    min_protein: float | None = None,
+    meal_type: str | None = None,
+    limit: int = 10,
+    cursor: int | None = None,
+    name_query: str | None = None,
+) -> list[dict]:
+    supabase = get_supabase_client()
+    query = _apply_search_filters(
+        supabase.table("meals").select(MEAL_SELECT),
+        must_include=must_include,
+        exclude=exclude,
+        max_calories=max_calories,
+        min_protein=min_protein,
+        meal_type=meal_type,
+        limit=limit,
+        cursor=cursor,
+        name_query=name_query,
+    )
+    result = query.execute()
+    return result.data or []
+
 
-    result = query.order("id", desc=False).limit(limit * 5).execute()
-    filtered = _filter_by_ingredients(result.data or [], must_include, exclude)
-    return filtered[:limit]
+def search_meals_semantic(
+    query_text: str,
+    must_include: list[str] | None = None,
+    exclude: list[str] | None = None,
+    max_calories: int | None = None,
+    min_protein: float | None = None,
+    meal_type: str | None = None,
+    limit: int = 10,
+    tags: list[str] | None = None,
+) -> list[dict]:
+    query_embedding = embed_text(query_text)
+    # Imported here: the index builds on meal_catalog, which imports this module.
+    from src.db.vector_index import get_vector_index
+
+    index = get_vector_index()
+    if index is not None:
+        return index.search(
+            query_embedding,
+            limit=limit,
+            meal_type=meal_type,
+            max_calories=max_calories,
+            min_protein=min_protein,
+            must_include=must_include,
+            exclude=exclude,
+            tags=tags,
+        )
+    supabase = get_supabase_client()
+    params = _semantic_search_params(
+        query_embedding,
+        must_include=must_include,
+        exclude=exclude,
+        max_calories=max_calories,
+        min_protein=min_protein,
+        meal_type=meal_type,
+        limit=limit,
+        tags=tags,
+    )
+    result = supabase.rpc("match_meals", params).select(MEAL_SELECT).execute()
+    return result.data or []
@@ -0,0 +1,211 @@
+import copy
+import inspect
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable
+
+from src.config import MEAL_CACHE_MAX_ENTRIES, MEAL_CACHE_TTL_SECONDS
+
+
+class CacheBackend(ABC):
+    """
+    Storage behind QueryCache. A shared implementation (Redis, memcached)
+    lets several API processes see each other's invalidations; clear() then
+    only has to drop this cache's namespace.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Any | None: ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: float) -> None: ...
+
+    @abstractmethod
+    def clear(self) -> None: ...
+
+    def __len__(self) -> int:
+        return 0
+
+
+class InProcessCache(CacheBackend):
+    """LRU dict with a per-entry expiry, private to this process."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class QueryCache:
+    """
+    Read-through cache for query functions. Keys are the function name plus
+    its bound arguments after `normalize`, so equivalent calls share an
+    entry. Any write to the catalog clears the whole cache: writes are rare
+    and working out which searches a meal affects is not worth it.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    @property
+    def generation(self) -> int:
+        """Bumped by every catalog write made through this process."""
+        return self._generation
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def lookup(self, key: str) -> tuple[bool, Any]:
+        # Values are stored wrapped in a tuple so a cached None is a hit.
+        entry = self.backend.get(key)
+        self._count(entry is not None)
+        if entry is None:
+            return False, None
+        # Callers may modify what they get back; hand out copies.
+        return True, copy.deepcopy(entry[0])
+
+    def store(self, key: str, value: Any, generation: int) -> None:
+        # A write that finished while the value was loading may have made it
+        # stale already; drop it instead of caching it.
+        if generation == self._generation:
+            self.backend.set(key, (copy.deepcopy(value),), self.ttl)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.backend),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "ttl_seconds": self.ttl,
+            }
+
+    def _key_func(
+        self, func: Callable, normalize: Callable[[dict], dict] | None
+    ) -> Callable[..., str]:
+        signature = inspect.signature(func)
+
+        def key(*args, **kwargs) -> str:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            if normalize is not None:
+                arguments = normalize(arguments)
+            return f"{func.__name__}:{json.dumps(arguments, sort_keys=True, default=str)}"
+
+        return key
+
+    def read_through(self, normalize: Callable[[dict], dict] | None = None):
+        def decorate(func):
+            key_for = self._key_func(func, normalize)
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                key = key_for(*args, **kwargs)
+                hit, value = self.lookup(key)
+                if hit:
+                    return value
+                generation = self._generation
+                value = func(*args, **kwargs)
+                self.store(key, value, generation)
+                return value
+
+            return wrapper
+
+        return decorate
+
+    def read_through_async(self, normalize: Callable[[dict], dict] | None = None):
+        def decorate(func):
+            key_for = self._key_func(func, normalize)
+
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return await func(*args, **kwargs)
+                key = key_for(*args, **kwargs)
+                hit, value = self.lookup(key)
+                if hit:
+                    return value
+                generation = self._generation
+                value = await func(*args, **kwargs)
+                self.store(key, value, generation)
+                return value
+
+            return wrapper
+
+        return decorate
+
+    def invalidates(self, func):
+        """Clear the cache after func runs, even if it fails halfway."""
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.invalidate()
+
+        return wrapper
+
+    def invalidates_async(self, func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.invalidate()
+
+        return wrapper
+
+
+meal_cache = QueryCache(InProcessCache(MEAL_CACHE_MAX_ENTRIES), MEAL_CACHE_TTL_SECONDS)
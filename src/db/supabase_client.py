@@ -1,14 +1,44 @@
-from supabase import Client, create_client
+import asyncio
+
+from supabase import AsyncClient, Client, acreate_client, create_client
 
 from src.config import SUPABASE_PRIVATE_KEY, SUPABASE_URL
 
 _client: Client | None = None
+_async_client: AsyncClient | None = None
+_async_client_lock = asyncio.Lock()
 
 
-def get_supabase_client() -> Client:
+def _check_credentials() -> None:
     if SUPABASE_URL is None or SUPABASE_PRIVATE_KEY is None:
         raise ValueError("Missing Supabase credentials in environment")
+
+
+def get_supabase_client() -> Client:
     global _client
     if _client is None:
+        _check_credentials()
         _client = create_client(SUPABASE_URL, SUPABASE_PRIVATE_KEY)
     return _client
+
+
+async def get_async_supabase_client() -> AsyncClient:
+    global _async_client
+    if _async_client is None:
+        async with _async_client_lock:
+            if _async_client is None:
+                _check_credentials()
+                _async_client = await acreate_client(SUPABASE_URL, SUPABASE_PRIVATE_KEY)
+    return _async_client
+
+
+def set_supabase_client(client: Client | None) -> None:
+    """Replace the shared client, e.g. with a local stand-in in tests. None resets it."""
+    global _client
+    _client = client
+
+
+def set_async_supabase_client(client: AsyncClient | None) -> None:
+    """Async counterpart of set_supabase_client."""
+    global _async_client
+    _async_client = client
@@ -0,0 +1,84 @@
+"""
+Exact cosine search over meal embeddings held in memory, with the same
+filters as the match_meals database function. Installed with
+set_vector_index, it answers search_meals_semantic instead of pgvector:
+tests use it, and so can a database without the vector extension.
+"""
+import numpy as np
+
+from src.db.meal_catalog import CatalogSnapshot
+
+
+class BruteForceIndex:
+    """
+    Every meal's embedding as one unit-length row of a matrix; a search is
+    one matrix-vector product over the meals that pass the filters.
+    """
+
+    def __init__(self, rows: list[dict], embeddings: list[list[float]]) -> None:
+        if len(rows) != len(embeddings):
+            raise ValueError("rows and embeddings must have the same length")
+        self.catalog = CatalogSnapshot.build(rows)
+        vectors = np.asarray(embeddings, dtype=np.float64).reshape(len(rows), -1)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.vectors = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+    @classmethod
+    def from_meals(cls, meals: list[dict]) -> "BruteForceIndex":
+        """Index meal rows that carry an "embedding"; like match_meals, meals without one are left out."""
+        rows = []
+        embeddings = []
+        for meal in meals:
+            if meal.get("embedding") is None:
+                continue
+            rows.append({key: value for key, value in meal.items() if key != "embedding"})
+            embeddings.append(meal["embedding"])
+        return cls(rows, embeddings)
+
+    def __len__(self) -> int:
+        return len(self.catalog)
+
+    def search(
+        self,
+        query_embedding: list[float],
+        limit: int = 10,
+        meal_type: str | None = None,
+        max_calories: int | None = None,
+        min_protein: float | None = None,
+        must_include: list[str] | None = None,
+        exclude: list[str] | None = None,
+        tags: list[str] | None = None,
+    ) -> list[dict]:
+        """Matching meals, most similar first; ties keep index order."""
+        candidates = np.flatnonzero(
+            self.catalog.mask(
+                meal_type=meal_type,
+                max_calories=max_calories,
+                min_protein=min_protein,
+                must_include=must_include,
+                exclude=exclude,
+                tags=tags,
+            )
+        )
+        if not len(candidates):
+            return []
+        query = np.asarray(query_embedding, dtype=np.float64)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+        scores = self.vectors[candidates] @ query
+        ranked = candidates[np.argsort(-scores, kind="stable")][:limit]
+        return [self.catalog.rows[index] for index in ranked]
+
+
+_index: BruteForceIndex | None = None
+
+
+def get_vector_index() -> BruteForceIndex | None:
+    return _index
+
+
+def set_vector_index(index: BruteForceIndex | None) -> None:
+    """Serve semantic searches from index instead of match_meals. None goes back to the database."""
+    global _index
+    _index = index
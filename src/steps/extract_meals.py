@@ -1,12 +1,31 @@
+import hashlib
+import logging
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator
+
 from agno.agent import Agent
 from agno.models.openai import OpenAIChat
+from agno.workflow import StepInput, StepOutput
+
+from src.config import EXTRACTION_CONCURRENCY
+from src.db.extraction_cache import (
+    chunk_cache_key,
+    document_cache_key,
+    get_cached_extraction,
+    save_extraction,
+)
+from src.schemas.meal import ExtractedMeal, ExtractedMealsResponse
+from src.utils.chunking import chunk_pages
+from src.utils.document_loader import PAGE_BREAK, iter_document_pages
+from src.utils.hashing import file_sha256, text_sha256
+from src.workers.progress import JobProgress, progress_for
 
-from src.schemas.meal import ExtractedMealsResponse
+logger = logging.getLogger(__name__)
 
-meal_extractor = Agent(
-    name="Extractor de Comidas",
-    model=OpenAIChat(id="gpt-5.2"),
-    instructions="""
+EXTRACTOR_MODEL_ID = "gpt-5.2"
+EXTRACTOR_INSTRUCTIONS = """
 Eres un especialista en extraccion de informacion nutricional. Tu trabajo es leer cuidadosamente documentos en ESPANOL y extraer TODAS las comidas/recetas mencionadas.
 
 Para CADA comida encontrada, extrae:
@@ -74,7 +93,149 @@ Cada ingrediente debe tener:
   "quantity": 140,
   "unit": "g"
 }
-""",
-    output_schema=ExtractedMealsResponse,
-    markdown=False,
-)
+"""
+
+# Changes whenever the model or the instructions change, which invalidates
+# every cached extraction made with the previous prompt.
+EXTRACTOR_PROMPT_VERSION = hashlib.sha256(
+    f"{EXTRACTOR_MODEL_ID}\n{EXTRACTOR_INSTRUCTIONS}".encode("utf-8")
+).hexdigest()[:12]
+
+
+def build_meal_extractor() -> Agent:
+    return Agent(
+        name="Extractor de Comidas",
+        model=OpenAIChat(id=EXTRACTOR_MODEL_ID),
+        instructions=EXTRACTOR_INSTRUCTIONS,
+        output_schema=ExtractedMealsResponse,
+        markdown=False,
+    )
+
+
+# An agno Agent keeps the state of the run in progress on the instance, so
+# the chunks extracted in parallel each use their thread's own agent.
+_thread_state = threading.local()
+
+
+def _meal_extractor() -> Agent:
+    extractor = getattr(_thread_state, "meal_extractor", None)
+    if extractor is None:
+        extractor = _thread_state.meal_extractor = build_meal_extractor()
+    return extractor
+
+
+def _read_cache(key: str) -> ExtractedMealsResponse | None:
+    try:
+        return get_cached_extraction(key)
+    except Exception as exc:
+        logger.warning("Extraction cache read failed for %s: %s", key, exc)
+        return None
+
+
+def _write_cache(key: str, response: ExtractedMealsResponse) -> None:
+    try:
+        save_extraction(key, EXTRACTOR_PROMPT_VERSION, response)
+    except Exception as exc:
+        logger.warning("Extraction cache write failed for %s: %s", key, exc)
+
+
+def document_hash(step_input: StepInput) -> str:
+    additional_data = step_input.additional_data or {}
+    if additional_data.get("content_hash"):
+        return additional_data["content_hash"]
+    if additional_data.get("document_path"):
+        return file_sha256(additional_data["document_path"])
+    return text_sha256(step_input.get_input_as_string() or "")
+
+
+def get_cached_document_extraction(content_hash: str) -> ExtractedMealsResponse | None:
+    return _read_cache(document_cache_key(content_hash, EXTRACTOR_PROMPT_VERSION))
+
+
+def _extract_chunk(chunk: str) -> ExtractedMealsResponse:
+    key = chunk_cache_key(text_sha256(chunk), EXTRACTOR_PROMPT_VERSION)
+    cached = _read_cache(key)
+    if cached is not None:
+        return cached
+
+    response = _meal_extractor().run(chunk).content
+    if not isinstance(response, ExtractedMealsResponse):
+        raise ValueError(f"Respuesta inesperada del extractor: {response}")
+    _write_cache(key, response)
+    return response
+
+
+def _meal_key(meal: ExtractedMeal) -> str:
+    name = unicodedata.normalize("NFKD", meal.name.strip().lower())
+    name = "".join(char for char in name if not unicodedata.combining(char))
+    return f"{meal.meal_type.value}:{' '.join(name.split())}"
+
+
+def merge_extractions(responses: list[ExtractedMealsResponse]) -> ExtractedMealsResponse:
+    """
+    Une las extracciones de cada fragmento. Una receta que cruza el borde
+    entre fragmentos aparece dos veces; se conserva la version mas completa.
+    """
+    merged: dict[str, ExtractedMeal] = {}
+    notes = []
+    for response in responses:
+        if response.extraction_notes:
+            notes.append(response.extraction_notes)
+        for meal in response.meals:
+            key = _meal_key(meal)
+            current = merged.get(key)
+            if current is None or len(meal.ingredients) > len(current.ingredients):
+                merged[key] = meal
+    return ExtractedMealsResponse(
+        meals=list(merged.values()),
+        extraction_notes="\n".join(notes) or None,
+    )
+
+
+def extract_meals_in_chunks(step_input: StepInput) -> StepOutput:
+    """
+    Paso 1: Extraer comidas dividiendo el documento en fragmentos que se
+    procesan en paralelo.
+
+    Si additional_data trae "document_path", las paginas se leen del archivo
+    a medida que se extraen y cada fragmento se envia al modelo en cuanto
+    esta completo; si no, se divide el texto recibido como input.
+
+    Los resultados se guardan por documento y por fragmento, de modo que un
+    reintento (por ejemplo tras fallar el guardado) no vuelve a llamar al
+    modelo.
+    """
+    progress = progress_for(step_input)
+    # agno runs this step again after a failure; count this attempt from zero.
+    progress.reset("pages_loaded", "chunks_total", "chunks_extracted", "meals_extracted")
+    document_key = document_cache_key(document_hash(step_input), EXTRACTOR_PROMPT_VERSION)
+    cached = _read_cache(document_key)
+    if cached is not None:
+        progress.set("meals_extracted", len(cached.meals))
+        return StepOutput(content=cached)
+
+    document_path = (step_input.additional_data or {}).get("document_path")
+    if document_path:
+        pages = iter_document_pages(document_path)
+    else:
+        pages = (step_input.get_input_as_string() or "").split(PAGE_BREAK)
+
+    with progress.timed("extract"), ThreadPoolExecutor(max_workers=EXTRACTION_CONCURRENCY) as pool:
+        futures = []
+        for chunk in chunk_pages(_tracked_pages(pages, progress)):
+            future = pool.submit(_extract_chunk, chunk)
+            future.add_done_callback(lambda _: progress.add("chunks_extracted"))
+            futures.append(future)
+            progress.add("chunks_total")
+        responses = [future.result() for future in futures]
+    merged = merge_extractions(responses)
+    progress.set("meals_extracted", len(merged.meals))
+    _write_cache(document_key, merged)
+    return StepOutput(content=merged)
+
+
+def _tracked_pages(pages: Iterable[str], progress: JobProgress) -> Iterator[str]:
+    with progress.timed("load"):
+        for page in pages:
+            progress.add("pages_loaded")
+            yield page
@@ -1,22 +1,17 @@
 import json
 
-import openai
 from agno.workflow import StepInput, StepOutput
 
-from src.config import EMBEDDING_MODEL, OPENAI_API_KEY
-from src.db.queries import check_meal_exists, save_meal
+from src.db.queries import get_existing_meal_names, save_meal, save_meals
 from src.schemas.meal import ExtractedMeal, ExtractedMealsResponse
+from src.utils.embeddings import embed_text, embed_texts
+from src.workers.progress import progress_for
 
-if OPENAI_API_KEY is None:
-    raise ValueError("OPENAI_API_KEY is required")
 
-openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
-
-
-def generate_embedding(meal: ExtractedMeal) -> list[float]:
-    """Generate embedding for a meal using Spanish text."""
+def build_embedding_text(meal: ExtractedMeal) -> str:
+    """Build the Spanish text that represents a meal in the vector index."""
     ingredient_names = [item.name for item in meal.ingredients]
-    embedding_text = (
+    return (
         f"{meal.name}. {meal.description}\n"
         f"Tipo: {meal.meal_type.value}\n"
         f"Ingredientes: {', '.join(ingredient_names)}\n"
@@ -25,11 +20,15 @@ def generate_embedding(meal: ExtractedMeal) -> list[float]:
         f"Carbohidratos: {meal.carbs_g}g, Grasa: {meal.fat_g}g"
     )
 
-    response = openai_client.embeddings.create(
-        model=EMBEDDING_MODEL,
-        input=embedding_text,
-    )
-    return response.data[0].embedding
+
+def generate_embedding(meal: ExtractedMeal) -> list[float]:
+    """Generate embedding for a meal using Spanish text."""
+    return embed_text(build_embedding_text(meal))
+
+
+def generate_embeddings(meals: list[ExtractedMeal]) -> list[list[float]]:
+    """Generate embeddings for several meals in batched requests."""
+    return embed_texts([build_embedding_text(meal) for meal in meals])
 
 
 def save_meals_to_db(step_input: StepInput) -> StepOutput:
@@ -48,34 +47,63 @@ def save_meals_to_db(step_input: StepInput) -> StepOutput:
             meals_response = ExtractedMealsResponse(**previous_content)
 
         source_doc = step_input.additional_data.get("file_path", "desconocido")
+        progress = progress_for(step_input)
 
         saved_meals = []
         skipped_meals = []
         errors = []
 
+        existing_names = get_existing_meal_names(meal.name for meal in meals_response.meals)
+        new_meals = []
         for meal in meals_response.meals:
+            if meal.name in existing_names:
+                skipped_meals.append(meal.name)
+                continue
+            existing_names.add(meal.name)
+            new_meals.append(meal)
+        progress.set("meals_skipped", len(skipped_meals))
+
+        pending = []
+        with progress.timed("embed"):
+            try:
+                pending = list(zip(new_meals, generate_embeddings(new_meals)))
+            except Exception:
+                for meal in new_meals:
+                    try:
+                        pending.append((meal, generate_embedding(meal)))
+                    except Exception as exc:
+                        errors.append(f"{meal.name}: {exc}")
+        progress.set("meals_embedded", len(pending))
+
+        with progress.timed("persist"):
             try:
-                if check_meal_exists(meal.name):
-                    skipped_meals.append(meal.name)
-                    continue
-
-                embedding = generate_embedding(meal)
-
-                meal_id = save_meal(
-                    meal=meal,
-                    embedding=embedding,
-                    source_document=source_doc,
-                )
-
-                saved_meals.append(
-                    {
-                        "id": meal_id,
-                        "name": meal.name,
+                meal_ids = save_meals(pending, source_document=source_doc)
+            except Exception:
+                # Fall back to one meal at a time so a single bad row does not
+                # fail the whole document and every error is reported per meal.
+                meal_ids = []
+                for meal, embedding in pending:
+                    try:
+                        meal_ids.append(
+                            save_meal(meal=meal, embedding=embedding, source_document=source_doc)
+                        )
+                    except Exception as exc:
+                        meal_ids.append(None)
+                        errors.append(f"{meal.name}: {exc}")
+
+        for (meal, _), meal_id in zip(pending, meal_ids):
+            if meal_id is None:
+                continue
+            saved_meals.append(
+                {
+                    "id": meal_id,
+                    "name": meal.name,
                     "ingredients_count": len(meal.ingredients),
-                    }
-                )
-            except Exception as exc:
-                errors.append(f"{meal.name}: {exc}")
+                }
+            )
+
+        progress.set("meals_saved", len(saved_meals))
+        progress.set("meals_failed", len(errors))
 
         summary_lines = [
             "Extraccion completada",
@@ -102,7 +130,9 @@ def save_meals_to_db(step_input: StepInput) -> StepOutput:
             summary_lines.append("Errores:")
             summary_lines.extend([f"- {err}" for err in errors])
 
-        return StepOutput(content="\n".join(summary_lines))
+        # Meals that could not be embedded or saved fail the step, so the job
+        # is retried from the cached extraction; saved meals are skipped then.
+        return StepOutput(content="\n".join(summary_lines), success=not errors)
     except Exception as exc:
         return StepOutput(
             content=f"Error guardando comidas: {exc}",
@@ -16,6 +16,23 @@ OBJECTIVE_ADJUSTMENTS = {
     Objective.GAIN_MUSCLE: 200,
 }
 
+# Fraccion de las calorias para proteina, carbohidratos y grasa.
+MACRO_SPLITS = {
+    Objective.LOSE_WEIGHT: (0.35, 0.35, 0.30),
+    Objective.GAIN_MUSCLE: (0.30, 0.45, 0.25),
+    Objective.GAIN_WEIGHT: (0.25, 0.45, 0.30),
+    Objective.MAINTAIN: (0.25, 0.50, 0.25),
+}
+
+
+def calcular_macros(calorias_objetivo: int, objetivo: Objective) -> tuple[int, int, int]:
+    """Gramos diarios de proteina, carbohidratos y grasa."""
+    proteina_pct, carbs_pct, grasa_pct = MACRO_SPLITS[objetivo]
+    proteina_g = int((calorias_objetivo * proteina_pct) / 4)
+    carbohidratos_g = int((calorias_objetivo * carbs_pct) / 4)
+    grasa_g = int((calorias_objetivo * grasa_pct) / 9)
+    return proteina_g, carbohidratos_g, grasa_g
+
 
 def calcular_requerimientos(patient: PatientData) -> NutritionalRequirements:
     """
@@ -52,18 +69,7 @@ def calcular_requerimientos(patient: PatientData) -> NutritionalRequirements:
 
     calorias_objetivo = int(calorias_objetivo)
 
-    if patient.objetivo == Objective.LOSE_WEIGHT:
-        proteina_pct, carbs_pct, grasa_pct = 0.35, 0.35, 0.30
-    elif patient.objetivo == Objective.GAIN_MUSCLE:
-        proteina_pct, carbs_pct, grasa_pct = 0.30, 0.45, 0.25
-    elif patient.objetivo == Objective.GAIN_WEIGHT:
-        proteina_pct, carbs_pct, grasa_pct = 0.25, 0.45, 0.30
-    else:
-        proteina_pct, carbs_pct, grasa_pct = 0.25, 0.50, 0.25
-
-    proteina_g = int((calorias_objetivo * proteina_pct) / 4)
-    carbohidratos_g = int((calorias_objetivo * carbs_pct) / 4)
-    grasa_g = int((calorias_objetivo * grasa_pct) / 9)
+    proteina_g, carbohidratos_g, grasa_g = calcular_macros(calorias_objetivo, patient.objetivo)
     fibra_g = 25 if patient.sexo == Sex.FEMALE else 30
 
     return NutritionalRequirements(
@@ -0,0 +1,199 @@
+"""
+calcular_requerimientos and calcular_imc for many patients at once. Every
+formula runs as one NumPy operation over columns of patient data and gives
+exactly the values of the scalar functions in src.tools.calculations,
+including rounding.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.schemas.patient import (
+    ActivityLevel,
+    NutritionalRequirements,
+    Objective,
+    PatientData,
+    Sex,
+)
+from src.tools.calculations import ACTIVITY_MULTIPLIERS, MACRO_SPLITS, OBJECTIVE_ADJUSTMENTS
+
+# Codes used in the columns: position in these tuples.
+OBJECTIVES = tuple(Objective)
+ACTIVITY_LEVELS = tuple(ActivityLevel)
+IMC_CATEGORIES = (
+    "Bajo peso",
+    "Normal",
+    "Sobrepeso",
+    "Obesidad grado I",
+    "Obesidad grado II",
+    "Obesidad grado III",
+)
+IMC_LIMITS = np.array([18.5, 25, 30, 35, 40])
+
+_MULTIPLIERS = np.array([ACTIVITY_MULTIPLIERS[level] for level in ACTIVITY_LEVELS])
+_ADJUSTMENTS = np.array([OBJECTIVE_ADJUSTMENTS[objective] for objective in OBJECTIVES])
+_SPLITS = np.array([MACRO_SPLITS[objective] for objective in OBJECTIVES])
+
+
+@dataclass
+class PatientColumns:
+    """Patient data as arrays of equal length; objetivo and nivel_actividad hold codes."""
+
+    edad: np.ndarray
+    masculino: np.ndarray
+    peso_kg: np.ndarray
+    altura_cm: np.ndarray
+    objetivo: np.ndarray
+    nivel_actividad: np.ndarray
+    hipotiroidismo: np.ndarray
+    diabetes: np.ndarray
+    hipertension: np.ndarray
+    enfermedad_renal: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.edad)
+
+    @classmethod
+    def from_patients(cls, patients: list[PatientData]) -> "PatientColumns":
+        conditions = [{c.lower() for c in patient.condiciones} for patient in patients]
+        objective_codes = {objective: code for code, objective in enumerate(OBJECTIVES)}
+        activity_codes = {level: code for code, level in enumerate(ACTIVITY_LEVELS)}
+        return cls(
+            edad=np.array([p.edad for p in patients], dtype=np.int64),
+            masculino=np.array([p.sexo == Sex.MALE for p in patients], dtype=bool),
+            peso_kg=np.array([p.peso_kg for p in patients], dtype=np.float64),
+            altura_cm=np.array([p.altura_cm for p in patients], dtype=np.float64),
+            objetivo=np.array([objective_codes[p.objetivo] for p in patients], dtype=np.int8),
+            nivel_actividad=np.array(
+                [activity_codes[p.nivel_actividad] for p in patients], dtype=np.int8
+            ),
+            hipotiroidismo=np.array(["hipotiroidismo" in c for c in conditions], dtype=bool),
+            diabetes=np.array(
+                ["diabetes" in c or "resistencia a la insulina" in c for c in conditions],
+                dtype=bool,
+            ),
+            hipertension=np.array(["hipertension" in c for c in conditions], dtype=bool),
+            enfermedad_renal=np.array(["enfermedad renal" in c for c in conditions], dtype=bool),
+        )
+
+
+def _product_error(a: np.ndarray, b: float) -> np.ndarray:
+    """Exact a * b minus its float result (Dekker's TwoProduct)."""
+    product = a * b
+
+    def split(x):
+        c = 134217729.0 * x  # 2**27 + 1
+        high = c - (c - x)
+        return high, x - high
+
+    a_high, a_low = split(a)
+    b_high, b_low = split(np.float64(b))
+    return (
+        ((a_high * b_high - product) + a_high * b_low + a_low * b_high) + a_low * b_low
+    )
+
+
+def _round_like_python(values: np.ndarray, digits: int) -> np.ndarray:
+    """
+    Same result as round(value, digits) for every element. np.round
+    rounds the float product value * 10**digits, and that product can land
+    exactly on a .5 tie that the exact value is not on (0.15 is really
+    0.1499..., yet 0.15 * 10 == 1.5). Those ties are settled by the sign of
+    the product's rounding error instead of by half-to-even.
+    """
+    factor = 10.0**digits
+    scaled = values * factor
+    floor = np.floor(scaled)
+    rounded = np.round(scaled)
+    tie = scaled - floor == 0.5
+    error = _product_error(values, factor)
+    rounded = np.where(tie & (error < 0), floor, rounded)
+    rounded = np.where(tie & (error > 0), floor + 1, rounded)
+    return rounded / factor
+
+
+@dataclass
+class RequirementsBatch:
+    """Results by patient position; the notes are kept as flags and built on demand."""
+
+    tmb: np.ndarray
+    tdee: np.ndarray
+    calorias_objetivo: np.ndarray
+    proteina_g: np.ndarray
+    carbohidratos_g: np.ndarray
+    grasa_g: np.ndarray
+    fibra_g: np.ndarray
+    minimo_saludable: np.ndarray
+    imc: np.ndarray
+    imc_categoria: np.ndarray
+    patients: PatientColumns
+
+    def __len__(self) -> int:
+        return len(self.tmb)
+
+    def notas(self, index: int) -> list[str]:
+        patients = self.patients
+        notas = []
+        if patients.hipotiroidismo[index]:
+            notas.append("Ajuste -100 kcal por hipotiroidismo")
+        if patients.diabetes[index]:
+            notas.append("Priorizar carbohidratos complejos, bajo indice glucemico")
+        if patients.hipertension[index]:
+            notas.append("Limitar sodio a <2000mg/dia")
+        if patients.enfermedad_renal[index]:
+            notas.append("Moderar proteina segun indicacion medica")
+        if self.minimo_saludable[index]:
+            notas.append(f"Ajustado al minimo saludable: {self.calorias_objetivo[index]} kcal")
+        return notas
+
+    def requerimientos(self, index: int) -> NutritionalRequirements:
+        return NutritionalRequirements(
+            tmb=float(self.tmb[index]),
+            tdee=float(self.tdee[index]),
+            calorias_objetivo=int(self.calorias_objetivo[index]),
+            proteina_g=int(self.proteina_g[index]),
+            carbohidratos_g=int(self.carbohidratos_g[index]),
+            grasa_g=int(self.grasa_g[index]),
+            fibra_g=int(self.fibra_g[index]),
+            notas=self.notas(index),
+        )
+
+    def imc_resultado(self, index: int) -> tuple[float, str]:
+        return float(self.imc[index]), IMC_CATEGORIES[self.imc_categoria[index]]
+
+
+def calcular_requerimientos_lote(
+    patients: PatientColumns | list[PatientData],
+) -> RequirementsBatch:
+    """calcular_requerimientos y calcular_imc para todos los pacientes a la vez."""
+    if not isinstance(patients, PatientColumns):
+        patients = PatientColumns.from_patients(patients)
+
+    # Same operations in the same order as the scalar code, so the floats match.
+    tmb = (10 * patients.peso_kg) + (6.25 * patients.altura_cm) - (5 * patients.edad)
+    tmb = np.where(patients.masculino, tmb + 5, tmb - 161)
+    tdee = tmb * _MULTIPLIERS[patients.nivel_actividad]
+    calorias = tdee + _ADJUSTMENTS[patients.objetivo]
+    calorias = np.where(patients.hipotiroidismo, calorias - 100, calorias)
+
+    minimo = np.where(patients.masculino, 1500, 1200)
+    minimo_saludable = calorias < minimo
+    calorias = np.where(minimo_saludable, minimo, calorias).astype(np.int64)
+
+    splits = _SPLITS[patients.objetivo]
+    altura_m = patients.altura_cm / 100
+    imc = patients.peso_kg / (altura_m**2)
+
+    return RequirementsBatch(
+        tmb=_round_like_python(tmb, 1),
+        tdee=_round_like_python(tdee, 1),
+        calorias_objetivo=calorias,
+        proteina_g=((calorias * splits[:, 0]) / 4).astype(np.int64),
+        carbohidratos_g=((calorias * splits[:, 1]) / 4).astype(np.int64),
+        grasa_g=((calorias * splits[:, 2]) / 9).astype(np.int64),
+        fibra_g=np.where(patients.masculino, 30, 25),
+        minimo_saludable=minimo_saludable,
+        imc=_round_like_python(imc, 1),
+        imc_categoria=np.searchsorted(IMC_LIMITS, imc, side="right"),
+        patients=patients,
+    )
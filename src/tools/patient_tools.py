@@ -1,6 +1,13 @@
 import json
 
-from src.schemas.patient import ActivityLevel, Objective, PatientData, Sex
+from src.db.patients import create_patient, get_patient, patient_from_row, requirements_from_row
+from src.schemas.patient import (
+    ActivityLevel,
+    NutritionalRequirements,
+    Objective,
+    PatientData,
+    Sex,
+)
 from src.tools.calculations import calcular_imc, calcular_requerimientos
 
 
@@ -50,40 +57,9 @@ def _normalize_actividad(value: str) -> ActivityLevel:
     return ActivityLevel(mapping.get(normalized, normalized))
 
 
-def registrar_paciente(
-    nombre: str,
-    edad: int,
-    sexo: str,
-    peso_kg: float,
-    altura_cm: float,
-    objetivo: str,
-    nivel_actividad: str = "sedentario",
-    condiciones: list[str] | None = None,
-    alergias: list[str] | None = None,
-    restricciones: list[str] | None = None,
-    preferencias: list[str] | None = None,
-) -> str:
-    """
-    Registra los datos de un paciente y calcula sus requerimientos nutricionales.
-    """
-    patient = PatientData(
-        nombre=nombre,
-        edad=edad,
-        sexo=_normalize_sexo(sexo),
-        peso_kg=peso_kg,
-        altura_cm=altura_cm,
-        objetivo=_normalize_objetivo(objetivo),
-        nivel_actividad=_normalize_actividad(nivel_actividad),
-        condiciones=condiciones or [],
-        alergias=alergias or [],
-        restricciones=restricciones or [],
-        preferencias=preferencias or [],
-    )
-
-    reqs = calcular_requerimientos(patient)
-    imc, imc_categoria = calcular_imc(peso_kg, altura_cm)
-
-    result = {
+def _patient_summary(patient: PatientData, reqs: NutritionalRequirements) -> dict:
+    imc, imc_categoria = calcular_imc(patient.peso_kg, patient.altura_cm)
+    return {
         "paciente": {
             "nombre": patient.nombre,
             "edad": patient.edad,
@@ -129,4 +105,55 @@ def registrar_paciente(
         },
     }
 
+
+def registrar_paciente(
+    nombre: str,
+    edad: int,
+    sexo: str,
+    peso_kg: float,
+    altura_cm: float,
+    objetivo: str,
+    nivel_actividad: str = "sedentario",
+    condiciones: list[str] | None = None,
+    alergias: list[str] | None = None,
+    restricciones: list[str] | None = None,
+    preferencias: list[str] | None = None,
+    guardar: bool = False,
+) -> str:
+    """
+    Registra los datos de un paciente y calcula sus requerimientos nutricionales.
+    Con guardar=True el paciente queda guardado y la respuesta incluye su
+    paciente_id, para cargarlo despues con cargar_paciente.
+    """
+    patient = PatientData(
+        nombre=nombre,
+        edad=edad,
+        sexo=_normalize_sexo(sexo),
+        peso_kg=peso_kg,
+        altura_cm=altura_cm,
+        objetivo=_normalize_objetivo(objetivo),
+        nivel_actividad=_normalize_actividad(nivel_actividad),
+        condiciones=condiciones or [],
+        alergias=alergias or [],
+        restricciones=restricciones or [],
+        preferencias=preferencias or [],
+    )
+
+    if not guardar:
+        return json.dumps(_patient_summary(patient, calcular_requerimientos(patient)), indent=2)
+
+    row = create_patient(patient)
+    result = {"paciente_id": row["id"], **_patient_summary(patient, requirements_from_row(row))}
+    return json.dumps(result, indent=2)
+
+
+def cargar_paciente(paciente_id: int) -> str:
+    """
+    Carga un paciente guardado por su ID, con los requerimientos ya calculados.
+    """
+    row = get_patient(paciente_id)
+    if row is None:
+        return json.dumps({"error": f"No existe el paciente {paciente_id}"})
+    patient = patient_from_row(row)
+    result = {"paciente_id": row["id"], **_patient_summary(patient, requirements_from_row(row))}
     return json.dumps(result, indent=2)
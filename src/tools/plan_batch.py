@@ -0,0 +1,158 @@
+"""
+Weekly plans for many patients at once, without the chat agent: the
+requirements come from calcular_requerimientos_lote and the meals from one
+snapshot of the catalog, handed to a shared pool of worker processes that
+never touch the database.
+"""
+import json
+import multiprocessing
+import os
+import pickle
+import tempfile
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator
+from uuid import uuid4
+
+from src.config import PLAN_BATCH_WORKERS
+from src.db.meal_catalog import CatalogSnapshot, meal_catalog
+from src.schemas.patient import NutritionalRequirements, PatientData
+from src.tools.calculations_batch import calcular_requerimientos_lote
+from src.tools.plan_tools import construir_plan
+
+# Below this many patients starting worker processes costs more than it saves.
+PARALLEL_MIN_PATIENTS = 8
+PATIENTS_PER_TASK = 4
+
+# One pool per process, shared by every batch, so concurrent requests queue
+# for the same workers instead of each starting cpu_count new ones. Workers
+# come from a forkserver (spawn where there is none): forking the
+# multi-threaded API process could copy locks held by other threads.
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+# In a worker: the catalog of the batch it last served, by batch token.
+_worker_catalog: tuple[str, CatalogSnapshot] | None = None
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """The shared pool; workers only sizes it when it is first created."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context("forkserver")
+                # Imported once in the server instead of once per worker.
+                context.set_forkserver_preload([__name__])
+            else:
+                context = multiprocessing.get_context("spawn")
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_plan_pool() -> None:
+    """Stop the shared worker processes, e.g. when the API shuts down."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
+
+
+def _load_catalog(token: str, path: str) -> CatalogSnapshot:
+    global _worker_catalog
+    if _worker_catalog is None or _worker_catalog[0] != token:
+        with open(path, "rb") as file:
+            _worker_catalog = (token, pickle.load(file))
+    return _worker_catalog[1]
+
+
+def _plan_line(
+    catalogo: CatalogSnapshot,
+    index: int,
+    patient: PatientData,
+    requerimientos: NutritionalRequirements,
+) -> str:
+    try:
+        plan = construir_plan(
+            catalogo,
+            requerimientos,
+            restricciones=[*patient.restricciones, *patient.alergias],
+            preferencias=patient.preferencias,
+            paciente=patient.nombre,
+            objetivo=patient.objetivo.value,
+        )
+    except Exception as exc:
+        return json.dumps({"index": index, "paciente": patient.nombre, "error": str(exc)})
+    return json.dumps(
+        {"index": index, "paciente": patient.nombre, "plan": plan.model_dump()},
+        ensure_ascii=False,
+    )
+
+
+def _worker_plan_lines(
+    catalog_ref: tuple[str, str],
+    tasks: list[tuple[int, PatientData, NutritionalRequirements]],
+) -> list[str]:
+    catalogo = _load_catalog(*catalog_ref)
+    return [_plan_line(catalogo, *task) for task in tasks]
+
+
+def generate_plans(
+    patients: list[PatientData],
+    workers: int = PLAN_BATCH_WORKERS,
+) -> Iterator[str]:
+    """
+    Yield one NDJSON line (no newline) per patient, in input order: either
+    {"index", "paciente", "plan"} or {"index", "paciente", "error"}.
+    workers <= 0 uses one process per CPU.
+    """
+    if not patients:
+        return
+    requerimientos = calcular_requerimientos_lote(patients)
+    tasks = [
+        (index, patient, requerimientos.requerimientos(index))
+        for index, patient in enumerate(patients)
+    ]
+    catalogo = meal_catalog.snapshot()
+
+    workers = workers if workers > 0 else os.cpu_count() or 1
+    if workers <= 1 or len(tasks) < PARALLEL_MIN_PATIENTS:
+        for task in tasks:
+            yield _plan_line(catalogo, *task)
+        return
+
+    # The snapshot changes between batches, so it reaches the long-lived
+    # workers through a file each of them reads once per batch.
+    pool = _get_pool(workers)
+    file = tempfile.NamedTemporaryFile(suffix=".pickle", delete=False)
+    futures: list[Future] = []
+    try:
+        with file:
+            pickle.dump(catalogo, file, protocol=pickle.HIGHEST_PROTOCOL)
+        catalog_ref = (uuid4().hex, file.name)
+        futures = [
+            pool.submit(_worker_plan_lines, catalog_ref, tasks[start:start + PATIENTS_PER_TASK])
+            for start in range(0, len(tasks), PATIENTS_PER_TASK)
+        ]
+        for future in futures:
+            yield from future.result()
+    except BrokenProcessPool:
+        # A worker died; the next batch starts a fresh pool.
+        _discard_pool(pool)
+        raise
+    finally:
+        # Also reached when an HTTP client disconnects mid-stream; other
+        # batches keep the pool.
+        for future in futures:
+            future.cancel()
+        os.unlink(file.name)
@@ -0,0 +1,218 @@
+"""
+Chooses every meal of a weekly plan at once so each day lands as close as
+possible to the calorie and macro targets.
+
+The search is an iterated local search. A move re-picks the meal of one
+slot; all candidates for that slot are scored together with NumPy, so a
+full pass over the week costs a few dozen vector operations. When a pass no
+longer improves the plan, a few slots of the best plan found are shaken up
+at random (fixed seed) and the descent starts again. With the same catalog
+and arguments the result is always the same unless the time budget runs out
+first. The budget counts this thread's CPU time, so other requests or
+processes competing for the CPU do not cut the search short.
+"""
+import time
+
+import numpy as np
+
+# Order of the nutrient columns and of the targets.
+CALORIES, PROTEIN, CARBS, FAT = range(4)
+
+# Weight of each nutrient's squared relative deviation from its daily target.
+NUTRIENT_WEIGHTS = np.array([2.0, 1.0, 1.0, 1.0])
+# Keeps each slot near its share of the day's calories (a 1500 kcal breakfast
+# could otherwise balance a day just as well).
+SLOT_SHARE_WEIGHT = 0.25
+# Small cost per earlier use of the same meal, to prefer variety on ties.
+REPEAT_WEIGHT = 0.01
+SHAKEN_SLOTS = 4
+
+
+def score_slot_candidates(
+    candidate_nutrients: np.ndarray,
+    rest_of_day: np.ndarray,
+    targets: np.ndarray,
+    share: float,
+    uses: np.ndarray,
+) -> np.ndarray:
+    """
+    Cost of putting each candidate (rows of candidate_nutrients) in one slot
+    of a day whose other meals add up to rest_of_day. Same objective as
+    optimize_week; lower is better. uses counts earlier uses in the week.
+    """
+    deviation = (rest_of_day + candidate_nutrients - targets) / targets
+    share_deviation = (candidate_nutrients[:, CALORIES] - share * targets[CALORIES]) / targets[CALORIES]
+    return (
+        (deviation**2) @ NUTRIENT_WEIGHTS
+        + SLOT_SHARE_WEIGHT * share_deviation**2
+        + REPEAT_WEIGHT * uses
+    )
+
+
+class _WeekSearch:
+    def __init__(
+        self,
+        candidates: list[np.ndarray],
+        nutrients: np.ndarray,
+        groups: np.ndarray,
+        targets: np.ndarray,
+        shares: np.ndarray,
+        days: int,
+        max_repeats: int,
+    ) -> None:
+        self.candidates = candidates
+        self.nutrients = nutrients
+        self.groups = groups
+        self.targets = targets
+        self.shares = shares
+        self.days = days
+        self.max_repeats = max_repeats
+        self.slot_groups = [groups[slot_candidates] for slot_candidates in candidates]
+        # Per-candidate costs that do not depend on the rest of the plan.
+        self.slot_costs = [
+            SLOT_SHARE_WEIGHT
+            * ((nutrients[slot_candidates, CALORIES] - share * targets[CALORIES]) / targets[CALORIES]) ** 2
+            for slot_candidates, share in zip(candidates, shares)
+        ]
+        # With a = (rest of the day - target) / target and y = meal / target,
+        # a day's cost is sum(w * (a + y)**2) = sum(w * a**2) + 2 * (w * y) @ a
+        # + sum(w * y**2). Only the middle term depends on the rest of the
+        # plan, so scoring every candidate of a slot is one small matvec.
+        scaled = [nutrients[slot_candidates] / targets for slot_candidates in candidates]
+        self.slot_linear = [2 * NUTRIENT_WEIGHTS * y for y in scaled]
+        self.slot_static = [
+            (NUTRIENT_WEIGHTS * y**2).sum(axis=1) + slot_cost
+            for y, slot_cost in zip(scaled, self.slot_costs)
+        ]
+        self.reset(np.full((days, len(candidates)), -1, dtype=np.int64))
+
+    def reset(self, plan: np.ndarray) -> None:
+        self.plan = plan.copy()
+        self.totals = np.zeros((self.days, 4))
+        self.counts = np.zeros(int(self.groups.max(initial=-1)) + 1, dtype=np.int64)
+        for day, slot in zip(*np.nonzero(self.plan >= 0)):
+            meal = self.plan[day, slot]
+            self.totals[day] += self.nutrients[meal]
+            self.counts[self.groups[meal]] += 1
+
+    def _day_costs(self, totals: np.ndarray) -> np.ndarray:
+        deviation = (totals - self.targets) / self.targets
+        return (deviation**2) @ NUTRIENT_WEIGHTS
+
+    def cost(self) -> float:
+        total = float(self._day_costs(self.totals).sum())
+        for slot in range(self.plan.shape[1]):
+            chosen = self.plan[:, slot]
+            positions = np.searchsorted(self.candidates[slot], chosen[chosen >= 0])
+            total += float(self.slot_costs[slot][positions].sum())
+        total += REPEAT_WEIGHT * float(np.maximum(self.counts - 1, 0).sum())
+        # An empty slot that could be filled is worse than any filled one.
+        return total + 1e6 * int(self._fillable_empty_slots())
+
+    def _fillable_empty_slots(self) -> int:
+        empty = 0
+        for day, slot in zip(*np.nonzero(self.plan < 0)):
+            if (self.counts[self.slot_groups[slot]] < self.max_repeats).any():
+                empty += 1
+        return empty
+
+    def _assign(self, day: int, slot: int, meal: int) -> None:
+        current = self.plan[day, slot]
+        if current >= 0:
+            self.totals[day] -= self.nutrients[current]
+            self.counts[self.groups[current]] -= 1
+        if meal >= 0:
+            self.totals[day] += self.nutrients[meal]
+            self.counts[self.groups[meal]] += 1
+        self.plan[day, slot] = meal
+
+    def improve_slot(self, day: int, slot: int) -> bool:
+        """Give the slot its best meal given the rest of the plan; True if it changed."""
+        slot_candidates = self.candidates[slot]
+        if not len(slot_candidates):
+            return False
+        current = self.plan[day, slot]
+        slot_groups = self.slot_groups[slot]
+        base = self.totals[day].copy()
+        uses = self.counts[slot_groups]
+        if current >= 0:
+            base -= self.nutrients[current]
+            uses = uses - (slot_groups == self.groups[current])
+
+        # The sum(w * a**2) term is the same for every candidate and left out.
+        scores = (
+            self.slot_linear[slot] @ ((base - self.targets) / self.targets)
+            + self.slot_static[slot]
+            + REPEAT_WEIGHT * uses
+        )
+        scores[uses >= self.max_repeats] = np.inf
+        best = int(np.argmin(scores))
+        if not np.isfinite(scores[best]):
+            return False
+        if current >= 0:
+            current_position = int(np.searchsorted(slot_candidates, current))
+            if scores[best] >= scores[current_position] - 1e-12:
+                return False
+        self._assign(day, slot, int(slot_candidates[best]))
+        return True
+
+    def descend(self, deadline: float) -> None:
+        improved = True
+        while improved and time.thread_time() < deadline:
+            improved = False
+            for day in range(self.days):
+                for slot in range(len(self.candidates)):
+                    improved |= self.improve_slot(day, slot)
+
+    def shake(self, rng: np.random.Generator) -> None:
+        filled = np.argwhere(self.plan >= 0)
+        if not len(filled):
+            return
+        picks = rng.choice(len(filled), size=min(SHAKEN_SLOTS, len(filled)), replace=False)
+        for day, slot in filled[np.sort(picks)]:
+            slot_candidates = self.candidates[slot]
+            self._assign(day, slot, -1)
+            allowed = slot_candidates[self.counts[self.slot_groups[slot]] < self.max_repeats]
+            if len(allowed):
+                self._assign(day, slot, int(allowed[rng.integers(len(allowed))]))
+
+
+def optimize_week(
+    candidates: list[np.ndarray],
+    nutrients: np.ndarray,
+    groups: np.ndarray,
+    targets: np.ndarray,
+    shares: np.ndarray,
+    days: int = 7,
+    max_repeats: int = 2,
+    rounds: int = 40,
+    time_budget: float = 0.5,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    Returns a (days, slots) array of meal indexes, -1 where a slot has no
+    allowed meal left.
+
+    candidates[s] holds the sorted meal indexes allowed in slot s. nutrients
+    is (meals, 4): calories, protein, carbs and fat per meal. Meals with the
+    same groups value count as the same meal for max_repeats. targets are the
+    daily calories and macros, shares the fraction of the daily calories
+    meant for each slot.
+    """
+    deadline = time.thread_time() + time_budget
+    search = _WeekSearch(candidates, nutrients, groups, targets, shares, days, max_repeats)
+    search.descend(deadline)
+    best_plan, best_cost = search.plan.copy(), search.cost()
+
+    rng = np.random.default_rng(seed)
+    for _ in range(rounds):
+        if time.thread_time() >= deadline:
+            break
+        search.reset(best_plan)
+        search.shake(rng)
+        search.descend(deadline)
+        cost = search.cost()
+        if cost < best_cost - 1e-12:
+            best_plan, best_cost = search.plan.copy(), cost
+
+    return best_plan
@@ -0,0 +1,49 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from src.config import PLAN_STORE_MAX_SESSIONS
+from src.schemas.patient import WeeklyPlan
+
+
+@dataclass
+class StoredPlan:
+    """The current plan of a chat session and the restrictions it was built with."""
+
+    plan: WeeklyPlan
+    restricciones: list[str] = field(default_factory=list)
+
+
+class PlanStore:
+    """
+    LRU map of session_id -> StoredPlan, private to this process. Lets the
+    plan tools edit the plan in place instead of passing it through the
+    model's context on every change.
+    """
+
+    def __init__(self, max_sessions: int) -> None:
+        self.max_sessions = max_sessions
+        self._plans: OrderedDict[str, StoredPlan] = OrderedDict()
+        self._lock = threading.Lock()
+        # Held while a tool edits a stored plan; the model may run tools in parallel.
+        self.editing = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._plans)
+
+    def get(self, session_id: str) -> StoredPlan | None:
+        with self._lock:
+            stored = self._plans.get(session_id)
+            if stored is not None:
+                self._plans.move_to_end(session_id)
+            return stored
+
+    def put(self, session_id: str, stored: StoredPlan) -> None:
+        with self._lock:
+            self._plans[session_id] = stored
+            self._plans.move_to_end(session_id)
+            while len(self._plans) > self.max_sessions:
+                self._plans.popitem(last=False)
+
+
+plan_store = PlanStore(PLAN_STORE_MAX_SESSIONS)
@@ -1,8 +1,21 @@
 import json
-from typing import Dict, List
 
-from src.db.queries import search_meals
-from src.schemas.patient import WeeklyPlan
+import numpy as np
+from agno.run.base import RunContext
+
+from src.config import PLAN_OPTIMIZER_ROUNDS, PLAN_OPTIMIZER_TIME_BUDGET_SECONDS
+from src.db.meal_catalog import CatalogSnapshot, meal_catalog
+from src.schemas.patient import (
+    DayPlan,
+    MealSlot,
+    NutritionalRequirements,
+    Objective,
+    WeeklyPlan,
+)
+from src.tools.calculations import calcular_macros
+from src.tools.patient_tools import _normalize_objetivo
+from src.tools.plan_optimizer import optimize_week, score_slot_candidates
+from src.tools.plan_store import StoredPlan, plan_store
 
 
 DAY_NAMES = [
@@ -16,184 +29,317 @@ DAY_NAMES = [
 ]
 
 
-def _select_meal(
-    meals: list[dict],
-    used_counts: Dict[str, int],
-    max_repeats: int = 2,
-) -> dict | None:
-    def meal_key(item: dict) -> str:
-        name = (item.get("name") or "").strip().lower()
-        meal_type = (item.get("meal_type") or "").strip().lower()
-        return f"{meal_type}:{name}"
-
-    sorted_meals = sorted(meals, key=lambda m: used_counts.get(meal_key(m), 0))
-    for meal in sorted_meals:
-        key = meal_key(meal)
-        if used_counts.get(key, 0) < max_repeats:
-            used_counts[key] = used_counts.get(key, 0) + 1
-            return meal
-    return None
+# Fraccion de las calorias diarias para cada comida.
+DISTRIBUCION_CALORICA = {
+    "desayuno": 0.25,
+    "almuerzo": 0.35,
+    "cena": 0.30,
+    "snack": 0.10,
+}
 
+MAX_REPETICIONES = 2
+ALTERNATIVAS = 3
 
-def generar_plan_semanal(
-    calorias_objetivo: int,
-    restricciones: list[str] | None = None,
-    preferencias: list[str] | None = None,
-    paciente: str = "Paciente",
-    objetivo: str = "objetivo",
-) -> str:
-    """
-    Genera un plan semanal simple usando comidas disponibles en la base.
-    """
-    restricciones = restricciones or []
-    preferencias = preferencias or []
 
-    distribucion = {
-        "desayuno": int(calorias_objetivo * 0.25),
-        "almuerzo": int(calorias_objetivo * 0.35),
-        "cena": int(calorias_objetivo * 0.30),
-        "snack": int(calorias_objetivo * 0.10),
-    }
+def _meal_key(item: dict) -> str:
+    name = (item.get("name") or "").strip().lower()
+    meal_type = (item.get("meal_type") or "").strip().lower()
+    return f"{meal_type}:{name}"
 
-    used_counts: Dict[str, int] = {}
-    dias = []
 
-    for dia in DAY_NAMES:
-        comidas = []
-        total_calorias = 0
-        total_proteina = 0.0
-        total_carbohidratos = 0.0
-        total_grasa = 0.0
-
-        for tipo, kcal in distribucion.items():
-            meals = search_meals(
-                meal_type=tipo,
-                max_calories=kcal + 150,
-                exclude=restricciones,
-                limit=25,
-            )
+def _slot_key(slot: MealSlot) -> str:
+    return f"{slot.tipo.strip().lower()}:{slot.nombre.strip().lower()}"
 
-            if preferencias:
-                meals = [
-                    meal
-                    for meal in meals
-                    if any(pref.lower() in [t.lower() for t in meal.get("tags", [])] for pref in preferencias)
-                ]
 
-            selected = _select_meal(meals, used_counts)
-            if not selected:
-                continue
-
-            ingredients = [
-                _format_ingredient(
-                    mi["ingredients"]["canonical_name"],
-                    mi.get("quantity"),
-                    mi.get("unit"),
-                )
-                for mi in selected.get("meal_ingredients", [])
-                if mi.get("ingredients")
-            ]
-
-            comidas.append(
-                {
-                    "meal_id": selected["id"],
-                    "nombre": selected["name"],
-                    "tipo": selected.get("meal_type"),
-                    "calorias": selected.get("calories") or 0,
-                    "proteina_g": float(selected.get("protein_g") or 0),
-                    "carbohidratos_g": float(selected.get("carbs_g") or 0),
-                    "grasa_g": float(selected.get("fat_g") or 0),
-                    "ingredientes": ingredients,
-                }
+def _objetivo_enum(objetivo: str) -> Objective:
+    try:
+        return _normalize_objetivo(objetivo)
+    except ValueError:
+        return Objective.MAINTAIN
+
+
+def _plan_slot(meal: dict) -> dict:
+    return {
+        "meal_id": meal["id"],
+        "nombre": meal["name"],
+        "tipo": meal.get("meal_type"),
+        "calorias": meal.get("calories") or 0,
+        "proteina_g": float(meal.get("protein_g") or 0),
+        "carbohidratos_g": float(meal.get("carbs_g") or 0),
+        "grasa_g": float(meal.get("fat_g") or 0),
+        "ingredientes": [
+            _format_ingredient(
+                mi["ingredients"]["canonical_name"],
+                mi.get("quantity"),
+                mi.get("unit"),
             )
+            for mi in meal.get("meal_ingredients", [])
+            if mi.get("ingredients")
+        ],
+    }
+
+
+_cached_arrays: tuple[CatalogSnapshot, np.ndarray, np.ndarray] | None = None
+
 
-            total_calorias += selected.get("calories") or 0
-            total_proteina += float(selected.get("protein_g") or 0)
-            total_carbohidratos += float(selected.get("carbs_g") or 0)
-            total_grasa += float(selected.get("fat_g") or 0)
+def _catalog_arrays(catalogo: CatalogSnapshot) -> tuple[np.ndarray, np.ndarray]:
+    """Nutrient matrix and repeat groups of a snapshot, computed once per snapshot."""
+    global _cached_arrays
+    cached = _cached_arrays
+    if cached is not None and cached[0] is catalogo:
+        return cached[1], cached[2]
+    nutrientes = np.nan_to_num(
+        np.column_stack(
+            [catalogo.calories, catalogo.protein_g, catalogo.carbs_g, catalogo.fat_g]
+        )
+    )
+    _, grupos = np.unique([_meal_key(row) for row in catalogo.rows], return_inverse=True)
+    grupos = grupos.reshape(-1)
+    _cached_arrays = (catalogo, nutrientes, grupos)
+    return nutrientes, grupos
+
+
+def construir_plan(
+    catalogo: CatalogSnapshot,
+    requerimientos: NutritionalRequirements,
+    restricciones: list[str],
+    preferencias: list[str],
+    paciente: str,
+    objetivo: str,
+) -> WeeklyPlan:
+    """Plan semanal optimizado sobre un snapshot del catalogo, sin acceso a la base."""
+    candidatos = [
+        np.flatnonzero(
+            catalogo.mask(meal_type=tipo, exclude=restricciones, tags=preferencias)
+            & ~np.isnan(catalogo.calories)
+        )
+        for tipo in DISTRIBUCION_CALORICA
+    ]
+    nutrientes, grupos = _catalog_arrays(catalogo)
+    objetivos = np.array(
+        [
+            requerimientos.calorias_objetivo,
+            requerimientos.proteina_g,
+            requerimientos.carbohidratos_g,
+            requerimientos.grasa_g,
+        ],
+        dtype=np.float64,
+    )
+    plan_indices = optimize_week(
+        candidatos,
+        nutrientes,
+        grupos,
+        np.maximum(objetivos, 1.0),
+        np.array(list(DISTRIBUCION_CALORICA.values())),
+        days=len(DAY_NAMES),
+        max_repeats=MAX_REPETICIONES,
+        rounds=PLAN_OPTIMIZER_ROUNDS,
+        time_budget=PLAN_OPTIMIZER_TIME_BUDGET_SECONDS,
+    )
 
+    dias = []
+    for dia, indices in zip(DAY_NAMES, plan_indices):
+        comidas = [_plan_slot(catalogo.rows[index]) for index in indices if index >= 0]
         dias.append(
             {
                 "dia": dia,
                 "comidas": comidas,
-                "total_calorias": total_calorias,
-                "total_proteina": round(total_proteina, 1),
-                "total_carbohidratos": round(total_carbohidratos, 1),
-                "total_grasa": round(total_grasa, 1),
+                "total_calorias": sum(c["calorias"] for c in comidas),
+                "total_proteina": round(sum(c["proteina_g"] for c in comidas), 1),
+                "total_carbohidratos": round(sum(c["carbohidratos_g"] for c in comidas), 1),
+                "total_grasa": round(sum(c["grasa_g"] for c in comidas), 1),
             }
         )
 
-    plan = WeeklyPlan(
+    return WeeklyPlan(
         paciente=paciente,
         objetivo=objetivo,
-        requerimientos={
-            "tmb": 0,
-            "tdee": 0,
-            "calorias_objetivo": calorias_objetivo,
-            "proteina_g": 0,
-            "carbohidratos_g": 0,
-            "grasa_g": 0,
-            "fibra_g": 0,
-            "notas": [],
-        },
+        requerimientos=requerimientos,
         dias=dias,
     )
+
+
+def generar_plan_semanal(
+    calorias_objetivo: int,
+    restricciones: list[str] | None = None,
+    preferencias: list[str] | None = None,
+    paciente: str = "Paciente",
+    objetivo: str = "objetivo",
+    proteina_g: int | None = None,
+    carbohidratos_g: int | None = None,
+    grasa_g: int | None = None,
+    run_context: RunContext | None = None,
+) -> str:
+    """
+    Genera un plan semanal eligiendo las 28 comidas a la vez para acercar
+    cada dia a las calorias y macros objetivo (los de registrar_paciente).
+    Si no se indican los macros se calculan segun el objetivo.
+    """
+    restricciones = restricciones or []
+    preferencias = preferencias or []
+
+    macros = calcular_macros(calorias_objetivo, _objetivo_enum(objetivo))
+    requerimientos = NutritionalRequirements(
+        tmb=0,
+        tdee=0,
+        calorias_objetivo=calorias_objetivo,
+        proteina_g=macros[0] if proteina_g is None else proteina_g,
+        carbohidratos_g=macros[1] if carbohidratos_g is None else carbohidratos_g,
+        grasa_g=macros[2] if grasa_g is None else grasa_g,
+        fibra_g=0,
+        notas=[],
+    )
+    plan = construir_plan(
+        meal_catalog.snapshot(), requerimientos, restricciones, preferencias, paciente, objetivo
+    )
+    if run_context is not None:
+        plan_store.put(run_context.session_id, StoredPlan(plan, restricciones))
     return plan.model_dump_json(indent=2)
 
 
+def _find_day(plan: WeeklyPlan, dia: str) -> DayPlan | None:
+    for day in plan.dias:
+        if day.dia.lower() == dia.strip().lower():
+            return day
+    return None
+
+
+def _week_uses(plan: WeeklyPlan, skip: MealSlot | None) -> dict[str, int]:
+    uses: dict[str, int] = {}
+    for day in plan.dias:
+        for slot in day.comidas:
+            if slot is not skip:
+                uses[_slot_key(slot)] = uses.get(_slot_key(slot), 0) + 1
+    return uses
+
+
+def _slot_nutrients(slot: MealSlot | None) -> np.ndarray:
+    if slot is None:
+        return np.zeros(4)
+    return np.array([slot.calorias, slot.proteina_g, slot.carbohidratos_g, slot.grasa_g])
+
+
+def _move_totals(day: DayPlan, old: MealSlot | None, new: MealSlot) -> None:
+    """Update the day's totals by the difference between the two slots."""
+    delta = _slot_nutrients(new) - _slot_nutrients(old)
+    day.total_calorias = int(round(day.total_calorias + delta[0]))
+    day.total_proteina = round(day.total_proteina + delta[1], 1)
+    day.total_carbohidratos = round(day.total_carbohidratos + delta[2], 1)
+    day.total_grasa = round(day.total_grasa + delta[3], 1)
+
+
 def reemplazar_comida(
-    plan_json: str,
     dia: str,
     tipo_comida: str,
     max_calorias: int | None = None,
     debe_incluir: list[str] | None = None,
     excluir: list[str] | None = None,
+    meal_id: int | None = None,
+    run_context: RunContext | None = None,
 ) -> str:
     """
-    Reemplaza una comida especifica en un plan semanal.
+    Reemplaza una comida del plan semanal actual (el ultimo generado con
+    generar_plan_semanal en esta conversacion). Elige la comida que mejor
+    acerca el dia a sus calorias y macros objetivo, sin repetir una comida
+    mas de 2 veces por semana ni usar ingredientes restringidos. Devuelve
+    solo la comida nueva, los totales del dia y algunas alternativas; para
+    usar una alternativa vuelve a llamar con su meal_id.
     """
-    plan = json.loads(plan_json)
-    days = plan.get("dias", [])
-
-    meals = search_meals(
-        meal_type=tipo_comida,
-        max_calories=max_calorias,
-        must_include=debe_incluir,
-        exclude=excluir,
-        limit=10,
-    )
-    if not meals:
-        return json.dumps({"error": "No se encontraron comidas alternativas"})
-
-    selected = meals[0]
-    ingredients = [
-        _format_ingredient(
-            mi["ingredients"]["canonical_name"],
-            mi.get("quantity"),
-            mi.get("unit"),
+    stored = plan_store.get(run_context.session_id) if run_context is not None else None
+    if stored is None:
+        return json.dumps({"error": "No hay un plan activo. Genera uno con generar_plan_semanal."})
+
+    with plan_store.editing:
+        plan = stored.plan
+        day = _find_day(plan, dia)
+        if day is None:
+            return json.dumps({"error": f"El plan no tiene el dia {dia}"})
+        position = next(
+            (index for index, slot in enumerate(day.comidas) if slot.tipo == tipo_comida), None
         )
-        for mi in selected.get("meal_ingredients", [])
-        if mi.get("ingredients")
-    ]
+        old = day.comidas[position] if position is not None else None
+
+        catalogo = meal_catalog.snapshot()
+        mask = catalogo.mask(
+            meal_type=tipo_comida,
+            max_calories=max_calorias,
+            must_include=debe_incluir,
+            exclude=[*stored.restricciones, *(excluir or [])],
+        ) & ~np.isnan(catalogo.calories)
+        if meal_id is not None:
+            mask &= catalogo.ids == meal_id
+        if old is not None and old.meal_id is not None:
+            mask &= catalogo.ids != old.meal_id
+
+        week_uses = _week_uses(plan, old)
+        candidates = np.flatnonzero(mask)
+        uses = np.array(
+            [week_uses.get(_meal_key(catalogo.rows[index]), 0) for index in candidates],
+            dtype=np.float64,
+        )
+        allowed = uses < MAX_REPETICIONES
+        candidates, uses = candidates[allowed], uses[allowed]
+        if not len(candidates):
+            return json.dumps({"error": "No se encontraron comidas alternativas"})
 
-    for day in days:
-        if day.get("dia", "").lower() == dia.lower():
-            for idx, slot in enumerate(day.get("comidas", [])):
-                if slot.get("tipo") == tipo_comida:
-                    day["comidas"][idx] = {
-                        "meal_id": selected["id"],
-                        "nombre": selected["name"],
-                        "tipo": selected.get("meal_type"),
-                        "calorias": selected.get("calories") or 0,
-                        "proteina_g": float(selected.get("protein_g") or 0),
-                        "carbohidratos_g": float(selected.get("carbs_g") or 0),
-                        "grasa_g": float(selected.get("fat_g") or 0),
-                        "ingredientes": ingredients,
-                    }
-            break
-
-    plan["dias"] = days
-    return json.dumps(plan, indent=2)
+        req = plan.requerimientos
+        targets = np.maximum(
+            [req.calorias_objetivo, req.proteina_g, req.carbohidratos_g, req.grasa_g], 1.0
+        )
+        rest_of_day = (
+            np.array(
+                [day.total_calorias, day.total_proteina, day.total_carbohidratos, day.total_grasa]
+            )
+            - _slot_nutrients(old)
+        )
+        candidate_nutrients = np.nan_to_num(
+            np.column_stack(
+                [
+                    catalogo.calories[candidates],
+                    catalogo.protein_g[candidates],
+                    catalogo.carbs_g[candidates],
+                    catalogo.fat_g[candidates],
+                ]
+            )
+        )
+        scores = score_slot_candidates(
+            candidate_nutrients,
+            rest_of_day,
+            targets,
+            DISTRIBUCION_CALORICA.get(tipo_comida, 0.25),
+            uses,
+        )
+        ranked = candidates[np.argsort(scores, kind="stable")[: ALTERNATIVAS + 1]]
+
+        new = MealSlot(**_plan_slot(catalogo.rows[ranked[0]]))
+        if position is None:
+            day.comidas.append(new)
+        else:
+            day.comidas[position] = new
+        _move_totals(day, old, new)
+
+    return json.dumps(
+        {
+            "dia": day.dia,
+            "reemplazada": old.nombre if old is not None else None,
+            "comida": new.model_dump(),
+            "totales_dia": {
+                "calorias": day.total_calorias,
+                "proteina_g": day.total_proteina,
+                "carbohidratos_g": day.total_carbohidratos,
+                "grasa_g": day.total_grasa,
+            },
+            "alternativas": [
+                {
+                    "meal_id": catalogo.rows[index]["id"],
+                    "nombre": catalogo.rows[index]["name"],
+                    "calorias": catalogo.rows[index].get("calories"),
+                }
+                for index in ranked[1:]
+            ],
+        },
+        indent=2,
+    )
 
 
 def _format_ingredient(name: str, quantity: float | None, unit: str | None) -> str:
@@ -1,6 +1,7 @@
 import json
 
-from src.db.queries import search_meals
+from src.db.meal_catalog import meal_catalog
+from src.db.queries import get_meal_by_id, search_meals_semantic
 from src.db.supabase_client import get_supabase_client
 
 
@@ -14,32 +15,49 @@ def buscar_comidas(
     excluir: list[str] | None = None,
     tags: list[str] | None = None,
     limite: int = 5,
+    consulta: str | None = None,
 ) -> str:
     """
     Busca comidas en la base de datos segun criterios especificos.
+    Usa consulta para describir en lenguaje natural lo que se busca
+    (por ejemplo "algo ligero con pollo para la cena"); los resultados
+    se ordenan por similitud y se siguen aplicando los demas filtros.
     """
-    meals = search_meals(
-        must_include=debe_incluir,
-        exclude=excluir,
-        max_calories=max_calorias,
-        min_protein=min_proteina,
-        meal_type=tipo_comida,
-        limit=limite * 2,
-    )
-
-    if min_calorias:
-        meals = [meal for meal in meals if meal.get("calories", 0) >= min_calorias]
-
-    if max_carbohidratos:
-        meals = [meal for meal in meals if meal.get("carbs_g", 0) <= max_carbohidratos]
-
-    if tags:
-        tags_lower = [tag.lower() for tag in tags]
-        meals = [
-            meal
-            for meal in meals
-            if any(tag in [t.lower() for t in meal.get("tags", [])] for tag in tags_lower)
-        ]
+    if consulta:
+        meals = search_meals_semantic(
+            consulta,
+            must_include=debe_incluir,
+            exclude=excluir,
+            max_calories=max_calorias,
+            min_protein=min_proteina,
+            meal_type=tipo_comida,
+            tags=tags,
+            limit=limite * 2,
+        )
+        # match_meals has no minimum calories or maximum carbs; like the
+        # catalog, a meal without the value does not pass the bound.
+        if min_calorias:
+            meals = [
+                meal for meal in meals
+                if meal.get("calories") is not None and meal["calories"] >= min_calorias
+            ]
+        if max_carbohidratos:
+            meals = [
+                meal for meal in meals
+                if meal.get("carbs_g") is not None and meal["carbs_g"] <= max_carbohidratos
+            ]
+    else:
+        meals = meal_catalog.search(
+            must_include=debe_incluir,
+            exclude=excluir,
+            max_calories=max_calorias,
+            min_calories=min_calorias or None,
+            min_protein=min_proteina,
+            max_carbs=max_carbohidratos or None,
+            meal_type=tipo_comida,
+            tags=tags,
+            limit=limite,
+        )
 
     meals = meals[:limite]
 
@@ -80,18 +98,10 @@ def obtener_detalle_comida(meal_id: int) -> str:
     """
     Obtiene los detalles completos de una comida especifica.
     """
-    supabase = get_supabase_client()
-    result = (
-        supabase.table("meals")
-        .select("*, meal_ingredients(quantity, unit, ingredients(canonical_name))")
-        .eq("id", meal_id)
-        .execute()
-    )
-
-    if not result.data:
+    meal = get_meal_by_id(meal_id)
+    if not meal:
         return json.dumps({"error": "Comida no encontrada"})
 
-    meal = result.data[0]
     ingredients = [
         {
             "nombre": mi["ingredients"]["canonical_name"],
@@ -0,0 +1,69 @@
+import re
+from typing import Iterable, Iterator
+
+from src.config import EXTRACTION_CHUNK_CHARS, EXTRACTION_CHUNK_OVERLAP
+
+_BLANK_LINES = re.compile(r"\n\s*\n")
+
+
+def chunk_pages(
+    pages: Iterable[str],
+    max_chars: int = EXTRACTION_CHUNK_CHARS,
+    overlap_chars: int = EXTRACTION_CHUNK_OVERLAP,
+) -> Iterator[str]:
+    """
+    Pack pages into chunks of at most max_chars, cutting only between pages,
+    or between paragraphs (usually recipes) when a single page is too long.
+    Each chunk starts with the last overlap_chars of the previous one so a
+    recipe split across the boundary is seen whole at least once.
+    """
+    # Pieces are cut small enough to fit after a full overlap and its newline,
+    # so the overlap never pushes a chunk past max_chars.
+    unit_chars = max_chars - overlap_chars - 1 if overlap_chars > 0 else max_chars
+    if unit_chars <= 0:
+        raise ValueError("overlap_chars must be smaller than max_chars")
+
+    # current_chars is the length of the joined chunk plus one.
+    current: list[str] = []
+    current_chars = 0
+    for page in pages:
+        for unit in _units(page, unit_chars):
+            if current and current_chars + len(unit) > max_chars:
+                chunk = "\n".join(current)
+                yield chunk
+                tail = _tail(chunk, overlap_chars)
+                current = [tail] if tail else []
+                current_chars = len(tail) + 1 if tail else 0
+            current.append(unit)
+            current_chars += len(unit) + 1
+    if current:
+        yield "\n".join(current)
+
+
+def _units(page: str, max_chars: int) -> list[str]:
+    page = page.strip()
+    if not page:
+        return []
+    if len(page) <= max_chars:
+        return [page]
+
+    units = []
+    for paragraph in _BLANK_LINES.split(page):
+        paragraph = paragraph.strip()
+        while len(paragraph) > max_chars:
+            cut = paragraph.rfind("\n", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            units.append(paragraph[:cut])
+            paragraph = paragraph[cut:].lstrip()
+        if paragraph:
+            units.append(paragraph)
+    return units
+
+
+def _tail(chunk: str, overlap_chars: int) -> str:
+    if overlap_chars <= 0 or len(chunk) <= overlap_chars:
+        return ""
+    tail = chunk[-overlap_chars:]
+    line_start = tail.find("\n")
+    return tail[line_start + 1 :] if line_start >= 0 else tail
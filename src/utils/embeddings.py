@@ -0,0 +1,90 @@
+import random
+import time
+
+import openai
+
+from src.config import (
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_MAX_RETRIES,
+    EMBEDDING_MODEL,
+    OPENAI_API_KEY,
+)
+from src.utils.embedding_cache import get_embedding_cache
+
+# Keeps a single request well under the endpoint's per-request token limit
+# (roughly four characters per token for Spanish text).
+EMBEDDING_BATCH_MAX_CHARS = 400_000
+
+_RETRYABLE_ERRORS = (
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+    openai.RateLimitError,
+)
+
+_client: openai.OpenAI | None = None
+
+
+def get_openai_client() -> openai.OpenAI:
+    global _client
+    if _client is None:
+        if OPENAI_API_KEY is None:
+            raise ValueError("OPENAI_API_KEY is required")
+        _client = openai.OpenAI(api_key=OPENAI_API_KEY)
+    return _client
+
+
+def set_openai_client(client: openai.OpenAI | None) -> None:
+    """Replace the embeddings client, e.g. with a local fake in tests. None resets it."""
+    global _client
+    _client = client
+
+
+def embed_text(text: str) -> list[float]:
+    return embed_texts([text])[0]
+
+
+def embed_texts(texts: list[str], batch_size: int = EMBEDDING_BATCH_SIZE) -> list[list[float]]:
+    cache = get_embedding_cache()
+    known = cache.get_many(EMBEDDING_MODEL, texts) if cache else {}
+
+    missing = [text for text in dict.fromkeys(texts) if text not in known]
+    computed: dict[str, list[float]] = {}
+    for batch in _batches(missing, batch_size):
+        computed.update(zip(batch, _create_embeddings(batch)))
+    if cache:
+        cache.put_many(EMBEDDING_MODEL, computed)
+
+    known.update(computed)
+    return [known[text] for text in texts]
+
+
+def _batches(texts: list[str], batch_size: int) -> list[list[str]]:
+    batches: list[list[str]] = []
+    current: list[str] = []
+    current_chars = 0
+    for text in texts:
+        if current and (
+            len(current) >= batch_size or current_chars + len(text) > EMBEDDING_BATCH_MAX_CHARS
+        ):
+            batches.append(current)
+            current, current_chars = [], 0
+        current.append(text)
+        current_chars += len(text)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _create_embeddings(inputs: list[str]) -> list[list[float]]:
+    client = get_openai_client()
+    for attempt in range(EMBEDDING_MAX_RETRIES + 1):
+        try:
+            response = client.embeddings.create(model=EMBEDDING_MODEL, input=inputs)
+            break
+        except _RETRYABLE_ERRORS:
+            if attempt == EMBEDDING_MAX_RETRIES:
+                raise
+            time.sleep(min(2**attempt, 30) + random.uniform(0, 1))
+    ordered = sorted(response.data, key=lambda item: item.index)
+    return [item.embedding for item in ordered]
@@ -0,0 +1,15 @@
+import hashlib
+
+FILE_READ_SIZE = 1024 * 1024
+
+
+def text_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as handle:
+        while chunk := handle.read(FILE_READ_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,45 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+
+class JobEventBus:
+    """
+    In-process pub/sub of ingestion job events, one asyncio queue per
+    subscriber. Workers publish from their own threads; each event is handed
+    to the subscriber's event loop with call_soon_threadsafe.
+    """
+
+    def __init__(self) -> None:
+        self._subscribers: dict[
+            str, list[tuple[asyncio.Queue, asyncio.AbstractEventLoop]]
+        ] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        """Must be called from the event loop that will read the queue."""
+        subscriber: asyncio.Queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._subscribers[job_id].append((subscriber, loop))
+        return subscriber
+
+    def unsubscribe(self, job_id: str, subscriber: asyncio.Queue) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(job_id, [])
+            subscribers[:] = [entry for entry in subscribers if entry[0] is not subscriber]
+            if not subscribers:
+                self._subscribers.pop(job_id, None)
+
+    def publish(self, job_id: str, event: dict) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(job_id, []))
+        for subscriber, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(subscriber.put_nowait, event)
+            except RuntimeError:
+                # The subscriber's loop has closed; its stream is gone.
+                pass
+
+
+job_events = JobEventBus()
@@ -0,0 +1,142 @@
+import logging
+import socket
+import threading
+from pathlib import Path
+from uuid import uuid4
+
+from src.config import (
+    INGESTION_MAX_ATTEMPTS,
+    INGESTION_POLL_INTERVAL,
+    INGESTION_VISIBILITY_TIMEOUT,
+    INGESTION_WORKER_CONCURRENCY,
+)
+from src.db.jobs import claim_job, extend_job_lease
+from src.workers.progress import track_job
+from src.workflows.extraction import meal_extraction_workflow
+
+logger = logging.getLogger(__name__)
+
+
+def run_ingestion(job: dict) -> None:
+    """Run the extraction workflow for a claimed job and record the outcome."""
+    file_path = job.get("file_path")
+    with track_job(job["id"]) as progress:
+        try:
+            if not file_path or not Path(file_path).exists():
+                raise FileNotFoundError(f"Uploaded file not found: {file_path}")
+            run_output = meal_extraction_workflow.run(
+                additional_data={
+                    "job_id": job["id"],
+                    "file_path": file_path,
+                    "document_path": file_path,
+                    "content_hash": job.get("content_hash"),
+                },
+            )
+            # agno only raises when a step throws; a step that reports
+            # failure (e.g. the save step during a Supabase outage) still
+            # ends the run normally.
+            failed_step = next(
+                (step for step in run_output.step_results or [] if not step.success), None
+            )
+            if failed_step is not None:
+                raise RuntimeError(str(failed_step.content))
+        except Exception as exc:
+            final = isinstance(exc, FileNotFoundError) or (
+                job.get("attempts", 1) >= INGESTION_MAX_ATTEMPTS
+            )
+            # A non-final failure goes back to the queue; the extraction
+            # cache makes the retry cheap.
+            progress.finish("failed" if final else "queued", error=str(exc))
+            if final:
+                _remove_upload(file_path)
+            return
+
+        progress.finish("completed", summary=str(run_output.content), saved=True)
+    _remove_upload(file_path)
+
+
+def _remove_upload(file_path: str | None) -> None:
+    if file_path and Path(file_path).exists():
+        Path(file_path).unlink()
+
+
+class _LeaseKeeper:
+    """Extends a job's lease in the background while the job is running."""
+
+    def __init__(self, job_id: str, worker_id: str) -> None:
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self) -> "_LeaseKeeper":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(INGESTION_VISIBILITY_TIMEOUT / 3):
+            try:
+                extend_job_lease(self.job_id, self.worker_id)
+            except Exception as exc:
+                logger.warning("Could not extend lease for job %s: %s", self.job_id, exc)
+
+
+def _worker_loop(worker_id: str, stop_event: threading.Event) -> None:
+    while not stop_event.is_set():
+        try:
+            job = claim_job(worker_id)
+        except Exception as exc:
+            logger.warning("Could not claim ingestion job: %s", exc)
+            job = None
+
+        if job is None:
+            stop_event.wait(INGESTION_POLL_INTERVAL)
+            continue
+
+        logger.info(
+            "Worker %s processing job %s (attempt %s)", worker_id, job["id"], job.get("attempts")
+        )
+        try:
+            with _LeaseKeeper(job["id"], worker_id):
+                run_ingestion(job)
+        except Exception:
+            # E.g. the final status could not be written. The lease expires
+            # and the job is claimed again; this thread keeps serving others.
+            logger.exception("Ingestion job %s failed in worker %s", job["id"], worker_id)
+
+
+def start_workers(
+    concurrency: int = INGESTION_WORKER_CONCURRENCY,
+    stop_event: threading.Event | None = None,
+) -> tuple[list[threading.Thread], threading.Event]:
+    stop_event = stop_event or threading.Event()
+    prefix = f"{socket.gethostname()}-{uuid4().hex[:8]}"
+    threads = [
+        threading.Thread(
+            target=_worker_loop,
+            args=(f"{prefix}-{index}", stop_event),
+            name=f"ingestion-worker-{index}",
+            daemon=True,
+        )
+        for index in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    return threads, stop_event
+
+
+def run_workers(concurrency: int = INGESTION_WORKER_CONCURRENCY) -> None:
+    """Block running `concurrency` workers until interrupted."""
+    threads, stop_event = start_workers(concurrency)
+    try:
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(timeout=1)
+    except KeyboardInterrupt:
+        stop_event.set()
+        for thread in threads:
+            thread.join()
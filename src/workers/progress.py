@@ -0,0 +1,151 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from agno.workflow import StepInput
+
+from src.db.jobs import update_job
+from src.workers.events import job_events
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_FIELDS = (
+    "pages_loaded",
+    "chunks_total",
+    "chunks_extracted",
+    "meals_extracted",
+    "meals_embedded",
+    "meals_saved",
+    "meals_skipped",
+    "meals_failed",
+)
+
+# Progress is written to ingestion_jobs at most this often, plus at every
+# stage start and end.
+FLUSH_INTERVAL_SECONDS = 1.0
+
+
+class JobProgress:
+    """Counters and stage timings of one ingestion job, flushed to its row."""
+
+    def __init__(self, job_id: Optional[str]) -> None:
+        self.job_id = job_id
+        self.stage: Optional[str] = None
+        self.counts = dict.fromkeys(PROGRESS_FIELDS, 0)
+        self.timings: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+
+    def add(self, field: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counts[field] += amount
+        self._changed()
+
+    def set(self, field: str, value: int) -> None:
+        with self._lock:
+            self.counts[field] = value
+        self._changed()
+
+    def reset(self, *fields: str) -> None:
+        """Zero counters that a step is about to count again, e.g. when agno retries it."""
+        with self._lock:
+            for field in fields:
+                self.counts[field] = 0
+        self._changed()
+
+    @contextmanager
+    def timed(self, stage: str) -> Iterator[None]:
+        self.stage = stage
+        self._changed(force=True)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.timings[stage] = round(self.timings.get(stage, 0.0) + elapsed, 3)
+            self._changed(force=True)
+
+    def event(self, status: str = "processing", **fields) -> dict:
+        with self._lock:
+            timings = dict(self.timings)
+        return {"status": status, "progress": self.snapshot(), "timings": timings, **fields}
+
+    def finish(
+        self,
+        status: str,
+        summary: Optional[str] = None,
+        error: Optional[str] = None,
+        saved: bool = False,
+    ) -> None:
+        """Write the final state of this attempt and tell subscribers about it."""
+        if self.job_id is None:
+            return
+        event = self.event(status, summary=summary, error=error)
+        update_job(
+            self.job_id,
+            status,
+            summary=summary,
+            error=error,
+            progress=event["progress"],
+            timings=event["timings"],
+            saved=saved,
+        )
+        job_events.publish(self.job_id, event)
+
+    def _changed(self, force: bool = False) -> None:
+        if self.job_id is None:
+            return
+        job_events.publish(self.job_id, self.event())
+        self.flush(force=force)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"stage": self.stage, **self.counts}
+
+    def flush(self, force: bool = False) -> None:
+        if self.job_id is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_flush < FLUSH_INTERVAL_SECONDS:
+                return
+            self._last_flush = now
+            timings = dict(self.timings)
+        try:
+            update_job(self.job_id, "processing", progress=self.snapshot(), timings=timings)
+        except Exception as exc:
+            logger.warning("Could not write progress for job %s: %s", self.job_id, exc)
+
+
+_active: dict[str, JobProgress] = {}
+_active_lock = threading.Lock()
+
+
+@contextmanager
+def track_job(job_id: str) -> Iterator[JobProgress]:
+    progress = JobProgress(job_id)
+    with _active_lock:
+        _active[job_id] = progress
+    job_events.publish(job_id, progress.event())
+    try:
+        yield progress
+    finally:
+        with _active_lock:
+            _active.pop(job_id, None)
+
+
+def progress_for(step_input: StepInput) -> JobProgress:
+    """Progress of the job running this step; a detached one outside jobs."""
+    job_id = (step_input.additional_data or {}).get("job_id")
+    with _active_lock:
+        progress = _active.get(job_id) if job_id else None
+    return progress or JobProgress(None)
+
+
+def is_tracked(job_id: str) -> bool:
+    """Whether the job is running in this process, so its events are local."""
+    with _active_lock:
+        return job_id in _active
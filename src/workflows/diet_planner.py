@@ -3,7 +3,7 @@ import json
 from agno.agent import Agent
 from agno.models.openai import OpenAIChat
 
-from src.db.queries import search_meals
+from src.db.meal_catalog import meal_catalog
 from src.db.supabase_client import get_supabase_client
 
 
@@ -18,7 +18,7 @@ def buscar_comidas(
     """
     Buscar comidas en la base de datos.
     """
-    meals = search_meals(
+    meals = meal_catalog.search(
         must_include=debe_incluir,
         exclude=excluir,
         max_calories=max_calorias,
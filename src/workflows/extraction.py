@@ -1,12 +1,12 @@
 from agno.workflow import Step, Workflow
 
-from src.steps.extract_meals import meal_extractor
+from src.steps.extract_meals import extract_meals_in_chunks
 from src.steps.save_to_db import save_meals_to_db
 
-extract_meals_step = Step(
-    name="extract_meals",
-    description="Extraer comidas desde un documento",
-    agent=meal_extractor,
+extract_meals_chunked_step = Step(
+    name="extract_meals_chunked",
+    description="Extraer comidas por fragmentos del documento en paralelo",
+    executor=extract_meals_in_chunks,
 )
 
 save_meals_step = Step(
@@ -17,5 +17,5 @@ save_meals_step = Step(
 
 meal_extraction_workflow = Workflow(
     name="meal_extraction_workflow",
-    steps=[extract_meals_step, save_meals_step],
+    steps=[extract_meals_chunked_step, save_meals_step],
 )
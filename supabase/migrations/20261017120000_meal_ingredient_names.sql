@@ -0,0 +1,19 @@
+-- Denormalized, normalized ingredient names per meal so search_meals can
+-- filter by must_include / exclude in the database instead of in Python.
+
+alter table meals
+    add column if not exists ingredient_names text[] not null default '{}';
+
+update meals m
+set ingredient_names = coalesce(
+    (
+        select array_agg(distinct i.canonical_name)
+        from meal_ingredients mi
+        join ingredients i on i.id = mi.ingredient_id
+        where mi.meal_id = m.id
+    ),
+    '{}'
+);
+
+create index if not exists meals_ingredient_names_idx
+    on meals using gin (ingredient_names);
@@ -0,0 +1,35 @@
+-- Semantic search over meals.embedding (text-embedding-3-small, 1536 dims).
+
+create extension if not exists vector;
+
+create index if not exists meals_embedding_hnsw_idx
+    on meals using hnsw (embedding vector_cosine_ops);
+
+-- Ranks meals by cosine distance to query_embedding and applies the same
+-- filters as search_meals. iterative_scan (pgvector >= 0.8) keeps scanning
+-- the HNSW graph when filters discard candidates, so match_count is honoured.
+create or replace function match_meals(
+    query_embedding vector(1536),
+    match_count int default 10,
+    filter_meal_type text default null,
+    max_calories int default null,
+    min_protein double precision default null,
+    must_include text[] default null,
+    exclude text[] default null
+)
+returns setof meals
+language sql
+stable
+set hnsw.iterative_scan = 'relaxed_order'
+as $$
+    select *
+    from meals
+    where embedding is not null
+      and (filter_meal_type is null or meal_type = filter_meal_type)
+      and (max_calories is null or calories <= max_calories)
+      and (min_protein is null or protein_g >= min_protein)
+      and (must_include is null or ingredient_names @> must_include)
+      and (exclude is null or not ingredient_names && exclude)
+    order by embedding <=> query_embedding
+    limit match_count;
+$$;
@@ -0,0 +1,7 @@
+-- SHA-256 of the uploaded document, used to skip re-ingesting identical files.
+
+alter table ingestion_jobs
+    add column if not exists content_hash text;
+
+create index if not exists ingestion_jobs_content_hash_idx
+    on ingestion_jobs (content_hash);
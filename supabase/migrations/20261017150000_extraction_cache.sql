@@ -0,0 +1,9 @@
+-- Extraction results keyed by document or chunk hash plus extractor prompt
+-- version, so a retried ingestion does not pay for the LLM call again.
+
+create table if not exists extraction_cache (
+    key text primary key,
+    prompt_version text not null,
+    result jsonb not null,
+    created_at timestamptz not null default now()
+);
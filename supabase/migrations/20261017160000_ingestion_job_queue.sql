@@ -0,0 +1,70 @@
+-- Turns ingestion_jobs into a durable work queue. Workers claim jobs with
+-- FOR UPDATE SKIP LOCKED and hold a lease (locked_until) that they extend
+-- while working. A job whose lease expires is picked up again, up to
+-- max_attempts tries; after that it is marked failed.
+
+alter table ingestion_jobs
+    add column if not exists file_path text,
+    add column if not exists attempts int not null default 0,
+    add column if not exists locked_by text,
+    add column if not exists locked_until timestamptz,
+    add column if not exists enqueued_at timestamptz not null default now();
+
+create index if not exists ingestion_jobs_claim_idx
+    on ingestion_jobs (status, enqueued_at);
+
+create or replace function claim_ingestion_job(
+    p_worker_id text,
+    p_visibility_timeout_seconds int,
+    p_max_attempts int
+)
+returns setof ingestion_jobs
+language plpgsql
+as $$
+begin
+    update ingestion_jobs
+    set status = 'failed',
+        error = coalesce(error, 'Worker lease expired too many times'),
+        locked_by = null,
+        locked_until = null
+    where status = 'processing'
+      and locked_until < now()
+      and attempts >= p_max_attempts;
+
+    return query
+    update ingestion_jobs j
+    set status = 'processing',
+        attempts = j.attempts + 1,
+        locked_by = p_worker_id,
+        locked_until = now() + make_interval(secs => p_visibility_timeout_seconds)
+    where j.id = (
+        select id
+        from ingestion_jobs
+        where attempts < p_max_attempts
+          and (
+              status = 'queued'
+              or (status = 'processing' and locked_until < now())
+          )
+        order by enqueued_at
+        for update skip locked
+        limit 1
+    )
+    returning j.*;
+end;
+$$;
+
+create or replace function extend_ingestion_job_lease(
+    p_job_id uuid,
+    p_worker_id text,
+    p_visibility_timeout_seconds int
+)
+returns boolean
+language sql
+as $$
+    update ingestion_jobs
+    set locked_until = now() + make_interval(secs => p_visibility_timeout_seconds)
+    where id = p_job_id
+      and locked_by = p_worker_id
+      and status = 'processing'
+    returning true;
+$$;
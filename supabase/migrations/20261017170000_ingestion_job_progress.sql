@@ -0,0 +1,5 @@
+-- Structured progress counters and per-stage wall-clock durations (seconds).
+
+alter table ingestion_jobs
+    add column if not exists progress jsonb,
+    add column if not exists timings jsonb;
@@ -0,0 +1,117 @@
+-- Updates a meal and, when p_ingredients is given, brings its
+-- meal_ingredients in line with it in the same transaction. Only the
+-- difference is applied: rows for ingredients that went away are deleted,
+-- changed quantities/units are updated and new ingredients are inserted.
+--
+-- p_meal holds the columns to change (absent keys keep their value).
+-- p_ingredients is a JSON array of {name, quantity, unit} with names already
+-- normalized by the caller; a name listed twice keeps its first entry.
+-- Returns the updated meal in the shape the API selects (see MEAL_SELECT),
+-- or null when p_meal_id does not exist. It is built here rather than
+-- embedded by the caller because a caller's embed would read
+-- meal_ingredients with a snapshot taken before this function ran.
+create or replace function update_meal_with_ingredients(
+    p_meal_id bigint,
+    p_meal jsonb default '{}'::jsonb,
+    p_ingredients jsonb default null
+)
+returns json
+language plpgsql
+as $$
+declare
+    v_meal meals;
+begin
+    select * into v_meal from meals where id = p_meal_id for update;
+    if not found then
+        return null;
+    end if;
+
+    v_meal := jsonb_populate_record(v_meal, coalesce(p_meal, '{}'::jsonb));
+    update meals
+    set name = v_meal.name,
+        description = v_meal.description,
+        meal_type = v_meal.meal_type,
+        calories = v_meal.calories,
+        protein_g = v_meal.protein_g,
+        carbs_g = v_meal.carbs_g,
+        fat_g = v_meal.fat_g,
+        fiber_g = v_meal.fiber_g,
+        prep_time_mins = v_meal.prep_time_mins,
+        servings = v_meal.servings,
+        tags = v_meal.tags,
+        ingredient_names = v_meal.ingredient_names
+    where id = p_meal_id;
+
+    if p_ingredients is not null then
+        insert into ingredients (canonical_name)
+        select distinct item->>'name'
+        from jsonb_array_elements(p_ingredients) item
+        on conflict (canonical_name) do nothing;
+
+        -- One statement: every part sees the rows as they were before it,
+        -- and the three parts touch disjoint sets of rows.
+        with wanted as (
+            select distinct on (i.id)
+                i.id as ingredient_id,
+                (item->>'quantity')::double precision as quantity,
+                item->>'unit' as unit
+            from jsonb_array_elements(p_ingredients) with ordinality as items(item, position)
+            join ingredients i on i.canonical_name = item->>'name'
+            order by i.id, position
+        ),
+        removed as (
+            delete from meal_ingredients mi
+            where mi.meal_id = p_meal_id
+              and not exists (
+                  select 1 from wanted w where w.ingredient_id = mi.ingredient_id
+              )
+        ),
+        changed as (
+            update meal_ingredients mi
+            set quantity = w.quantity,
+                unit = w.unit
+            from wanted w
+            where mi.meal_id = p_meal_id
+              and mi.ingredient_id = w.ingredient_id
+              and (mi.quantity, mi.unit) is distinct from (w.quantity, w.unit)
+        )
+        insert into meal_ingredients (meal_id, ingredient_id, quantity, unit)
+        select p_meal_id, w.ingredient_id, w.quantity, w.unit
+        from wanted w
+        where not exists (
+            select 1 from meal_ingredients mi
+            where mi.meal_id = p_meal_id and mi.ingredient_id = w.ingredient_id
+        );
+    end if;
+
+    return (
+        select json_build_object(
+            'id', m.id,
+            'name', m.name,
+            'description', m.description,
+            'meal_type', m.meal_type,
+            'calories', m.calories,
+            'protein_g', m.protein_g,
+            'carbs_g', m.carbs_g,
+            'fat_g', m.fat_g,
+            'fiber_g', m.fiber_g,
+            'prep_time_mins', m.prep_time_mins,
+            'servings', m.servings,
+            'tags', m.tags,
+            'source_document', m.source_document,
+            'meal_ingredients', coalesce((
+                select json_agg(json_build_object(
+                    'quantity', mi.quantity,
+                    'unit', mi.unit,
+                    'ingredients', json_build_object('canonical_name', i.canonical_name)
+                ))
+                from meal_ingredients mi
+                join ingredients i on i.id = mi.ingredient_id
+                where mi.meal_id = m.id
+            ), '[]'::json)
+        )
+        from meals m
+        where m.id = p_meal_id
+    );
+end;
+$$;
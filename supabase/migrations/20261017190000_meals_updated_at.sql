@@ -0,0 +1,163 @@
+-- Version column for meal ETags. updated_at moves whenever the meal row or
+-- any of its meal_ingredients rows changes, so comparing it is enough to
+-- know whether the nested representation the API serves has changed.
+
+alter table meals
+    add column if not exists updated_at timestamptz not null default now();
+
+create or replace function touch_meal_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at := now();
+    return new;
+end;
+$$;
+
+drop trigger if exists meals_touch_updated_at on meals;
+create trigger meals_touch_updated_at
+    before update on meals
+    for each row execute function touch_meal_updated_at();
+
+-- Statement-level, so a bulk insert of ingredient rows touches each meal
+-- once. Meals already stamped in this transaction (new meals, or the row
+-- update_meal_with_ingredients just made) are left alone.
+create or replace function touch_meals_from_ingredients()
+returns trigger
+language plpgsql
+as $$
+begin
+    update meals m
+    set updated_at = now()
+    where m.id in (select distinct meal_id from changed_rows)
+      and m.updated_at <> now();
+    return null;
+end;
+$$;
+
+drop trigger if exists meal_ingredients_touch_on_insert on meal_ingredients;
+create trigger meal_ingredients_touch_on_insert
+    after insert on meal_ingredients
+    referencing new table as changed_rows
+    for each statement execute function touch_meals_from_ingredients();
+
+drop trigger if exists meal_ingredients_touch_on_update on meal_ingredients;
+create trigger meal_ingredients_touch_on_update
+    after update on meal_ingredients
+    referencing new table as changed_rows
+    for each statement execute function touch_meals_from_ingredients();
+
+drop trigger if exists meal_ingredients_touch_on_delete on meal_ingredients;
+create trigger meal_ingredients_touch_on_delete
+    after delete on meal_ingredients
+    referencing old table as changed_rows
+    for each statement execute function touch_meals_from_ingredients();
+
+-- Same function as before, now also returning updated_at.
+create or replace function update_meal_with_ingredients(
+    p_meal_id bigint,
+    p_meal jsonb default '{}'::jsonb,
+    p_ingredients jsonb default null
+)
+returns json
+language plpgsql
+as $$
+declare
+    v_meal meals;
+begin
+    select * into v_meal from meals where id = p_meal_id for update;
+    if not found then
+        return null;
+    end if;
+
+    v_meal := jsonb_populate_record(v_meal, coalesce(p_meal, '{}'::jsonb));
+    update meals
+    set name = v_meal.name,
+        description = v_meal.description,
+        meal_type = v_meal.meal_type,
+        calories = v_meal.calories,
+        protein_g = v_meal.protein_g,
+        carbs_g = v_meal.carbs_g,
+        fat_g = v_meal.fat_g,
+        fiber_g = v_meal.fiber_g,
+        prep_time_mins = v_meal.prep_time_mins,
+        servings = v_meal.servings,
+        tags = v_meal.tags,
+        ingredient_names = v_meal.ingredient_names
+    where id = p_meal_id;
+
+    if p_ingredients is not null then
+        insert into ingredients (canonical_name)
+        select distinct item->>'name'
+        from jsonb_array_elements(p_ingredients) item
+        on conflict (canonical_name) do nothing;
+
+        -- One statement: every part sees the rows as they were before it,
+        -- and the three parts touch disjoint sets of rows.
+        with wanted as (
+            select distinct on (i.id)
+                i.id as ingredient_id,
+                (item->>'quantity')::double precision as quantity,
+                item->>'unit' as unit
+            from jsonb_array_elements(p_ingredients) with ordinality as items(item, position)
+            join ingredients i on i.canonical_name = item->>'name'
+            order by i.id, position
+        ),
+        removed as (
+            delete from meal_ingredients mi
+            where mi.meal_id = p_meal_id
+              and not exists (
+                  select 1 from wanted w where w.ingredient_id = mi.ingredient_id
+              )
+        ),
+        changed as (
+            update meal_ingredients mi
+            set quantity = w.quantity,
+                unit = w.unit
+            from wanted w
+            where mi.meal_id = p_meal_id
+              and mi.ingredient_id = w.ingredient_id
+              and (mi.quantity, mi.unit) is distinct from (w.quantity, w.unit)
+        )
+        insert into meal_ingredients (meal_id, ingredient_id, quantity, unit)
+        select p_meal_id, w.ingredient_id, w.quantity, w.unit
+        from wanted w
+        where not exists (
+            select 1 from meal_ingredients mi
+            where mi.meal_id = p_meal_id and mi.ingredient_id = w.ingredient_id
+        );
+    end if;
+
+    return (
+        select json_build_object(
+            'id', m.id,
+            'name', m.name,
+            'description', m.description,
+            'meal_type', m.meal_type,
+            'calories', m.calories,
+            'protein_g', m.protein_g,
+            'carbs_g', m.carbs_g,
+            'fat_g', m.fat_g,
+            'fiber_g', m.fiber_g,
+            'prep_time_mins', m.prep_time_mins,
+            'servings', m.servings,
+            'tags', m.tags,
+            'source_document', m.source_document,
+            'updated_at', m.updated_at,
+            'meal_ingredients', coalesce((
+                select json_agg(json_build_object(
+                    'quantity', mi.quantity,
+                    'unit', mi.unit,
+                    'ingredients', json_build_object('canonical_name', i.canonical_name)
+                ))
+                from meal_ingredients mi
+                join ingredients i on i.id = mi.ingredient_id
+                where mi.meal_id = m.id
+            ), '[]'::json)
+        )
+        from meals m
+        where m.id = p_meal_id
+    );
+end;
+$$;
@@ -0,0 +1,37 @@
+-- Patient profiles. requerimientos caches calcular_requerimientos for the
+-- stored data; requerimientos_key fingerprints the fields it was computed
+-- from, so the API only recomputes it when one of them changes.
+
+create table if not exists patients (
+    id bigint generated by default as identity primary key,
+    nombre text not null,
+    edad int not null,
+    sexo text not null,
+    peso_kg double precision not null,
+    altura_cm double precision not null,
+    objetivo text not null,
+    nivel_actividad text not null default 'sedentario',
+    condiciones text[] not null default '{}',
+    alergias text[] not null default '{}',
+    restricciones text[] not null default '{}',
+    preferencias text[] not null default '{}',
+    requerimientos jsonb not null,
+    requerimientos_key text not null,
+    created_at timestamptz not null default now(),
+    updated_at timestamptz not null default now()
+);
+
+create or replace function touch_patient_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at := now();
+    return new;
+end;
+$$;
+
+drop trigger if exists patients_touch_updated_at on patients;
+create trigger patients_touch_updated_at
+    before update on patients
+    for each row execute function touch_patient_updated_at();
@@ -0,0 +1,36 @@
+-- match_meals gains filter_tags: meals having any of the given tags
+-- (compared lowercase), the same meaning as the catalog's tags filter.
+-- Dropped first so PostgREST does not see two overloads.
+
+drop function if exists match_meals(vector, int, text, int, double precision, text[], text[]);
+
+create or replace function match_meals(
+    query_embedding vector(1536),
+    match_count int default 10,
+    filter_meal_type text default null,
+    max_calories int default null,
+    min_protein double precision default null,
+    must_include text[] default null,
+    exclude text[] default null,
+    filter_tags text[] default null
+)
+returns setof meals
+language sql
+stable
+set hnsw.iterative_scan = 'relaxed_order'
+as $$
+    select *
+    from meals
+    where embedding is not null
+      and (filter_meal_type is null or meal_type = filter_meal_type)
+      and (max_calories is null or calories <= max_calories)
+      and (min_protein is null or protein_g >= min_protein)
+      and (must_include is null or ingredient_names @> must_include)
+      and (exclude is null or not ingredient_names && exclude)
+      and (
+          filter_tags is null
+          or exists (select 1 from unnest(tags) tag where lower(tag) = any(filter_tags))
+      )
+    order by embedding <=> query_embedding
+    limit match_count;
+$$;
@@ -0,0 +1,14 @@
+-- Whether the job's meals actually reached the database. Uploads are only
+-- deduplicated against saved jobs, so a document whose save failed can be
+-- ingested again.
+
+alter table ingestion_jobs
+    add column if not exists saved boolean not null default false;
+
+-- Jobs completed before this column existed were marked completed even when
+-- the save step failed; only trust the ones whose counters show no failures.
+update ingestion_jobs
+set saved = true
+where status = 'completed'
+  and coalesce(summary, '') not like 'Error guardando comidas%'
+  and coalesce((progress->>'meals_failed')::int, 0) = 0;
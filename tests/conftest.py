@@ -0,0 +1,11 @@
+import os
+
+# src.config reads the environment on import. Tests never reach OpenAI or
+# Supabase, but the clients refuse to build without credentials, and the
+# on-disk embedding cache would leak vectors between runs.
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_PRIVATE_KEY", "test")
+os.environ["EMBEDDING_CACHE_PATH"] = ""
+os.environ["MEALS_BACKEND"] = "postgrest"
+os.environ["MEAL_CACHE_TTL_SECONDS"] = "0"
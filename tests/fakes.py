@@ -0,0 +1,322 @@
+"""Local stand-ins for the external clients, installed through the modules' setters."""
+import hashlib
+import itertools
+import json
+import re
+import threading
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+
+import httpx
+import openai
+from agno.models.base import Model
+from agno.models.response import ModelResponse
+
+EMBEDDINGS_URL = "https://api.openai.com/v1/embeddings"
+
+
+def fake_vector(text: str, dimensions: int = 8) -> list[float]:
+    """Deterministic vector for text, so a result can be traced back to its input."""
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return [byte / 255 for byte in digest[:dimensions]]
+
+
+def transient_error(kind: str = "connection") -> openai.OpenAIError:
+    request = httpx.Request("POST", EMBEDDINGS_URL)
+    if kind == "rate_limit":
+        response = httpx.Response(429, request=request)
+        return openai.RateLimitError("rate limited", response=response, body=None)
+    if kind == "server":
+        response = httpx.Response(500, request=request)
+        return openai.InternalServerError("server error", response=response, body=None)
+    return openai.APIConnectionError(request=request)
+
+
+class FakeEmbeddings:
+    def __init__(self, client: "FakeEmbeddingClient") -> None:
+        self._client = client
+
+    def create(self, model: str, input: list[str]):
+        client = self._client
+        client.calls.append(list(input))
+        if client.failures:
+            raise client.failures.pop(0)
+        items = [
+            SimpleNamespace(index=index, embedding=fake_vector(text))
+            for index, text in enumerate(input)
+        ]
+        # The API does not promise results in input order; callers must use index.
+        return SimpleNamespace(data=list(reversed(items)), model=model)
+
+
+class FakeEmbeddingClient:
+    """
+    Offline replacement for openai.OpenAI's embeddings endpoint. Records the
+    inputs of every request and raises the queued failures first.
+    """
+
+    def __init__(self, failures: list[Exception] | None = None) -> None:
+        self.calls: list[list[str]] = []
+        self.failures = list(failures or [])
+        self.embeddings = FakeEmbeddings(self)
+
+
+def _text_array(value) -> list[str]:
+    """Values of a PostgREST array literal such as '{"a","b"}', or a plain list."""
+    if isinstance(value, str):
+        return [item.strip('"') for item in re.findall(r'"(?:[^"\\]|\\.)*"|[^,{}]+', value)]
+    return list(value)
+
+
+class FakeQuery:
+    """One table request: the subset of postgrest's builder the db modules use."""
+
+    def __init__(self, client: "FakeSupabase", table: str) -> None:
+        self._client = client
+        self._table = table
+        self._operation = "select"
+        self._columns = "*"
+        self._payload = None
+        self._options: dict = {}
+        self._filters: list = []
+        self._negate = False
+        self._order: tuple[str, bool] | None = None
+        self._range: tuple[int, int] | None = None
+        self._limit: int | None = None
+
+    def select(self, columns: str = "*", count=None) -> "FakeQuery":
+        self._columns = columns
+        return self
+
+    def insert(self, payload, **options) -> "FakeQuery":
+        self._operation, self._payload = "insert", payload
+        return self
+
+    def upsert(self, payload, **options) -> "FakeQuery":
+        self._operation, self._payload, self._options = "upsert", payload, options
+        return self
+
+    def update(self, payload, **options) -> "FakeQuery":
+        self._operation, self._payload = "update", payload
+        return self
+
+    def delete(self, **options) -> "FakeQuery":
+        self._operation = "delete"
+        return self
+
+    @property
+    def not_(self) -> "FakeQuery":
+        self._negate = True
+        return self
+
+    def _filter(self, predicate) -> "FakeQuery":
+        negate, self._negate = self._negate, False
+        self._filters.append((lambda row: not predicate(row)) if negate else predicate)
+        return self
+
+    def eq(self, column, value):
+        return self._filter(lambda row: row.get(column) == value)
+
+    def in_(self, column, values):
+        values = list(values)
+        return self._filter(lambda row: row.get(column) in values)
+
+    def gt(self, column, value):
+        return self._filter(lambda row: row.get(column) is not None and row[column] > value)
+
+    def gte(self, column, value):
+        return self._filter(lambda row: row.get(column) is not None and row[column] >= value)
+
+    def lte(self, column, value):
+        return self._filter(lambda row: row.get(column) is not None and row[column] <= value)
+
+    def ilike(self, column, pattern):
+        regex = re.compile("^" + re.escape(pattern).replace("%", ".*") + "$", re.IGNORECASE)
+        return self._filter(lambda row: bool(regex.match(row.get(column) or "")))
+
+    def contains(self, column, value):
+        values = set(_text_array(value))
+        return self._filter(lambda row: values <= set(row.get(column) or []))
+
+    def overlaps(self, column, value):
+        values = set(_text_array(value))
+        return self._filter(lambda row: bool(values & set(row.get(column) or [])))
+
+    def or_(self, filters: str):
+        """PostgREST's or=(...) for the column.eq/is/in conditions used in src.db."""
+        conditions = []
+        for condition in re.findall(r"[^,(]+(?:\([^)]*\))?", filters):
+            column, operator, value = condition.split(".", 2)
+            if operator == "in":
+                values = value.strip("()").split(",")
+                conditions.append(lambda row, c=column, v=values: str(row.get(c)) in v)
+            elif operator == "is":
+                expected = {"true": True, "false": False, "null": None}[value]
+                conditions.append(lambda row, c=column, v=expected: row.get(c) is v)
+            else:
+                conditions.append(lambda row, c=column, v=value: str(row.get(c)) == v)
+        return self._filter(lambda row: any(test(row) for test in conditions))
+
+    def order(self, column, desc=False):
+        self._order = (column, desc)
+        return self
+
+    def range(self, start, end):
+        self._range = (start, end)
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    def execute(self) -> SimpleNamespace:
+        client = self._client
+        client.calls.append((self._operation, self._table))
+        failure = client.failures.pop((self._operation, self._table), None)
+        if failure is not None:
+            raise failure
+        rows = client.tables.setdefault(self._table, [])
+        if self._operation in ("insert", "upsert"):
+            return SimpleNamespace(data=self._write(rows))
+        matched = [row for row in rows if all(test(row) for test in self._filters)]
+        if self._operation == "update":
+            for row in matched:
+                row.update(self._payload)
+            return SimpleNamespace(data=[dict(row) for row in matched])
+        if self._operation == "delete":
+            client.tables[self._table] = [row for row in rows if row not in matched]
+            if self._table == "meals":
+                # meal_ingredients.meal_id cascades.
+                meal_ids = {row["id"] for row in matched}
+                client.tables["meal_ingredients"] = [
+                    row for row in client.tables.get("meal_ingredients", [])
+                    if row["meal_id"] not in meal_ids
+                ]
+            return SimpleNamespace(data=matched)
+        if self._order is not None:
+            column, desc = self._order
+            matched.sort(key=lambda row: row[column], reverse=desc)
+        if self._range is not None:
+            matched = matched[self._range[0] : self._range[1] + 1]
+        if self._limit is not None:
+            matched = matched[: self._limit]
+        # Like PostgREST's max-rows, a response never exceeds the server cap.
+        matched = matched[: client.max_rows]
+        return SimpleNamespace(data=[self._embed(row) for row in matched])
+
+    def _write(self, rows: list[dict]) -> list[dict]:
+        payload = self._payload if isinstance(self._payload, list) else [self._payload]
+        key = self._options.get("on_conflict") or "id"
+        written = []
+        for values in payload:
+            existing = next((row for row in rows if row.get(key) == values.get(key)), None)
+            if self._operation == "upsert" and existing is not None:
+                if not self._options.get("ignore_duplicates"):
+                    existing.update(values)
+                    written.append(dict(existing))
+                continue
+            row = {"id": next(self._client.ids), **values}
+            rows.append(row)
+            written.append(dict(row))
+        return written
+
+    def _embed(self, row: dict) -> dict:
+        row = dict(row)
+        if self._table == "meals" and "meal_ingredients(" in self._columns:
+            ingredients = self._client.tables["ingredients"]
+            names = {item["id"]: item["canonical_name"] for item in ingredients}
+            row["meal_ingredients"] = [
+                {
+                    "quantity": item["quantity"],
+                    "unit": item["unit"],
+                    "ingredients": {"canonical_name": names[item["ingredient_id"]]},
+                }
+                for item in self._client.tables["meal_ingredients"]
+                if item["meal_id"] == row["id"]
+            ]
+        return row
+
+
+class FakeSupabase:
+    """
+    In-memory replacement for supabase.Client, enough for the table reads and
+    writes in src.db. Records (operation, table) for every request; a request
+    listed in failures raises that exception once instead of running.
+    """
+
+    def __init__(self, max_rows: int = 1000) -> None:
+        self.tables: dict[str, list[dict]] = {
+            "meals": [],
+            "ingredients": [],
+            "meal_ingredients": [],
+        }
+        self.ids = itertools.count(1)
+        self.max_rows = max_rows
+        self.calls: list[tuple[str, str]] = []
+        self.failures: dict[tuple[str, str], Exception] = {}
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+
+class _AsyncQuery:
+    def __init__(self, query: FakeQuery) -> None:
+        self._query = query
+
+    def __getattr__(self, name):
+        attribute = getattr(self._query, name)
+        if not callable(attribute):
+            return _AsyncQuery(attribute)
+        return lambda *args, **kwargs: _AsyncQuery(attribute(*args, **kwargs))
+
+    async def execute(self) -> SimpleNamespace:
+        return self._query.execute()
+
+
+class AsyncFakeSupabase:
+    """supabase.AsyncClient over the same in-memory tables as a FakeSupabase."""
+
+    def __init__(self, client: FakeSupabase) -> None:
+        self.client = client
+
+    def table(self, name: str) -> _AsyncQuery:
+        return _AsyncQuery(self.client.table(name))
+
+
+@dataclass
+class FakeExtractionModel(Model):
+    """
+    agno model that answers every prompt with an empty extraction whose notes
+    echo the prompt. Records the thread of each call; with a barrier, calls
+    wait for each other so a test can prove they run at the same time.
+    """
+
+    id: str = "fake-extractor"
+    name: str = "FakeExtractionModel"
+    provider: str = "Fake"
+    barrier: threading.Barrier | None = None
+    threads: list[int] = field(default_factory=list)
+
+    def invoke(self, messages=None, **kwargs) -> ModelResponse:
+        self.threads.append(threading.get_ident())
+        if self.barrier is not None:
+            self.barrier.wait()
+        notes = messages[-1].content
+        return ModelResponse(
+            role="assistant", content=json.dumps({"meals": [], "extraction_notes": notes})
+        )
+
+    async def ainvoke(self, *args, **kwargs) -> ModelResponse:
+        raise NotImplementedError
+
+    def invoke_stream(self, *args, **kwargs):
+        raise NotImplementedError
+
+    def ainvoke_stream(self, *args, **kwargs):
+        raise NotImplementedError
+
+    def _parse_provider_response(self, response, **kwargs) -> ModelResponse:
+        return response
+
+    def _parse_provider_response_delta(self, response) -> ModelResponse:
+        return response
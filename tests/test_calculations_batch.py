@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+from src.schemas.patient import ActivityLevel, Objective, PatientData, Sex
+from src.tools.calculations import calcular_imc, calcular_requerimientos
+from src.tools.calculations_batch import calcular_requerimientos_lote
+
+CONDITIONS = [
+    "hipotiroidismo",
+    "Hipotiroidismo",
+    "diabetes",
+    "DIABETES",
+    "resistencia a la insulina",
+    "hipertension",
+    "Hipertension",
+    "enfermedad renal",
+    "asma",
+]
+
+
+def _measure(rng: random.Random, low: float, high: float) -> float:
+    # One decimal, as patients are usually entered, makes .x5 rounding ties
+    # common; arbitrary floats cover the rest.
+    value = rng.uniform(low, high)
+    return round(value, 1) if rng.random() < 0.7 else value
+
+
+def _patient(rng: random.Random, index: int) -> PatientData:
+    if rng.random() < 0.25:
+        # Small, old and losing weight: pushed under the healthy minimum.
+        edad = rng.randint(60, 100)
+        peso_kg, altura_cm = _measure(rng, 30, 55), _measure(rng, 120, 160)
+        objetivo = Objective.LOSE_WEIGHT
+    else:
+        edad = rng.randint(1, 100)
+        peso_kg, altura_cm = _measure(rng, 20, 250), _measure(rng, 50, 220)
+        objetivo = rng.choice(list(Objective))
+    return PatientData(
+        nombre=f"paciente-{index}",
+        edad=edad,
+        sexo=rng.choice(list(Sex)),
+        peso_kg=peso_kg,
+        altura_cm=altura_cm,
+        objetivo=objetivo,
+        nivel_actividad=rng.choice(list(ActivityLevel)),
+        condiciones=rng.sample(CONDITIONS, rng.randint(0, 4)),
+    )
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_batch_matches_scalar_calculations(seed):
+    rng = random.Random(seed)
+    patients = [_patient(rng, index) for index in range(200)]
+
+    batch = calcular_requerimientos_lote(patients)
+
+    assert len(batch) == len(patients)
+    clamped = 0
+    for index, patient in enumerate(patients):
+        expected = calcular_requerimientos(patient)
+        actual = batch.requerimientos(index)
+        for field in type(expected).model_fields:
+            assert getattr(actual, field) == getattr(expected, field), (field, patient)
+        assert batch.imc_resultado(index) == calcular_imc(patient.peso_kg, patient.altura_cm)
+        clamped += any("minimo saludable" in nota for nota in expected.notas)
+    # The cohort must exercise the clamp, not only the plain formula.
+    assert clamped > 0
@@ -0,0 +1,80 @@
+import random
+
+import pytest
+from agno.workflow import StepInput
+
+from src.schemas.meal import ExtractedMealsResponse
+from src.steps import extract_meals
+from src.utils.chunking import chunk_pages
+from src.utils.document_loader import PAGE_BREAK
+from src.workers.progress import JobProgress
+
+
+def _random_pages(rng: random.Random, count: int) -> list[str]:
+    pages = []
+    for page in range(count):
+        paragraphs = []
+        for paragraph in range(rng.randint(1, 6)):
+            lines = [
+                f"p{page}-{paragraph}-{line} " + "x" * rng.randint(0, 120)
+                for line in range(rng.randint(1, 8))
+            ]
+            paragraphs.append("\n".join(lines))
+        pages.append("\n\n".join(paragraphs))
+    return pages
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_chunks_never_exceed_max_chars(seed):
+    rng = random.Random(seed)
+    max_chars = rng.randint(300, 2000)
+    overlap_chars = rng.randint(0, max_chars // 2)
+    pages = _random_pages(rng, rng.randint(1, 12))
+
+    chunks = list(chunk_pages(pages, max_chars=max_chars, overlap_chars=overlap_chars))
+
+    assert chunks
+    assert all(len(chunk) <= max_chars for chunk in chunks)
+    text = "\n".join(chunks)
+    for page in pages:
+        for line in page.splitlines():
+            assert line.strip() in text
+
+
+def test_overlap_is_carried_without_tail_only_chunks():
+    pages = ["a" * 60, "b" * 60, "c" * 60]
+    chunks = list(chunk_pages(pages, max_chars=100, overlap_chars=30))
+    assert chunks == ["a" * 60, "a" * 30 + "\n" + "b" * 60, "b" * 30 + "\n" + "c" * 60]
+
+
+def test_overlap_must_leave_room_for_text():
+    with pytest.raises(ValueError):
+        list(chunk_pages(["texto"], max_chars=100, overlap_chars=100))
+
+
+def test_retried_extraction_counts_progress_once(monkeypatch):
+    progress = JobProgress(None)
+    monkeypatch.setattr(extract_meals, "progress_for", lambda step_input: progress)
+    monkeypatch.setattr(extract_meals, "_read_cache", lambda key: None)
+    monkeypatch.setattr(extract_meals, "_write_cache", lambda key, response: None)
+    monkeypatch.setattr(extract_meals, "chunk_pages", lambda pages: iter(list(pages)))
+
+    calls = []
+
+    def extract_chunk(chunk):
+        calls.append(chunk)
+        if len(calls) == 2:
+            raise RuntimeError("modelo no disponible")
+        return ExtractedMealsResponse(meals=[])
+
+    monkeypatch.setattr(extract_meals, "_extract_chunk", extract_chunk)
+    step_input = StepInput(input=PAGE_BREAK.join(["pagina 1", "pagina 2", "pagina 3"]))
+
+    with pytest.raises(RuntimeError):
+        extract_meals.extract_meals_in_chunks(step_input)
+    # agno retries the step with the same job progress.
+    extract_meals.extract_meals_in_chunks(step_input)
+
+    assert progress.counts["pages_loaded"] == 3
+    assert progress.counts["chunks_total"] == 3
+    assert progress.counts["chunks_extracted"] == 3
@@ -0,0 +1,21 @@
+import pytest
+
+from src.utils import document_loader
+
+
+def test_load_document_text_joins_pages_with_newlines(monkeypatch):
+    monkeypatch.setattr(
+        document_loader, "iter_document_pages", lambda file_path: iter(["pagina 1", "pagina 2"])
+    )
+    assert document_loader.load_document_text("menu.pdf") == "pagina 1\npagina 2"
+
+
+def test_text_files_are_read_whole(tmp_path):
+    path = tmp_path / "menu.txt"
+    path.write_text("Sopa\n\fTacos", encoding="utf-8")
+    assert document_loader.load_document_text(str(path)) == "Sopa\n\fTacos"
+
+
+def test_missing_files_are_reported(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        document_loader.load_document_text(str(tmp_path / "no-existe.pdf"))
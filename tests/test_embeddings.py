@@ -0,0 +1,99 @@
+import httpx
+import openai
+import pytest
+
+from src.schemas.meal import ExtractedMeal
+from src.steps.save_to_db import build_embedding_text, generate_embeddings
+from src.utils import embeddings
+from src.utils.embedding_cache import EmbeddingCache
+from tests.fakes import FakeEmbeddingClient, fake_vector, transient_error
+
+
+@pytest.fixture
+def client():
+    client = FakeEmbeddingClient()
+    embeddings.set_openai_client(client)
+    yield client
+    embeddings.set_openai_client(None)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(embeddings.time, "sleep", sleeps.append)
+    return sleeps
+
+
+def test_results_follow_input_order(client):
+    texts = ["pollo", "avena", "pollo", "sopa"]
+    assert embeddings.embed_texts(texts) == [fake_vector(text) for text in texts]
+    # Repeated texts are embedded once.
+    assert client.calls == [["pollo", "avena", "sopa"]]
+
+
+def test_batches_are_bounded_by_count(client):
+    texts = [f"comida {index}" for index in range(5)]
+    result = embeddings.embed_texts(texts, batch_size=2)
+    assert [len(call) for call in client.calls] == [2, 2, 1]
+    assert [text for call in client.calls for text in call] == texts
+    assert result == [fake_vector(text) for text in texts]
+
+
+def test_batches_are_bounded_by_characters(client, monkeypatch):
+    monkeypatch.setattr(embeddings, "EMBEDDING_BATCH_MAX_CHARS", 10)
+    texts = ["aaaa", "bbbb", "cccc", "dddddddddddd", "e"]
+    embeddings.embed_texts(texts, batch_size=100)
+    assert client.calls == [["aaaa", "bbbb"], ["cccc"], ["dddddddddddd"], ["e"]]
+
+
+def test_transient_errors_are_retried(client, sleeps):
+    client.failures = [transient_error("connection"), transient_error("rate_limit")]
+    assert embeddings.embed_texts(["pollo"]) == [fake_vector("pollo")]
+    assert len(client.calls) == 3
+    assert len(sleeps) == 2
+    assert sleeps[0] < sleeps[1]
+
+
+def test_retries_give_up_after_the_limit(client, sleeps, monkeypatch):
+    monkeypatch.setattr(embeddings, "EMBEDDING_MAX_RETRIES", 2)
+    client.failures = [transient_error("server") for _ in range(3)]
+    with pytest.raises(openai.InternalServerError):
+        embeddings.embed_texts(["pollo"])
+    assert len(client.calls) == 3
+    assert len(sleeps) == 2
+
+
+def test_other_errors_are_not_retried(client, sleeps):
+    response = httpx.Response(400, request=httpx.Request("POST", "https://api.openai.com"))
+    client.failures = [openai.BadRequestError("bad input", response=response, body=None)]
+    with pytest.raises(openai.BadRequestError):
+        embeddings.embed_texts(["pollo"])
+    assert len(client.calls) == 1
+    assert sleeps == []
+
+
+def test_cached_texts_are_not_requested_again(client, monkeypatch, tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.db"), max_entries=100)
+    monkeypatch.setattr(embeddings, "get_embedding_cache", lambda: cache)
+    embeddings.embed_texts(["pollo", "avena"])
+    result = embeddings.embed_texts(["sopa", "avena", "pollo"])
+    assert client.calls == [["pollo", "avena"], ["sopa"]]
+    assert result == [fake_vector(text) for text in ["sopa", "avena", "pollo"]]
+
+
+def test_generate_embeddings_maps_vectors_to_meals(client):
+    meals = [
+        ExtractedMeal(
+            name=f"Comida {index}",
+            description="Prueba",
+            meal_type="cena",
+            calories=300 + index,
+            protein_g=20,
+            carbs_g=30,
+            fat_g=10,
+            ingredients=[{"name": "pollo", "quantity": 100, "unit": "g"}],
+        )
+        for index in range(5)
+    ]
+    vectors = generate_embeddings(meals)
+    assert vectors == [fake_vector(build_embedding_text(meal)) for meal in meals]
@@ -0,0 +1,37 @@
+import threading
+
+from agno.workflow import StepInput
+
+from src.steps import extract_meals
+from src.utils.document_loader import PAGE_BREAK
+from src.workers.progress import JobProgress
+from tests.fakes import FakeExtractionModel
+
+CHUNKS = ["pagina 1", "pagina 2", "pagina 3", "pagina 4"]
+
+
+def test_parallel_chunks_use_one_agent_per_thread(monkeypatch):
+    barrier = threading.Barrier(2, timeout=10)
+    models = []
+
+    def fake_model(id):
+        model = FakeExtractionModel(id=id, barrier=barrier)
+        models.append(model)
+        return model
+
+    monkeypatch.setattr(extract_meals, "OpenAIChat", fake_model)
+    monkeypatch.setattr(extract_meals, "EXTRACTION_CONCURRENCY", 2)
+    monkeypatch.setattr(extract_meals, "progress_for", lambda step_input: JobProgress(None))
+    monkeypatch.setattr(extract_meals, "_read_cache", lambda key: None)
+    monkeypatch.setattr(extract_meals, "_write_cache", lambda key, response: None)
+    monkeypatch.setattr(extract_meals, "chunk_pages", lambda pages: iter(list(pages)))
+
+    output = extract_meals.extract_meals_in_chunks(StepInput(input=PAGE_BREAK.join(CHUNKS)))
+
+    # Every chunk reached the model, and the results keep the chunk order.
+    assert output.content.extraction_notes.splitlines() == CHUNKS
+    # Two chunks were at the model at once (the barrier needs both), each
+    # thread built its own agent, and no agent was shared between threads.
+    assert len(models) == 2
+    assert all(len(set(model.threads)) == 1 for model in models)
+    assert models[0].threads[0] != models[1].threads[0]
@@ -0,0 +1,65 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.routers import ingest
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "INGESTION_UPLOAD_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(ingest.router, prefix="/ingest")
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def _post(client):
+    return client.post("/ingest", files={"file": ("menu.pdf", b"%PDF-1.4", "application/pdf")})
+
+
+def test_upload_is_removed_when_the_job_cannot_be_created(client, upload_dir, monkeypatch):
+    async def no_duplicate(content_hash):
+        return None
+
+    async def unavailable(**kwargs):
+        raise ConnectionError("supabase no disponible")
+
+    monkeypatch.setattr(ingest, "find_job_by_hash", no_duplicate)
+    monkeypatch.setattr(ingest, "create_job", unavailable)
+
+    assert _post(client).status_code == 500
+    assert list(upload_dir.iterdir()) == []
+
+
+def test_upload_is_removed_when_the_lookup_fails(client, upload_dir, monkeypatch):
+    async def unavailable(content_hash):
+        raise ConnectionError("supabase no disponible")
+
+    monkeypatch.setattr(ingest, "find_job_by_hash", unavailable)
+
+    assert _post(client).status_code == 500
+    assert list(upload_dir.iterdir()) == []
+
+
+def test_new_upload_is_kept_for_the_worker(client, upload_dir, monkeypatch):
+    created = {}
+
+    async def no_duplicate(content_hash):
+        return None
+
+    async def create_job(**kwargs):
+        created.update(kwargs)
+        return "job-1"
+
+    monkeypatch.setattr(ingest, "find_job_by_hash", no_duplicate)
+    monkeypatch.setattr(ingest, "create_job", create_job)
+
+    response = _post(client)
+    assert response.status_code == 202
+    assert response.json()["job_id"] == "job-1"
+    assert [str(path) for path in upload_dir.iterdir()] == [created["file_path"]]
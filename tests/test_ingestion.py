@@ -0,0 +1,174 @@
+from types import SimpleNamespace
+
+import asyncio
+import threading
+
+import pytest
+from agno.workflow import StepInput, StepOutput
+
+from src.db import async_jobs, jobs
+from src.db.supabase_client import set_async_supabase_client, set_supabase_client
+from src.schemas.meal import ExtractedMeal, ExtractedMealsResponse
+from src.steps import save_to_db
+from src.workers import ingestion, progress
+from tests.fakes import AsyncFakeSupabase, FakeSupabase
+
+
+@pytest.fixture
+def job_updates(monkeypatch):
+    updates = []
+    monkeypatch.setattr(
+        progress, "update_job", lambda job_id, status, **fields: updates.append((status, fields))
+    )
+    return updates
+
+
+@pytest.fixture
+def upload(tmp_path):
+    path = tmp_path / "menu.pdf"
+    path.write_bytes(b"%PDF")
+    return path
+
+
+def _workflow(monkeypatch, *step_results):
+    run_output = SimpleNamespace(content=step_results[-1].content, step_results=list(step_results))
+    monkeypatch.setattr(
+        ingestion, "meal_extraction_workflow", SimpleNamespace(run=lambda **kwargs: run_output)
+    )
+
+
+def _final_status(updates):
+    return updates[-1][0], updates[-1][1]
+
+
+def test_completed_when_every_step_succeeds(monkeypatch, job_updates, upload):
+    _workflow(monkeypatch, StepOutput(content="extraido"), StepOutput(content="Guardadas: 3"))
+    ingestion.run_ingestion({"id": "job-1", "file_path": str(upload), "attempts": 1})
+    status, fields = _final_status(job_updates)
+    assert status == "completed"
+    assert fields["summary"] == "Guardadas: 3"
+    assert fields["saved"] is True
+    assert not upload.exists()
+
+
+def test_failed_save_requeues_the_job(monkeypatch, job_updates, upload):
+    _workflow(
+        monkeypatch,
+        StepOutput(content="extraido"),
+        StepOutput(content="Error guardando comidas: timeout", success=False),
+    )
+    ingestion.run_ingestion({"id": "job-1", "file_path": str(upload), "attempts": 1})
+    status, fields = _final_status(job_updates)
+    assert status == "queued"
+    assert "Error guardando comidas" in fields["error"]
+    assert fields["saved"] is False
+    # The retry needs the upload to find the cached extraction.
+    assert upload.exists()
+
+
+def test_failed_save_on_the_last_attempt_fails_the_job(monkeypatch, job_updates, upload):
+    _workflow(
+        monkeypatch,
+        StepOutput(content="extraido"),
+        StepOutput(content="Error guardando comidas: timeout", success=False),
+    )
+    job = {"id": "job-1", "file_path": str(upload), "attempts": ingestion.INGESTION_MAX_ATTEMPTS}
+    ingestion.run_ingestion(job)
+    status, _ = _final_status(job_updates)
+    assert status == "failed"
+    assert not upload.exists()
+
+
+def test_worker_survives_a_job_that_raises(monkeypatch):
+    jobs_to_claim = [{"id": "job-1"}, {"id": "job-2"}]
+    processed = []
+    stop_event = threading.Event()
+
+    def run_ingestion(job):
+        processed.append(job["id"])
+        if job["id"] == "job-1":
+            raise ConnectionError("no se pudo guardar el estado")
+        stop_event.set()
+
+    monkeypatch.setattr(ingestion, "claim_job", lambda worker_id: jobs_to_claim.pop(0))
+    monkeypatch.setattr(ingestion, "run_ingestion", run_ingestion)
+    monkeypatch.setattr(ingestion, "extend_job_lease", lambda job_id, worker_id: True)
+
+    ingestion._worker_loop("worker-1", stop_event)
+
+    assert processed == ["job-1", "job-2"]
+
+
+def test_duplicates_only_match_saved_or_pending_jobs():
+    unsaved = {"id": "a", "status": "completed", "saved": False}
+    queued = {"id": "b", "status": "queued", "saved": False}
+    saved = {"id": "c", "status": "completed", "saved": True}
+    assert jobs._pick_job_for_hash([unsaved]) is None
+    assert jobs._pick_job_for_hash([unsaved, queued]) == queued
+    assert jobs._pick_job_for_hash([unsaved, queued, saved]) == saved
+
+
+def test_duplicate_lookup_returns_the_latest_saved_job():
+    client = FakeSupabase()
+    client.tables["ingestion_jobs"] = [
+        {"id": "old", "content_hash": "abc", "status": "completed", "saved": True,
+         "enqueued_at": "2026-10-01T10:00:00+00:00"},
+        {"id": "unsaved", "content_hash": "abc", "status": "completed", "saved": False,
+         "enqueued_at": "2026-10-03T10:00:00+00:00"},
+        {"id": "new", "content_hash": "abc", "status": "completed", "saved": True,
+         "enqueued_at": "2026-10-02T10:00:00+00:00"},
+        {"id": "other", "content_hash": "xyz", "status": "completed", "saved": True,
+         "enqueued_at": "2026-10-04T10:00:00+00:00"},
+    ]
+    set_supabase_client(client)
+    set_async_supabase_client(AsyncFakeSupabase(client))
+    try:
+        assert jobs.find_job_by_hash("abc")["id"] == "new"
+        assert asyncio.run(async_jobs.find_job_by_hash("abc"))["id"] == "new"
+        assert jobs.find_job_by_hash("nada") is None
+    finally:
+        set_supabase_client(None)
+        set_async_supabase_client(None)
+
+
+def _meal(name: str) -> ExtractedMeal:
+    return ExtractedMeal(
+        name=name,
+        description="Prueba",
+        meal_type="cena",
+        calories=400,
+        protein_g=20,
+        carbs_g=30,
+        fat_g=10,
+        ingredients=[{"name": "pollo", "quantity": 100, "unit": "g"}],
+    )
+
+
+@pytest.fixture
+def extracted(monkeypatch):
+    monkeypatch.setattr(save_to_db, "get_existing_meal_names", lambda names: set())
+    monkeypatch.setattr(save_to_db, "generate_embeddings", lambda meals: [[0.0]] * len(meals))
+    return StepInput(
+        previous_step_content=ExtractedMealsResponse(meals=[_meal("Sopa"), _meal("Tacos")]),
+        additional_data={"file_path": "menu.pdf"},
+    )
+
+
+def test_save_step_reports_failure_when_meals_are_not_saved(monkeypatch, extracted):
+    def unavailable(*args, **kwargs):
+        raise ConnectionError("supabase no disponible")
+
+    monkeypatch.setattr(save_to_db, "save_meals", unavailable)
+    monkeypatch.setattr(save_to_db, "save_meal", unavailable)
+    output = save_to_db.save_meals_to_db(extracted)
+    assert output.success is False
+    assert "Errores: 2" in output.content
+
+
+def test_save_step_succeeds_when_every_meal_is_saved(monkeypatch, extracted):
+    monkeypatch.setattr(
+        save_to_db, "save_meals", lambda pending, source_document: list(range(len(pending)))
+    )
+    output = save_to_db.save_meals_to_db(extracted)
+    assert output.success is True
+    assert "Guardadas: 2" in output.content
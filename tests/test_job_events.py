@@ -0,0 +1,78 @@
+import asyncio
+import json
+import threading
+
+from src.api.routers import ingest
+from src.workers.events import job_events
+
+JOB = {"id": "job-1", "status": "processing", "progress": {"stage": "extract"}}
+
+
+def _events(frames: list[str]) -> list[dict]:
+    return [json.loads(frame[len("data: "):]) for frame in frames if frame.startswith("data: ")]
+
+
+async def _collect(stream) -> list[str]:
+    return [frame async for frame in stream]
+
+
+def test_events_published_from_a_worker_thread_reach_the_stream(monkeypatch):
+    monkeypatch.setattr(ingest, "is_tracked", lambda job_id: True)
+
+    async def run():
+        subscriber = job_events.subscribe("job-1")
+        stream = asyncio.create_task(_collect(ingest._event_stream(JOB, subscriber)))
+        await asyncio.sleep(0)
+
+        def worker():
+            job_events.publish("job-1", {**ingest._job_event(JOB), "progress": {"stage": "save"}})
+            job_events.publish("job-1", {**ingest._job_event(JOB), "status": "completed"})
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        return await asyncio.wait_for(stream, 1)
+
+    events = _events(asyncio.run(run()))
+    assert [event.get("status") for event in events] == [
+        "processing",
+        "processing",
+        "completed",
+        None,
+    ]
+    assert events[1]["progress"] == {"stage": "save"}
+    assert events[-1] == {"type": "done"}
+    assert "job-1" not in job_events._subscribers
+
+
+def test_jobs_run_elsewhere_are_polled_without_blocking(monkeypatch):
+    monkeypatch.setattr(ingest, "is_tracked", lambda job_id: False)
+    monkeypatch.setattr(ingest, "EVENTS_POLL_SECONDS", 0.01)
+    rows = iter([JOB, {**JOB, "status": "completed", "summary": "Guardadas: 2"}])
+
+    async def get_job(job_id):
+        return next(rows)
+
+    monkeypatch.setattr(ingest, "get_job", get_job)
+
+    async def run():
+        subscriber = job_events.subscribe("job-1")
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        task = asyncio.create_task(ticker())
+        frames = await _collect(ingest._event_stream(JOB, subscriber))
+        task.cancel()
+        return frames, ticks
+
+    frames, ticks = asyncio.run(run())
+    events = _events(frames)
+    assert [event.get("status") for event in events] == ["processing", "completed", None]
+    assert events[1]["summary"] == "Guardadas: 2"
+    # The loop kept running other tasks while the stream waited.
+    assert ticks > 1
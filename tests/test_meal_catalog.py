@@ -0,0 +1,49 @@
+import pytest
+
+from src.db.meal_catalog import MealCatalog
+from src.db.supabase_client import set_supabase_client
+from tests.fakes import FakeSupabase
+
+
+@pytest.fixture
+def supabase():
+    # A server whose max-rows is below the catalog's page size.
+    client = FakeSupabase(max_rows=3)
+    client.tables["meals"] = [_meal(meal_id) for meal_id in range(1, 11)]
+    set_supabase_client(client)
+    yield client
+    set_supabase_client(None)
+
+
+def _meal(meal_id: int, version: str = "v1") -> dict:
+    return {
+        "id": meal_id,
+        "name": f"Comida {meal_id}",
+        "meal_type": "cena",
+        "calories": 300 + meal_id,
+        "protein_g": 20.0,
+        "tags": [],
+        "updated_at": version,
+    }
+
+
+def test_short_pages_do_not_end_the_load(supabase):
+    catalog = MealCatalog(refresh_seconds=0, page_size=5)
+    assert catalog.refresh() == 10
+    assert [row["id"] for row in catalog.snapshot().rows] == list(range(1, 11))
+
+
+def test_refresh_reloads_every_changed_meal(supabase):
+    catalog = MealCatalog(refresh_seconds=0, page_size=5)
+    catalog.refresh()
+
+    meals = supabase.tables["meals"]
+    for meal in meals[:7]:
+        meal.update(updated_at="v2", calories=900)
+    meals.append(_meal(11))
+    del meals[8]
+
+    assert catalog.refresh() == 8
+    rows = catalog.snapshot().rows
+    assert [row["id"] for row in rows] == [1, 2, 3, 4, 5, 6, 7, 8, 10, 11]
+    assert [row["calories"] for row in rows[:7]] == [900] * 7
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from src.db import async_queries, queries
+from src.db.ingredient_cache import ingredient_cache
+from src.db.supabase_client import set_async_supabase_client, set_supabase_client
+from tests.fakes import AsyncFakeSupabase, FakeSupabase
+
+MEAL = {"name": "Ensalada", "meal_type": "cena", "calories": 350, "protein_g": 25.0}
+ENTRIES = [
+    {"name": "Pechuga de pollo", "quantity": 120, "unit": "g"},
+    {"name": "Lechuga", "quantity": 1, "unit": "taza"},
+]
+
+
+@pytest.fixture
+def supabase():
+    client = FakeSupabase()
+    set_supabase_client(client)
+    set_async_supabase_client(AsyncFakeSupabase(client))
+    ingredient_cache.invalidate()
+    yield client
+    ingredient_cache.invalidate()
+    set_supabase_client(None)
+    set_async_supabase_client(None)
+
+
+def _create_meals(variant, meals):
+    if variant == "async":
+        return asyncio.run(async_queries.create_meals(meals))
+    return queries.create_meals(meals)
+
+
+def _create_meal(variant, meal_data, entries):
+    if variant == "async":
+        return asyncio.run(async_queries.create_meal(meal_data, entries))
+    return queries.create_meal(meal_data, entries)
+
+
+@pytest.fixture(params=["sync", "async"])
+def variant(request):
+    return request.param
+
+
+def test_create_meal_stores_normalized_ingredients(supabase, variant):
+    meal_id = _create_meal(variant, MEAL, ENTRIES)
+
+    meal = queries.get_meal_by_id(meal_id)
+    assert meal["ingredient_names"] == ["pollo", "lechuga"]
+    assert [item["ingredients"]["canonical_name"] for item in meal["meal_ingredients"]] == [
+        "pollo",
+        "lechuga",
+    ]
+    assert [item["quantity"] for item in meal["meal_ingredients"]] == [120, 1]
+
+
+def test_batch_insert_uses_a_fixed_number_of_round_trips(supabase, variant):
+    meals = [({**MEAL, "name": f"Ensalada {index}"}, ENTRIES) for index in range(5)]
+    meal_ids = _create_meals(variant, meals)
+
+    assert len(meal_ids) == 5
+    assert len(supabase.tables["meal_ingredients"]) == 10
+    assert supabase.calls == [
+        ("select", "ingredients"),
+        ("upsert", "ingredients"),
+        ("insert", "meals"),
+        ("insert", "meal_ingredients"),
+    ]
+
+
+def test_resolution_warms_and_fills_the_ingredient_cache(supabase, variant):
+    supabase.tables["ingredients"].append({"id": 100, "canonical_name": "pollo"})
+
+    _create_meal(variant, MEAL, ENTRIES)
+
+    assert ingredient_cache.warmed
+    lechuga_id = ingredient_cache.get_many(["lechuga"])["lechuga"]
+    assert ingredient_cache.get_many(["pollo"]) == {"pollo": 100}
+    assert [row["canonical_name"] for row in supabase.tables["ingredients"]] == ["pollo", "lechuga"]
+
+    supabase.calls.clear()
+    _create_meal(variant, {**MEAL, "name": "Otra"}, ENTRIES)
+    # Every ingredient is cached now, so nothing is looked up again.
+    assert supabase.calls == [("insert", "meals"), ("insert", "meal_ingredients")]
+    assert supabase.tables["meal_ingredients"][-1]["ingredient_id"] == lechuga_id
+
+
+def test_failed_ingredient_insert_removes_the_meals(supabase, variant):
+    supabase.failures[("insert", "meal_ingredients")] = ConnectionError("timeout")
+
+    with pytest.raises(ConnectionError):
+        _create_meals(variant, [(MEAL, ENTRIES)])
+
+    assert supabase.tables["meals"] == []
+    # Cached ids may be stale after a failed insert; they are resolved again.
+    assert ingredient_cache.get_many(["pollo", "lechuga"]) == {}
+
+
+def test_sync_and_async_writes_store_the_same_rows():
+    tables = []
+    for variant in ("sync", "async"):
+        client = FakeSupabase()
+        set_supabase_client(client)
+        set_async_supabase_client(AsyncFakeSupabase(client))
+        ingredient_cache.invalidate()
+        _create_meals(variant, [(MEAL, ENTRIES), ({**MEAL, "name": "Sopa"}, ENTRIES[1:])])
+        tables.append(client.tables)
+    ingredient_cache.invalidate()
+    set_supabase_client(None)
+    set_async_supabase_client(None)
+
+    assert tables[0] == tables[1]
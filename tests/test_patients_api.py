@@ -0,0 +1,49 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.routers import patients as patients_router
+from src.db import patients
+from src.schemas.patient import Objective, PatientData, Sex
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(patients, "_store", patients.SqlitePatientStore(str(tmp_path / "p.db")))
+    for index in range(5):
+        patients.create_patient(
+            PatientData(
+                nombre=f"Paciente {index}",
+                edad=30 + index,
+                sexo=Sex.FEMALE,
+                peso_kg=60.0,
+                altura_cm=165.0,
+                objetivo=Objective.MAINTAIN,
+            )
+        )
+    app = FastAPI()
+    app.include_router(patients_router.router, prefix="/patients")
+    return TestClient(app)
+
+
+def test_listing_pages_with_the_cursor(client):
+    names = []
+    cursor = None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor is not None else {})}
+        page = client.get("/patients", params=params).json()
+        names.extend(item["nombre"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert names == [f"Paciente {index}" for index in range(5)]
+
+
+@pytest.mark.parametrize("limit", [0, patients.MAX_LIST_LIMIT + 1])
+def test_limit_outside_the_cap_is_rejected(client, limit):
+    assert client.get("/patients", params={"limit": limit}).status_code == 422
+
+
+def test_list_patients_caps_direct_callers(client, monkeypatch):
+    monkeypatch.setattr(patients, "MAX_LIST_LIMIT", 3)
+    assert len(patients.list_patients(limit=1000)) == 3
@@ -0,0 +1,83 @@
+import glob
+import json
+import os
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+
+from src.benchmarks.requirements import _patient, synthetic_patients
+from src.db.meal_catalog import CatalogSnapshot
+from src.tools import plan_batch
+
+MEAL_TYPES = ["desayuno", "almuerzo", "cena", "snack"]
+
+
+def _catalog() -> CatalogSnapshot:
+    return CatalogSnapshot.build(
+        [
+            {
+                "id": index + 1,
+                "name": f"Comida {index + 1}",
+                "meal_type": MEAL_TYPES[index % len(MEAL_TYPES)],
+                "calories": 250 + 35 * index,
+                "protein_g": 10 + index,
+                "carbs_g": 30 + 2 * index,
+                "fat_g": 8 + index % 5,
+                "tags": [],
+                "meal_ingredients": [],
+            }
+            for index in range(24)
+        ]
+    )
+
+
+@pytest.fixture(scope="module", autouse=True)
+def pool():
+    # Starting worker processes is slow; the tests share them like requests do.
+    yield
+    plan_batch.shutdown_plan_pool()
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    monkeypatch.setattr(plan_batch, "meal_catalog", SimpleNamespace(snapshot=_catalog))
+
+
+def _patients(count: int):
+    columns, conditions = synthetic_patients(count, seed=3)
+    return [_patient(columns, conditions, index) for index in range(count)]
+
+
+def _catalog_files() -> set[str]:
+    return set(glob.glob(os.path.join(tempfile.gettempdir(), "*.pickle")))
+
+
+def test_batches_share_one_pool_and_match_the_serial_plans(catalog):
+    patients = _patients(plan_batch.PARALLEL_MIN_PATIENTS + 3)
+    files_before = _catalog_files()
+
+    serial = list(plan_batch.generate_plans(patients, workers=1))
+    first = list(plan_batch.generate_plans(patients, workers=2))
+    pool = plan_batch._pool
+    second = list(plan_batch.generate_plans(patients, workers=2))
+
+    assert pool is not None and plan_batch._pool is pool
+    assert first == serial and second == serial
+    lines = [json.loads(line) for line in first]
+    assert [line["index"] for line in lines] == list(range(len(patients)))
+    assert all("plan" in line for line in lines)
+    # The catalog handed to the workers is removed after each batch.
+    assert _catalog_files() == files_before
+
+
+def test_closing_the_stream_keeps_the_pool_for_other_batches(catalog):
+    patients = _patients(plan_batch.PARALLEL_MIN_PATIENTS * 3)
+
+    lines = plan_batch.generate_plans(patients, workers=2)
+    next(lines)
+    pool = plan_batch._pool
+    lines.close()
+
+    assert plan_batch._pool is pool
+    assert len(list(plan_batch.generate_plans(patients[:10], workers=2))) == 10
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from src.db import queries
+from src.db.meal_catalog import CatalogSnapshot
+from src.db.vector_index import BruteForceIndex, set_vector_index
+from src.tools import search_tools
+
+
+def _meal(meal_id, calories, carbs_g, embedding):
+    return {
+        "id": meal_id,
+        "name": f"Comida {meal_id}",
+        "description": "",
+        "meal_type": "cena",
+        "calories": calories,
+        "protein_g": 20.0,
+        "carbs_g": carbs_g,
+        "fat_g": 10.0,
+        "tags": [],
+        "meal_ingredients": [],
+        "embedding": embedding,
+    }
+
+
+MEALS = [
+    _meal(1, 450, 30.0, [1.0, 0.0]),
+    _meal(2, None, 20.0, [0.9, 0.1]),
+    _meal(3, 500, None, [0.8, 0.2]),
+    _meal(4, 250, 10.0, [0.7, 0.3]),
+    _meal(5, 600, 80.0, [0.6, 0.4]),
+]
+
+
+def _ids(result: str) -> list[int]:
+    return [meal["id"] for meal in json.loads(result)["comidas"]]
+
+
+@pytest.fixture
+def index(monkeypatch):
+    monkeypatch.setattr(queries, "embed_text", lambda text: [1.0, 0.0])
+    set_vector_index(BruteForceIndex.from_meals(MEALS))
+    yield
+    set_vector_index(None)
+
+
+def test_semantic_search_applies_bounds_without_failing_on_missing_values(index):
+    result = search_tools.buscar_comidas(
+        consulta="algo para la cena", min_calorias=300, max_carbohidratos=50
+    )
+    assert _ids(result) == [1]
+
+
+def test_catalog_search_applies_the_bounds(monkeypatch):
+    rows = [{k: v for k, v in meal.items() if k != "embedding"} for meal in MEALS]
+    monkeypatch.setattr(search_tools, "meal_catalog", CatalogSnapshot.build(rows))
+    result = search_tools.buscar_comidas(min_calorias=300, max_carbohidratos=50)
+    assert _ids(result) == [1]
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from src.db import async_queries, queries
+from src.db.vector_index import BruteForceIndex, get_vector_index, set_vector_index
+
+
+def _meal(meal_id, name, meal_type, embedding, ingredients=(), tags=(), calories=400):
+    return {
+        "id": meal_id,
+        "name": name,
+        "meal_type": meal_type,
+        "calories": calories,
+        "protein_g": 20.0,
+        "tags": list(tags),
+        "meal_ingredients": [
+            {"quantity": None, "unit": None, "ingredients": {"canonical_name": name}}
+            for name in ingredients
+        ],
+        "embedding": embedding,
+    }
+
+
+MEALS = [
+    _meal(1, "Ensalada de pollo", "cena", [1.0, 0.1, 0.0], ["pollo", "lechuga"], ["ligero"]),
+    _meal(2, "Pollo al horno", "almuerzo", [0.9, 0.3, 0.0], ["pollo", "papa"], ["Alto en proteina"]),
+    _meal(3, "Avena con fruta", "desayuno", [0.0, 1.0, 0.0], ["avena", "platano"], ["ligero"]),
+    _meal(4, "Sopa de verduras", "cena", [0.5, 0.0, 0.5], ["zanahoria", "apio"], ["ligero"]),
+    _meal(5, "Tacos de res", "cena", [0.8, 0.0, 0.6], ["res", "tortilla"], []),
+    _meal(6, "Sin embedding", "cena", None, ["pollo"], ["ligero"]),
+]
+QUERY = [1.0, 0.0, 0.0]
+
+
+@pytest.fixture
+def index():
+    index = BruteForceIndex.from_meals(MEALS)
+    set_vector_index(index)
+    yield index
+    set_vector_index(None)
+
+
+@pytest.fixture(autouse=True)
+def fake_query_embedding(monkeypatch):
+    monkeypatch.setattr(queries, "embed_text", lambda text: QUERY)
+    monkeypatch.setattr(async_queries, "embed_text", lambda text: QUERY)
+
+
+def _ids(meals):
+    return [meal["id"] for meal in meals]
+
+
+def test_ranks_by_cosine_similarity(index):
+    assert _ids(index.search(QUERY)) == [1, 2, 5, 4, 3]
+
+
+def test_meals_without_embedding_are_left_out(index):
+    assert len(index) == 5
+    assert all("embedding" not in meal for meal in index.search(QUERY))
+
+
+def test_meal_type_filter(index):
+    assert _ids(index.search(QUERY, meal_type="cena")) == [1, 5, 4]
+    assert index.search(QUERY, meal_type="merienda") == []
+
+
+def test_exclude_filter_normalizes_names(index):
+    assert _ids(index.search(QUERY, exclude=["Pollo"])) == [5, 4, 3]
+    assert _ids(index.search(QUERY, must_include=["pollo"], exclude=["papa"])) == [1]
+
+
+def test_tags_filter_matches_any_tag_ignoring_case(index):
+    assert _ids(index.search(QUERY, tags=["LIGERO"])) == [1, 4, 3]
+    assert _ids(index.search(QUERY, tags=["ligero", "alto en proteina"])) == [1, 2, 4, 3]
+
+
+def test_limit_and_numeric_filters(index):
+    assert _ids(index.search(QUERY, limit=2)) == [1, 2]
+    assert index.search(QUERY, max_calories=300) == []
+
+
+def test_search_meals_semantic_uses_installed_index(index, monkeypatch):
+    def no_database():
+        raise AssertionError("the database must not be called")
+
+    monkeypatch.setattr(queries, "get_supabase_client", no_database)
+    meals = queries.search_meals_semantic(
+        "algo ligero para la cena", meal_type="cena", exclude=["res"], tags=["ligero"]
+    )
+    assert _ids(meals) == [1, 4]
+
+    meals = asyncio.run(
+        async_queries.search_meals_semantic("algo ligero para la cena", tags=["ligero"], limit=2)
+    )
+    assert _ids(meals) == [1, 4]
+
+
+def test_semantic_search_params_pass_tags_lowercase():
+    params = queries._semantic_search_params(QUERY, tags=["Ligero"], exclude=["Pollo "])
+    assert params["filter_tags"] == ["ligero"]
+    assert params["exclude"] == ["pollo"]
+    assert get_vector_index() is None